@@ -32,6 +32,8 @@ import sys
 import os
 import shutil
 import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import datetime  # used to write the log file
 import pandas as pd
 
@@ -39,6 +41,12 @@ from core.fslibs.Logger import FarseerLogger
 from core.fslibs import FarseerCube as fcube
 from core.fslibs import FarseerSeries as fss
 from core.fslibs import Comparisons as fsc
+from core.fslibs.Cache import FitCache, PeaklistCache, cache_config
+from core.fslibs.Calculations import calc_step, csp_alpha_table
+from core.fslibs.CubeCalculations import CubeCalculations
+from core.fslibs.Pipeline import Pipeline
+from core.fslibs.RenderPool import RenderPool
+from core.fslibs.RunManifest import RunManifest, config_sections, fingerprint
 from core.fslibs.WetHandler import WetHandler as fsw
 
 class FarseerNMR:
@@ -80,6 +88,18 @@ class FarseerNMR:
         self.farseer_series_SD_dict = {}
         self.comparisons_dict = {}
         self.comparisons_SD_dict = {}
+        # user calculations, see .add_calculation()
+        self.extra_calc_steps = []
+        # registers the stages of incremental runs, see .run()
+        self.manifest = None
+        # stores the fitted parameters, see .run()
+        self.fit_cache = None
+        # draws the figures, see .run()
+        self.render_pool = None
+        # performs the parallel fits, see .run()
+        self.fit_executor = None
+        # series are calculated one at a time, see .eval_series()
+        self.calc_lock = threading.Lock()
         
         # methods should be performed on initiation
         self._starts_logger()
@@ -705,6 +725,98 @@ Settings.'.\
         
         return None
     
+    def _peaklist_cache(self):
+        """
+        Initiates the cache of parsed peaklists according to
+        fsuv["cache_settings"].
+        
+        Returns:
+            PeaklistCache, or None if the cache is deactivated.
+        """
+        settings = cache_config(
+            self.fsuv,
+            self.fsuv["general_settings"]["output_path"]
+            )
+        
+        if settings is None:
+            return None
+        
+        cache = PeaklistCache(*settings)
+        
+        if self.fsuv.get("cache_settings", {}).get("clear_cache", False):
+            cache.invalidate()
+        
+        return cache
+    
+    def _fit_cache(self):
+        """
+        Initiates the cache of fitted parameters according to
+        fsuv["cache_settings"].
+        
+        Returns:
+            FitCache, or None if the cache is deactivated.
+        """
+        settings = cache_config(
+            self.fsuv,
+            self.fsuv["general_settings"]["output_path"]
+            )
+        
+        if settings is None:
+            return None
+        
+        cache = FitCache(*settings)
+        
+        if self.fsuv.get("cache_settings", {}).get("clear_cache", False):
+            cache.invalidate()
+        
+        return cache
+    
+    def _fit_executor(self):
+        """
+        Initiates the process pool of the parallel fits according to
+        fsuv["general_settings"]["fit_workers"].
+        
+        The processes are started at once, so that they are forked
+        before the .run() threads exist.
+        
+        Returns:
+            ProcessPoolExecutor, or None if the residues are fitted
+            in the main process.
+        """
+        workers = self.fsuv["general_settings"].get("fit_workers", 1)
+        
+        if not(self.fsuv["revo_settings"]["perform_resevo_fitting"]) \
+                or workers <= 1:
+            return None
+        
+        executor = ProcessPoolExecutor(max_workers=workers)
+        # all the processes are started by the first task
+        executor.submit(os.getpid).result()
+        
+        return executor
+    
+    def _run_manifest(self):
+        """
+        Initiates the manifest of incremental runs according to
+        fsuv["general_settings"]["incremental_run"].
+        
+        Returns:
+            RunManifest, or None if incremental runs are deactivated.
+        """
+        general = self.fsuv["general_settings"]
+        
+        if not general.get("incremental_run", False):
+            return None
+        
+        manifest = RunManifest(general["output_path"])
+        manifest.set_run(
+            manifest.fingerprint_inputs(general["input_spectra_path"]),
+            config_sections(self.fsuv),
+            self.extra_calc_steps
+            )
+        
+        return manifest
+    
     def creates_pkls_dataset(
             self,
             peaklist_folder_path='',
@@ -733,25 +845,31 @@ Settings.'.\
             has_sidechains or self.fsuv["general_settings"]["has_sidechains"]
         fasta_start = fasta_start or self.fsuv["fasta_settings"]["FASTAstart"]
         apply_fasta = apply_fasta or self.fsuv["fasta_settings"]["applyFASTA"]
+        # number of threads reading the input files
+        workers = self.fsuv["general_settings"].get("load_workers", 1)
         
         self.pkls = fcube.FarseerCube(
             peaklist_folder_path,
             has_sidechains,
             FASTAstart=fasta_start,
-            applyFASTA=apply_fasta
+            applyFASTA=apply_fasta,
+            peaklist_cache=self._peaklist_cache()
             )
         
         self.logger.debug("Peaklist dataset created correctly")
         
-        self.pkls.load_experiments()
+        self.pkls.load_experiments(workers=workers)
     
         if apply_fasta:
-            self.pkls.load_experiments(filetype='.fasta')
+            self.pkls.load_experiments(filetype='.fasta', workers=workers)
         
         # even if the user does not want to analyse sidechains, Farseer-NMR
         # has to parse them out from the input peaklist if they exist
         if has_sidechains:
-            self.pkls.load_experiments(resonance_type='Sidechains')
+            self.pkls.load_experiments(
+                resonance_type='Sidechains',
+                workers=workers
+                )
         
         self.pkls.split_res_info()
         
@@ -958,6 +1076,20 @@ Settings.'.\
         xx = False
         yy = False
         zz = False
+        fitting = self.fsuv["fitting_settings"]
+        # the calculations are performed once over the whole cube
+        # for the series along all the active axes
+        calculations = self.perform_cube_calcs(
+            [
+                axis for axis, has_axis in (
+                    ('x', self.pkls.hasxx),
+                    ('y', self.pkls.hasyy),
+                    ('z', self.pkls.haszz)
+                    )
+                if has_axis and fitting["do_along_{}".format(axis)]
+                ],
+            resonance_type=resonance_type
+            )
         
         # creates set of series for the first condition (1D)
         if self.pkls.hasxx and self.fsuv["fitting_settings"]["do_along_x"]:
@@ -968,7 +1100,8 @@ Settings.'.\
                     along_axis='x',
                     resonance_type=resonance_type,
                     series_kwargs=\
-                        self._series_kwargs(resonance_type=resonance_type)
+                        self._series_kwargs(resonance_type=resonance_type),
+                    calculations=calculations
                     )
         
         elif not(self.pkls.hasxx) \
@@ -984,7 +1117,8 @@ Settings.'.\
                     along_axis='y',
                     resonance_type=resonance_type,
                     series_kwargs=\
-                        self._series_kwargs(resonance_type=resonance_type)
+                        self._series_kwargs(resonance_type=resonance_type),
+                    calculations=calculations
                     )
         
         elif not(self.pkls.hasyy) \
@@ -1000,7 +1134,8 @@ Settings.'.\
                     along_axis='z',
                     resonance_type=resonance_type,
                     series_kwargs=\
-                        self._series_kwargs(resonance_type=resonance_type)
+                        self._series_kwargs(resonance_type=resonance_type),
+                    calculations=calculations
                     )
         
         elif not(self.pkls.haszz) \
@@ -1021,14 +1156,68 @@ no series set was created along an axis. Nothing will be calculated.'
         
         return None
     
-    def perform_calcs(self, farseer_series):
+    def perform_cube_calcs(self, along_axes, resonance_type='Backbone'):
         """
-        Calculates the NMR parameters according to the user specifications.
+        Performs the calculations of .perform_calcs() once over the
+        whole Farseer-NMR Cube, for the series along all <along_axes>.
         
         Parameters:
-            farseer_series (FarseerSeries class): a FarseerSeries class
-                object containing all the experiments along a series
-                previously selected from the Farseer-NMR Cube.
+            along_axes (list): the series axes, {'x', 'y', 'z'}.
+            
+            resonance_type (opt, str): {'Backbone', 'Sidechains'}
+        
+        Returns:
+            CubeCalculations instance, or None if there are no axes.
+        """
+        
+        if not(along_axes):
+            return None
+        
+        if resonance_type == 'Backbone':
+            cube = self.pkls.peaklists_cube
+        
+        else:
+            cube = self.pkls.sidechains_cube
+        
+        calculations = CubeCalculations(
+            cube,
+            along_axes,
+            cs_missing=self.fsuv["csp_settings"]["cs_missing"],
+            csp_alpha4res=csp_alpha_table(
+                self.fsuv["csp_settings"]["csp_res4alpha"],
+                self.fsuv["csp_settings"]["csp_res_exceptions"]
+                )
+            )
+        self.perform_calcs(calculations)
+        
+        return calculations
+    
+    def add_calculation(self, column, calculation, inputs, **params):
+        """
+        Adds a calculation to the ones configured in the user
+        variables, performed by .perform_calcs() for every series.
+        
+        Parameters:
+            column (str): the name of the calculated column.
+            
+            calculation (str): a calculation registered with
+                Calculations.register_calculation().
+            
+            inputs (list): the input column names, which can be
+                calculated columns.
+            
+            params: keyword arguments of the calculation kernel.
+        """
+        self.extra_calc_steps.append(
+            calc_step(column, calculation, inputs, **params)
+            )
+        
+        return None
+    
+    def calc_steps(self):
+        """
+        The calculations configured in the user variables followed by
+        the ones added with .add_calculation().
         
         Depends on:
         fsuv["PosF1_settings"]["calcs_PosF1_delta"]
@@ -1041,53 +1230,70 @@ no series set was created along an axis. Nothing will be calculated.'
         fsuv.calccol_name_CSP
         fsuv.calccol_name_Height_ratio
         fsuv.calccol_name_Volume_ratio
+        
+        Returns:
+            list of Calculations.CalcStep.
         """
         
-        # if the user wants to calculate combined Chemical Shift Perturbations
-        if self.fsuv["csp_settings"]["calcs_CSP"]:
-            # calculate differences in chemical shift for each dimension
-            farseer_series.calc_cs_diffs(
-                self.fsuv["PosF1_settings"]["calccol_name_PosF1_delta"],
-                'Position F1'
-                )
-            farseer_series.calc_cs_diffs(
-                self.fsuv["PosF2_settings"]["calccol_name_PosF2_delta"],
-                'Position F2'
-                )
-            # Calculates CSPs
-            farseer_series.calc_csp(
-                calccol=self.fsuv["csp_settings"]["calccol_name_CSP"],
-                pos1=self.fsuv["PosF1_settings"]["calccol_name_PosF1_delta"],
-                pos2=self.fsuv["PosF2_settings"]["calccol_name_PosF2_delta"]
-                )
+        steps = []
+        posf1 = self.fsuv["PosF1_settings"]["calccol_name_PosF1_delta"]
+        posf2 = self.fsuv["PosF2_settings"]["calccol_name_PosF2_delta"]
         
-        # if the user only wants to calculate perturbation in single dimensions
-        else:
-            if self.fsuv["PosF1_settings"]["calcs_PosF1_delta"]:
-                farseer_series.calc_cs_diffs(
-                    self.fsuv["PosF1_settings"]["calccol_name_PosF1_delta"],
-                    'Position F1'
-                    )
-            if self.fsuv["PosF2_settings"]["calcs_PosF2_delta"]:
-                farseer_series.calc_cs_diffs(
-                    self.fsuv["PosF2_settings"]["calccol_name_PosF2_delta"],
-                    'Position F2'
-                    )
+        # combined Chemical Shift Perturbations need the differences
+        # in chemical shift for each dimension
+        if self.fsuv["csp_settings"]["calcs_CSP"] \
+                or self.fsuv["PosF1_settings"]["calcs_PosF1_delta"]:
+            steps.append(calc_step(posf1, 'delta', ['Position F1']))
+        
+        if self.fsuv["csp_settings"]["calcs_CSP"] \
+                or self.fsuv["PosF2_settings"]["calcs_PosF2_delta"]:
+            steps.append(calc_step(posf2, 'delta', ['Position F2']))
+        
+        if self.fsuv["csp_settings"]["calcs_CSP"]:
+            steps.append(calc_step(
+                self.fsuv["csp_settings"]["calccol_name_CSP"],
+                'csp',
+                [posf1, posf2]
+                ))
         
         # Calculates Ratios
         if self.fsuv["Height_ratio_settings"]["calcs_Height_ratio"]:
-            farseer_series.calc_ratio(
+            steps.append(calc_step(
                 self.fsuv["Height_ratio_settings"]["calccol_name_Height_ratio"],
-                'Height'
-                )
+                'ratio',
+                ['Height']
+                ))
         
         if self.fsuv["Volume_ratio_settings"]["calcs_Volume_ratio"]:
-            farseer_series.calc_ratio(
+            steps.append(calc_step(
                 self.fsuv["Volume_ratio_settings"]["calccol_name_Volume_ratio"],
-                'Volume'
-                )
+                'ratio',
+                ['Volume']
+                ))
+        
+        return steps + self.extra_calc_steps
+    
+    def perform_calcs(self, farseer_series):
+        """
+        Calculates the NMR parameters according to the user specifications,
+        see .calc_steps().
+        
+        Each column is calculated once per series and the calculations
+        that do not depend on each other run in
+        fsuv["general_settings"]["calc_workers"] threads.
+        
+        Parameters:
+            farseer_series (FarseerSeries class): a FarseerSeries class
+                object containing all the experiments along a series
+                previously selected from the Farseer-NMR Cube.
+                A CubeCalculations instance performs the same
+                calculations over the whole Cube.
+        """
         
-        ### ADD ADDITIONAL CALCULATION HERE ###
+        farseer_series.calculate(
+            self.calc_steps(),
+            max_workers=self.fsuv["general_settings"].get("calc_workers", 1)
+            )
         
         return None
     
@@ -1105,6 +1311,7 @@ no series set was created along an axis. Nothing will be calculated.'
         fsuv.restraint_settings
         fsuv["revo_settings"]["titration_x_values"]
         fsuv["fitting_parameters"]
+        fsuv["general_settings"]["fit_workers"]
         """
         # fits are allowed only for X axis series
         if not(
@@ -1116,24 +1323,39 @@ data along the X axis. There is nothing to fit.')
             return None
         
         self._checks_fit_input(farseer_series)
-        
-        for restraint in self.fsuv["restraint_settings"].index:
-            if self.fsuv["restraint_settings"].loc[restraint, 'calcs_restraint_flg']:
-                farseer_series.perform_fit(
-                    restraint,
-                    self.fsuv["revo_settings"]["titration_x_values"],
-                    self.fsuv["fitting_parameters"]["mininum_datapoints"],
-                    self.fsuv["fitting_parameters"]["fitting_function"]
-                    )
-        
-        for obs in self.fsuv["observables_settings"].index:
-            if self.fsuv["observables_settings"].loc[obs, 'obs_flags']:
-                farseer_series.perform_fit(
-                    obs,
-                    self.fsuv["revo_settings"]["titration_x_values"],
-                    self.fsuv["fitting_parameters"]["mininum_datapoints"],
-                    self.fsuv["fitting_parameters"]["fitting_function"]
-                    )
+        # number of processes fitting the residues
+        workers = self.fsuv["general_settings"].get("fit_workers", 1)
+        # all residues fitted at once
+        batch = self.fsuv["fitting_parameters"].get("batch_fitting", False)
+        # bootstrap confidence intervals of the fitted parameters
+        bootstrap = \
+            self.fsuv["fitting_parameters"].get("bootstrap_replicates", 0)
+        confidence_level = \
+            self.fsuv["fitting_parameters"].get("confidence_level", 95)
+        
+        cols = [
+            restraint
+            for restraint in self.fsuv["restraint_settings"].index
+            if self.fsuv["restraint_settings"].loc[restraint, 'calcs_restraint_flg']
+            ]
+        cols.extend(
+            obs
+            for obs in self.fsuv["observables_settings"].index
+            if self.fsuv["observables_settings"].loc[obs, 'obs_flags']
+            )
+        # all columns are fitted in a single sweep
+        farseer_series.perform_fits(
+            cols,
+            self.fsuv["revo_settings"]["titration_x_values"],
+            self.fsuv["fitting_parameters"]["mininum_datapoints"],
+            self.fsuv["fitting_parameters"]["fitting_function"],
+            workers=workers,
+            batch=batch,
+            cache=self.fit_cache,
+            bootstrap=bootstrap,
+            confidence_level=confidence_level,
+            executor=self.fit_executor
+            )
         
         return None
     
@@ -1205,7 +1427,8 @@ Nothing to calculate here.')
                     )
                 
                 if self.fsuv["restraint_settings"].loc[sourcecol,'calcs_restraint_flg']:
-                    farseer_series.plot_base(
+                    self._plot(
+                        farseer_series,
                         targetcol, 
                         'exp', 
                         'heat_map',
@@ -1235,7 +1458,8 @@ Nothing to calculate here.')
                     ['Hgt_DPRE', 'Vol_DPRE']
                     ):
                 if self.fsuv["restraint_settings"].loc[sourcecol,'calcs_restraint_flg']:
-                    farseer_series.plot_base(
+                    self._plot(
+                        farseer_series,
                         targetcols,
                         'exp',
                         'DPRE_plot',
@@ -1377,6 +1601,7 @@ Nothing to calculate here.')
         self.fsuv.res_evo_par_dict
         self.fsuv.cs_scatter_par_dict
         self.fsuv.cs_scatter_flower_dict
+        self.fsuv["general_settings"]["fig_paginate"]
         """
         
         if not(resonance_type in ['Backbone', 'Sidechains']):
@@ -1394,6 +1619,8 @@ Nothing to calculate here.')
         fig_width = self.fsuv["general_settings"]["fig_width"]
         fig_dpi = self.fsuv["general_settings"]["fig_dpi"]
         fig_file_type = self.fsuv["general_settings"]["fig_file_type"]
+        # residue plots are drawn in pages, see FarseerSeries._plot_pages()
+        paginate = self.fsuv["general_settings"].get("fig_paginate", False)
         
         for restraint in self.fsuv["restraint_settings"].index:
             # if the user has calculated this restraint
@@ -1401,7 +1628,8 @@ Nothing to calculate here.')
                 if farseer_series.resonance_type == 'Backbone':
                     # Plot Extended Bar Plot
                     if self.fsuv["plotting_flags"]["do_ext_bar"]:
-                        farseer_series.plot_base(
+                        self._plot(
+                            farseer_series,
                             restraint,
                             'exp',
                             'bar_extended',
@@ -1429,7 +1657,8 @@ Nothing to calculate here.')
                     
                     # Plot Compacted Bar Plot
                     if self.fsuv["plotting_flags"]["do_comp_bar"]:
-                        farseer_series.plot_base(
+                        self._plot(
+                            farseer_series,
                             restraint,
                             'exp',
                             'bar_compacted',
@@ -1457,7 +1686,8 @@ Nothing to calculate here.')
                 
                     # Plot Vertical Bar Plot
                     if self.fsuv["plotting_flags"]["do_vert_bar"]:
-                        farseer_series.plot_base(
+                        self._plot(
+                            farseer_series,
                             restraint,
                             'exp',
                             'bar_vertical',
@@ -1484,7 +1714,8 @@ Nothing to calculate here.')
                 elif farseer_series.resonance_type == 'Sidechains'\
                         and (self.fsuv["plotting_flags"]["do_ext_bar"] \
                         or self.fsuv["plotting_flags"]["do_comp_bar"]):
-                    farseer_series.plot_base(
+                    self._plot(
+                        farseer_series,
                         restraint,
                         'exp',
                         'bar_extended',
@@ -1511,7 +1742,8 @@ Nothing to calculate here.')
                 
                 # Plots Parameter Evolution Plot
                 if self.fsuv["plotting_flags"]["do_res_evo"]:
-                    farseer_series.plot_base(
+                    self._plot(
+                        farseer_series,
                         restraint,
                         'res',
                         'res_evo',
@@ -1527,14 +1759,16 @@ Nothing to calculate here.')
                         fig_height=fig_height,
                         fig_width=fig_width,
                         fig_file_type=fig_file_type,
-                        fig_dpi=fig_dpi
+                        fig_dpi=fig_dpi,
+                        paginate=paginate
                         )
         
         if self.fsuv["plotting_flags"]["do_cs_scatter"] \
                 and ((self.fsuv["PosF1_settings"]["calcs_PosF1_delta"] \
                     and self.fsuv["PosF2_settings"]["calcs_PosF2_delta"])\
                 or self.fsuv["csp_settings"]["calcs_CSP"]):
-            farseer_series.plot_base(
+            self._plot(
+                farseer_series,
                 '15N_vs_1H',
                 'res',
                 'cs_scatter',
@@ -1544,14 +1778,16 @@ Nothing to calculate here.')
                 fig_height=fig_height,
                 fig_width=fig_width,
                 fig_file_type=fig_file_type,
-                fig_dpi=fig_dpi
+                fig_dpi=fig_dpi,
+                paginate=paginate
                 )
         
         if self.fsuv["plotting_flags"]["do_cs_scatter_flower"] \
                 and ((self.fsuv["PosF1_settings"]["calcs_PosF1_delta"] \
                     and self.fsuv["PosF2_settings"]["calcs_PosF2_delta"])\
                 or self.fsuv["csp_settings"]["calcs_CSP"]):
-            farseer_series.plot_base(
+            self._plot(
+                farseer_series,
                 '15N_vs_1H',
                 'single',
                 'cs_scatter_flower',
@@ -1566,7 +1802,8 @@ Nothing to calculate here.')
         
         for obs in self.fsuv["observables_settings"].index:
             if self.fsuv["observables_settings"].loc[obs,"obs_flags"]:
-                farseer_series.plot_base(
+                self._plot(
+                    farseer_series,
                 obs,
                 'res',
                 'res_evo',
@@ -1578,9 +1815,233 @@ Nothing to calculate here.')
                 fig_height=fig_height,
                 fig_width=fig_width,
                 fig_file_type=fig_file_type,
-                fig_dpi=fig_dpi
+                fig_dpi=fig_dpi,
+                paginate=paginate
                 )
         
+        # all the figures of the series were submitted
+        self._release(farseer_series)
+        
+        return None
+    
+    def _calculate(self, farseer_series):
+        """
+        Performs the calculations, fits and PRE analysis of a series,
+        which are needed by the exports and by the plots.
+        """
+        with self.calc_lock:
+            # figures drawn from now on need the calculated data
+            self._release(farseer_series)
+            farseer_series.calcs_pending = False
+            # performs the calculations
+            self.perform_calcs(farseer_series)
+            # PERFORMS FITS
+            self.perform_fits(farseer_series)
+            # Analysis of PRE data - only in along_z
+            self.delta_pre_analysis(farseer_series)
+        
+        return None
+    
+    def _plot(self, farseer_series, *args, **kwargs):
+        """
+        Draws a figure with FarseerSeries.plot_base().
+        
+        In incremental runs, the figure is only drawn if the series data,
+        the analysis settings or the plotting arguments changed since the
+        last run. If the calculations of the series were skipped,
+        they are performed before drawing.
+        
+        During .run(), figures are drawn by the .render_pool processes.
+        
+        Parameters:
+            farseer_series (FarseerSeries class): the series to plot.
+            
+            args, kwargs: passed to FarseerSeries.plot_base().
+        """
+        if self.manifest is None \
+                or farseer_series.analysis_fingerprint is None:
+            self._render(farseer_series, args, kwargs)
+            return None
+        
+        # calccol, plot_type and plot_style identify the figure
+        stage = '{}:plot:{}:{}:{}'.format(farseer_series.calc_path, *args[:3])
+        stage_fingerprint = fingerprint(
+            farseer_series.analysis_fingerprint,
+            args,
+            kwargs
+            )
+        
+        if self.manifest.is_up_to_date(stage, stage_fingerprint):
+            self.logger.debug('Figure up to date: {}'.format(stage))
+            return None
+        
+        if farseer_series.calcs_pending:
+            self._calculate(farseer_series)
+        
+        self._render(
+            farseer_series,
+            args,
+            kwargs,
+            callback=lambda outputs: self.manifest.record_files(
+                stage,
+                stage_fingerprint,
+                outputs
+                )
+            )
+        
+        return None
+    
+    def _render(self, farseer_series, args, kwargs, callback=None):
+        """Draws a figure in the .render_pool, see RenderPool.submit()."""
+        if self.render_pool is None:
+            outputs = farseer_series.plot_base(*args, **kwargs)
+            
+            if callback is not None:
+                callback(outputs)
+            
+            return None
+        
+        self.render_pool.submit(farseer_series, args, kwargs, callback)
+        
+        return None
+    
+    def _release(self, farseer_series):
+        """
+        Drops the pickle the .render_pool keeps of the series,
+        see RenderPool.release().
+        """
+        if self.render_pool is not None:
+            self.render_pool.release(farseer_series)
+        
+        return None
+    
+    def analyse_series(self, farseer_series, resonance_type='Backbone'):
+        """
+        Performs the calculations, fits, PRE analysis and exports of a
+        series, see .calculate_series() and .export_results().
+        
+        Parameters:
+            farseer_series (FarseerSeries class): contains all the
+                experiments of a Farseer-NMR Cube extracted series.
+            
+            resonance_type (opt, str): {'Backbone', 'Sidechains'}
+        """
+        before = self.calculate_series(farseer_series)
+        
+        if before is not None:
+            self.export_results(
+                farseer_series,
+                before,
+                resonance_type=resonance_type
+                )
+        
+        return None
+    
+    def calculate_series(self, farseer_series):
+        """
+        Performs the calculations, fits and PRE analysis of a series.
+        
+        In incremental runs, nothing is done if neither the series data
+        nor the analysis settings changed since the last run and the
+        exported files still exist. The calculations are then
+        performed only if a figure has to be drawn again.
+        
+        Parameters:
+            farseer_series (FarseerSeries class): contains all the
+                experiments of a Farseer-NMR Cube extracted series.
+        
+        Returns:
+            None if the analysis is up to date, otherwise the
+            RunManifest.snapshot() of the series folder before the
+            analysis, or an empty dict in non incremental runs,
+            to be passed to .export_results().
+        """
+        before = {}
+        
+        if self.manifest is not None:
+            farseer_series.analysis_fingerprint = fingerprint(
+                farseer_series.fingerprint(),
+                config_sections(self.fsuv, analysis_only=True),
+                self.extra_calc_steps
+                )
+            stage = '{}:analysis'.format(farseer_series.calc_path)
+            
+            if self.manifest.is_up_to_date(
+                    stage,
+                    farseer_series.analysis_fingerprint):
+                farseer_series.calcs_pending = True
+                farseer_series.logs(
+                    'Series data and settings did not change since the '
+                    'last run, calculations are up to date.'
+                    )
+                return None
+            
+            before = self.manifest.snapshot(farseer_series.calc_path)
+        
+        self._calculate(farseer_series)
+        
+        return before
+    
+    def export_results(self, farseer_series, before, resonance_type='Backbone'):
+        """
+        Exports the peaklists, Chimera files and tables of a series
+        calculated by .calculate_series(), which returned <before>.
+        
+        In incremental runs, registers the analysis of the series in
+        the run manifest.
+        
+        Parameters:
+            farseer_series (FarseerSeries class): contains all the
+                experiments of a Farseer-NMR Cube extracted series.
+            
+            before (dict): the output of .calculate_series().
+            
+            resonance_type (opt, str): {'Backbone', 'Sidechains'}
+        """
+        # EXPORTS FULLY PARSED PEAKLISTS
+        self.export_series(farseer_series)
+        # EXPORTS CHIMERA FILES
+        self.export_chimera_att_files(farseer_series)
+        #
+        self.export_all_parameters(
+            farseer_series,
+            resonance_type=resonance_type
+            )
+        
+        if self.manifest is not None:
+            self.manifest.record(
+                '{}:analysis'.format(farseer_series.calc_path),
+                farseer_series.analysis_fingerprint,
+                farseer_series.calc_path,
+                before
+                )
+        
+        return None
+    
+    def output_series(self, farseer_series, before, resonance_type='Backbone'):
+        """
+        Exports the results and plots the data of a series calculated
+        by .calculate_series(), which returned <before>.
+        
+        In pipelined runs, runs in the background thread of
+        .eval_series().
+        """
+        if before is not None:
+            self.export_results(
+                farseer_series,
+                before,
+                resonance_type=resonance_type
+                )
+        
+        # PLOTS DATA
+        # plots data are exported together with the plots in
+        # fsT.plot_base(), but can be used separatly with
+        # fsT.write_table()
+        self.plot_data(farseer_series, resonance_type=resonance_type)
+        
+        if self.manifest is not None:
+            self.manifest.save()
+        
         return None
     
     def eval_series(self, series_dct, resonance_type='Backbone'):
@@ -1588,6 +2049,11 @@ Nothing to calculate here.')
         Executes the Farseer-NMR analysis routines over all the series of
         a Farseer Series dictionary according to the user variables.
         
+        With general_settings "pipeline_depth" > 0, the exports and
+        plots of each series run in a background thread while the next
+        series are calculated, see Pipeline. At most "pipeline_depth"
+        calculated series wait for their exports.
+        
         Parameters:
             series_dct (dict): a nested dictionary containing the
                 FarseerSeries for every axis of the Farseer-NMR Cube.
@@ -1603,46 +2069,32 @@ Nothing to calculate here.')
                 )
             return
         
-        # for each kind of titration (cond{1,2,3})
-        for cond in sorted(series_dct.keys()):
-            # for each point in the corresponding second dimension/condition
-            for dim2_pt in sorted(series_dct[cond].keys()):
-                # for each point in the corresponding first dimension/condition
-                for dim1_pt in sorted(series_dct[cond][dim2_pt].keys()):
-                    series_dct[cond][dim2_pt][dim1_pt].\
-                        logs(
+        pipeline = Pipeline(
+            lambda item: self.output_series(*item),
+            depth=self.fsuv["general_settings"].get("pipeline_depth", 0)
+            )
+        
+        with pipeline:
+            # for each kind of titration (cond{1,2,3})
+            for cond in sorted(series_dct.keys()):
+                # for each point in the corresponding second dimension/condition
+                for dim2_pt in sorted(series_dct[cond].keys()):
+                    # for each point in the corresponding first dimension/condition
+                    for dim1_pt in sorted(series_dct[cond][dim2_pt].keys()):
+                        farseer_series = series_dct[cond][dim2_pt][dim1_pt]
+                        farseer_series.logs(
                             'ANALYZING... [{}] - [{}][{}]'.format(
                                 cond,
                                 dim2_pt,
                                 dim1_pt
                                 ),
-                            istitle=True)
-                    # flags and checks are under each function.
-                    # performs the calculations
-                    self.perform_calcs(series_dct[cond][dim2_pt][dim1_pt])
-                    # PERFORMS FITS
-                    self.perform_fits(series_dct[cond][dim2_pt][dim1_pt])
-                    # Analysis of PRE data - only in along_z
-                    self.delta_pre_analysis(series_dct[cond][dim2_pt][dim1_pt])
-                    # EXPORTS FULLY PARSED PEAKLISTS
-                    self.export_series(series_dct[cond][dim2_pt][dim1_pt])
-                    # EXPORTS CHIMERA FILES
-                    self.export_chimera_att_files(
-                        series_dct[cond][dim2_pt][dim1_pt]
-                        )
-                    #
-                    self.export_all_parameters(
-                        series_dct[cond][dim2_pt][dim1_pt],
-                        resonance_type=resonance_type
-                        )
-                    # PLOTS DATA
-                    # plots data are exported together with the plots in
-                    # fsT.plot_base(), but can be used separatly with
-                    # fsT.write_table()
-                    self.plot_data(
-                        series_dct[cond][dim2_pt][dim1_pt],
-                        resonance_type=resonance_type
-                        )
+                            istitle=True
+                            )
+                        # performs the calculations and fits,
+                        # flags and checks are under each function.
+                        before = self.calculate_series(farseer_series)
+                        # exports and plots
+                        pipeline.put((farseer_series, before, resonance_type))
         
         return None
     
@@ -1670,6 +2122,14 @@ Nothing to calculate here.')
                 )
             return None
         
+        # in incremental runs, only figures that changed are drawn again
+        if self.manifest is not None:
+            comp_panel.analysis_fingerprint = fingerprint(
+                comp_panel.fingerprint(),
+                config_sections(self.fsuv, analysis_only=True),
+                self.extra_calc_steps
+                )
+        
         # EXPORTS FULLY PARSED PEAKLISTS
         self.export_series(comp_panel)
         # performs pre analysis
@@ -1704,6 +2164,38 @@ Nothing to calculate here.')
                 )
             return None
         
+        if self.manifest is not None:
+            all_series = [
+                series_dict[cond][dim2_pt][dim1_pt]
+                for cond in sorted(series_dict.keys())
+                for dim2_pt in sorted(series_dict[cond].keys())
+                for dim1_pt in sorted(series_dict[cond][dim2_pt].keys())
+                ]
+            stage = '{}:comparisons'.format(resonance_type)
+            stage_fingerprint = fingerprint(
+                [s.analysis_fingerprint for s in all_series],
+                config_sections(self.fsuv)
+                )
+            
+            if self.manifest.is_up_to_date(stage, stage_fingerprint):
+                self.logger.info(
+                    'Compared series and settings did not change since '
+                    'the last run, {} comparisons are up to date.'.\
+                        format(resonance_type)
+                    )
+                return None
+            
+            # comparisons are built from the calculated columns
+            for farseer_series in all_series:
+                if farseer_series.calcs_pending:
+                    self._calculate(farseer_series)
+            
+            comparisons_path = os.path.join(
+                resonance_type,
+                fss.FarseerSeries.comparison_folder
+                )
+            before = self.manifest.snapshot(comparisons_path)
+        
         # kwargs passed to the parsed series of class fss.FarseerSeries
         comp_kwargs = self._series_kwargs(resonance_type=resonance_type)
         # ORDERED relation between dimension names
@@ -1745,7 +2237,7 @@ Nothing to calculate here.')
                                     dimension,
                                     dp2,
                                     dp1,
-                                    list(c.hyper_panel.labels)
+                                    c.hyper_cube.coords[1]
                                     ),
                             istitle=True
                             )
@@ -1770,7 +2262,7 @@ Nothing to calculate here.')
                                     dimension,
                                     dp2,
                                     dp1,
-                                    list(c.hyper_panel.cool)
+                                    c.hyper_cube.coords[0]
                                     ),
                             istitle=True)
                         self.comparison_analysis_routines(
@@ -1783,6 +2275,15 @@ Nothing to calculate here.')
         elif resonance_type == 'Sidechains':
             self.comparisons_SD_dict = comp_dct.copy()
         
+        if self.manifest is not None:
+            self.manifest.record(
+                stage,
+                stage_fingerprint,
+                comparisons_path,
+                before
+                )
+            self.manifest.save()
+        
         return None
     
     def run(self):
@@ -1801,81 +2302,117 @@ Nothing to calculate here.')
         self.logger.info(self._log_state_stamp())
         self._log_header()
         
-        # Initiates Farseer
-        self.creates_pkls_dataset()
+        # incremental runs only recompute what changed since the last run
+        self.manifest = self._run_manifest()
+        self.fit_cache = self._fit_cache()
         
-        analyses_sidechains = self.pkls.has_sidechains and use_sidechains
+        if self.manifest is not None and self.manifest.run_is_up_to_date():
+            self.logger.info(
+                'Input files and configuration did not change since the '
+                'last run, results in {} are up to date.'.format(
+                    general["output_path"]
+                    )
+                )
+            self._log_tail()
+            return None
+        
+        # fit processes are forked before the pipeline and render threads
+        self.fit_executor = self._fit_executor()
+        # figures are drawn while the next series are analysed
+        self.render_pool = RenderPool(general.get("plot_workers", 1))
         
-        # corrects chemical shifts
-        if cs["perform_cs_correction"]:
-            self.normalize_chemical_shifts()
+        try:
+            # Initiates Farseer
+            self.creates_pkls_dataset()
+            
+            analyses_sidechains = self.pkls.has_sidechains and use_sidechains
+            
+            # corrects chemical shifts
+            if cs["perform_cs_correction"]:
+                self.normalize_chemical_shifts()
+                
+                if analyses_sidechains:
+                    self.normalize_chemical_shifts(resonance_type='Sidechains')
+            
+            # expands missing residues to other dimensions
+            if fitting["expand_missing_yy"]:
+                self.expand_missing(dim='y')
+                
+                if analyses_sidechains:
+                    self.expand_missing(dim='y', resonance_type='Sidechains')
+            
+            if fitting["expand_missing_zz"]:
+                self.expand_missing(dim='z')
+                
+                if analyses_sidechains:
+                    self.expand_missing(dim='z', resonance_type='Sidechains')
+            
+            ## identifies missing residues
+            self.finds_missing_residues(peak_status='missing')
             
             if analyses_sidechains:
-                self.normalize_chemical_shifts(resonance_type='Sidechains')
-        
-        # expands missing residues to other dimensions
-        if fitting["expand_missing_yy"]:
-            self.expand_missing(dim='y')
+                self.finds_missing_residues(resonance_type='Sidechains')
+            
+            # adds fasta
+            if fasta["applyFASTA"]:
+                self.finds_missing_residues(peak_status='unassigned')
+            
+            #organize peaklist columns
+            self.organize_columns()
             
             if analyses_sidechains:
-                self.expand_missing(dim='y', resonance_type='Sidechains')
-        
-        if fitting["expand_missing_zz"]:
-            self.expand_missing(dim='z')
+                self.organize_columns(resonance_type='Sidechains')
+            
+            self.init_farseer_cube()
+            
+            # initiates a dictionary that contains all the series to be evaluated
+            # along all the conditions.
+            self.gen_series_dict(resonance_type='Backbone')
+            
+            if self.farseer_series_dict:
+                # evaluates the series and plots the data
+                self.eval_series(self.farseer_series_dict)
+            else:
+                self.pkls.exports_parsed_pkls()
             
             if analyses_sidechains:
-                self.expand_missing(dim='z', resonance_type='Sidechains')
-        
-        ## identifies missing residues
-        self.finds_missing_residues(peak_status='missing')
-        
-        if analyses_sidechains:
-            self.finds_missing_residues(resonance_type='Sidechains')
-        
-        # adds fasta
-        if fasta["applyFASTA"]:
-            self.finds_missing_residues(peak_status='unassigned')
-        
-        #organize peaklist columns
-        self.organize_columns()
-        
-        if analyses_sidechains:
-            self.organize_columns(resonance_type='Sidechains')
-        
-        self.init_farseer_cube()
-        
-        # initiates a dictionary that contains all the series to be evaluated
-        # along all the conditions.
-        self.gen_series_dict(resonance_type='Backbone')
-        
-        if self.farseer_series_dict:
-            # evaluates the series and plots the data
-            self.eval_series(self.farseer_series_dict)
-        else:
-            self.pkls.exports_parsed_pkls()
-        
-        if analyses_sidechains:
-            self.gen_series_dict(resonance_type='Sidechains')
+                self.gen_series_dict(resonance_type='Sidechains')
+                
+                if self.farseer_series_SD_dict:
+                    self.eval_series(
+                        self.farseer_series_SD_dict,
+                        resonance_type='Sidechains'
+                        )
             
-            if self.farseer_series_SD_dict:
-                self.eval_series(
-                    self.farseer_series_SD_dict,
-                    resonance_type='Sidechains'
+            # Representing the results comparisons
+            if fitting["perform_comparisons"] and self.farseer_series_dict:
+                # analyses comparisons.
+                self.analyse_comparisons(
+                    self.farseer_series_dict,
+                    resonance_type='Backbone'
                     )
+                
+                if analyses_sidechains:
+                    self.analyse_comparisons(
+                        self.farseer_series_SD_dict,
+                        resonance_type='Sidechains'
+                        )
+            
+            # waits for the figures still being drawn
+            self.render_pool.close()
         
-        # Representing the results comparisons
-        if fitting["perform_comparisons"] and self.farseer_series_dict:
-            # analyses comparisons.
-            self.analyse_comparisons(
-                self.farseer_series_dict,
-                resonance_type='Backbone'
-                )
+        finally:
+            # after an error, the figures not yet drawn are dropped
+            self.render_pool.close(cancel=True)
+            self.render_pool = None
+            
+            # executor.map() cancels the fits left when one fails
+            if self.fit_executor is not None:
+                self.fit_executor.shutdown()
+                self.fit_executor = None
         
-            if analyses_sidechains:
-                self.analyse_comparisons(
-                    self.farseer_series_SD_dict,
-                    resonance_type='Sidechains'
-                    )
+        if self.manifest is not None:
+            self.manifest.save(complete=True)
         
         self._log_tail()
         
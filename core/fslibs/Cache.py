@@ -0,0 +1,394 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import glob
+import hashlib
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+import core.fslibs.Logger as Logger
+
+# increase when parsing routines change the parsed output,
+# so that previously cached entries are not used.
+PARSER_VERSION = '1'
+
+
+def cache_config(fsuv, output_path):
+    """
+    Reads the cache settings from the user configuration.
+
+    Parameters:
+        fsuv (dict): the Farseer-NMR configuration.
+
+        output_path (str): the calculation output folder, the cache is
+            stored in its '.farseer_cache' subfolder unless
+            cache_settings/cache_path is given.
+
+    Returns:
+        (cache_dir, max_size) or None if the cache is deactivated,
+        cache_settings/use_cache is False by default.
+    """
+    settings = fsuv.get("cache_settings", {})
+
+    if not settings.get("use_cache", False):
+        return None
+
+    cache_dir = settings.get("cache_path") \
+        or os.path.join(output_path, '.farseer_cache')
+    max_size = settings.get("cache_max_size_mb", 500) * 1e6
+
+    return cache_dir, max_size
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """sha256 hex digest of the content of the file in <path>."""
+    sha = hashlib.sha256()
+
+    with open(path, 'rb') as fin:
+        for chunk in iter(lambda: fin.read(chunk_size), b''):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+class BinaryCache:
+    """
+    Content-addressed on-disk cache of np.ndarray bundles.
+
+    Each entry is a .npz file named after the sha256 of its key parts.
+    When the total size of the cache exceeds <max_size> the least
+    recently used entries are removed.
+
+    Attributes:
+        cache_dir (str): folder where the entries are stored.
+
+        max_size (int): maximum size of the cache in bytes.
+
+        namespace (str): prefix of the entry files, entries of
+            different namespaces share the same folder and size limit.
+    """
+
+    def __init__(self, cache_dir, max_size=500e6, namespace='cache'):
+        self.logger = Logger.FarseerLogger(__name__).setup_log()
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size)
+        self.namespace = namespace
+
+        if not(os.path.exists(self.cache_dir)):
+            os.makedirs(self.cache_dir)
+
+    def key(self, *parts):
+        """Builds an entry key from the <parts> that define its content."""
+        sha = hashlib.sha256()
+
+        for part in parts:
+            sha.update(str(part).encode('utf-8'))
+            sha.update(b'\0')
+
+        return sha.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(
+            self.cache_dir,
+            '{}_{}.npz'.format(self.namespace, key)
+            )
+
+    def get(self, key):
+        """
+        Returns the dictionary of np.ndarrays stored under <key>, or
+        None if there is no such entry.
+        """
+        path = self._entry_path(key)
+
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+
+        except (OSError, ValueError):
+            return None
+
+        # registers the use for the LRU eviction, the entry may have
+        # been evicted meanwhile by another thread or process
+        try:
+            os.utime(path)
+
+        except OSError:
+            pass
+
+        return arrays
+
+    def put(self, key, arrays, evict=True):
+        """
+        Stores the dictionary of np.ndarrays <arrays> under <key>.
+
+        Parameters:
+            evict (bool): calls .evict() afterwards, callers storing
+                many entries at once can evict only at the end.
+        """
+        path = self._entry_path(key)
+        tmp_path = '{}.{}.{}.tmp'.format(
+            path,
+            os.getpid(),
+            threading.get_ident()
+            )
+
+        # written to a temporary file first so that concurrent runs
+        # never read an incomplete entry
+        with open(tmp_path, 'wb') as fout:
+            np.savez(fout, **arrays)
+
+        os.replace(tmp_path, path)
+
+        if evict:
+            self.evict()
+
+        return None
+
+    def entries(self):
+        """Paths of all the cache entries, in all namespaces."""
+        return glob.glob(os.path.join(self.cache_dir, '*.npz'))
+
+    def evict(self):
+        """Removes the least recently used entries above max_size."""
+        entries = []
+
+        for path in self.entries():
+            try:
+                stat = os.stat(path)
+
+            except OSError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+
+            except OSError:
+                continue
+
+            total_size -= size
+            self.logger.debug('cache entry evicted: {}'.format(path))
+
+        return None
+
+    def invalidate(self):
+        """Removes all the entries of this namespace."""
+        pattern = os.path.join(
+            self.cache_dir,
+            '{}_*.npz'.format(self.namespace)
+            )
+
+        for path in glob.glob(pattern):
+            os.remove(path)
+
+        self.logger.info('Cache invalidated: {}'.format(pattern))
+
+        return None
+
+
+class PeaklistCache(BinaryCache):
+    """
+    Cache of parsed peaklists.
+
+    Peaklist tables are stored column by column, keyed by the content
+    of the source file and the PARSER_VERSION.
+    """
+
+    def __init__(self, cache_dir, max_size=500e6):
+        super().__init__(cache_dir, max_size=max_size, namespace='peaklist')
+
+    @staticmethod
+    def frame_to_arrays(df):
+        """Converts a pd.DataFrame to a dictionary of np.ndarrays."""
+        arrays = {'__columns__': np.array(df.columns, dtype=str)}
+
+        for i, col in enumerate(df.columns):
+            values = np.asarray(df[col])
+
+            if values.dtype == object:
+                missing = pd.isnull(values)
+                values = np.where(missing, '', values).astype(str)
+                arrays['mask_{}'.format(i)] = missing
+
+            arrays['col_{}'.format(i)] = values
+
+        return arrays
+
+    @staticmethod
+    def arrays_to_frame(arrays):
+        """Converts back the output of .frame_to_arrays()."""
+        columns = [str(c) for c in arrays['__columns__']]
+        data = {}
+
+        for i, col in enumerate(columns):
+            values = arrays['col_{}'.format(i)]
+            mask = arrays.get('mask_{}'.format(i))
+
+            if mask is not None:
+                values = values.astype(object)
+                values[mask] = np.nan
+
+            data[col] = values
+
+        return pd.DataFrame(data, columns=columns)
+
+    def get_text(self, key):
+        """Returns the text stored under <key>, or None."""
+        arrays = self.get(key)
+
+        if arrays is None:
+            return None
+
+        return arrays['text'].tobytes().decode('utf-8')
+
+    def put_text(self, key, text):
+        """Stores <text> under <key>."""
+        self.put(
+            key,
+            {'text': np.frombuffer(text.encode('utf-8'), dtype=np.uint8)}
+            )
+
+        return None
+
+    def read_csv(self, path, reader=pd.read_csv):
+        """
+        Reads a .csv peaklist through the cache.
+
+        Parameters:
+            path (str): path to the .csv file.
+
+            reader (function): used to parse the file when it is not
+                cached.
+
+        Returns:
+            pd.DataFrame
+        """
+        key = self.key(hash_file(path), PARSER_VERSION, 'csv')
+        arrays = self.get(key)
+
+        if arrays is not None:
+            self.logger.debug('cache hit: {}'.format(path))
+            return self.arrays_to_frame(arrays)
+
+        df = reader(path)
+        self.put(key, self.frame_to_arrays(df))
+
+        return df
+
+
+class FitCache(BinaryCache):
+    """
+    Cache of fitted parameters.
+
+    Entries are keyed by the fitting function and its version, the
+    fitting method, the fitted data and the minimum number of data
+    points, and store the popt and pcov of the fit or its failure,
+    and the bootstrap confidence intervals of popt when estimated.
+
+    Attributes:
+        hits, misses (int): number of lookups found and not found.
+    """
+
+    def __init__(self, cache_dir, max_size=500e6):
+        super().__init__(cache_dir, max_size=max_size, namespace='fit')
+        self.hits = 0
+        self.misses = 0
+
+    def fit_key(self, fit_function, version, method, x, y, mindp):
+        """
+        Builds the entry key of a fit.
+
+        Parameters:
+            fit_function (str): fitting library name.
+
+            version (str): the FittingBase.version of the model.
+
+            method (str): the optimizer, {'curve_fit', 'batch'}, and
+                the bootstrap settings.
+
+            x, y (array-like): the fitted data.
+
+            mindp (int): minimum number of data points of a fit.
+        """
+        return self.key(
+            fit_function,
+            version,
+            method,
+            np.asarray(x, dtype=np.float64).tobytes().hex(),
+            np.asarray(y, dtype=np.float64).tobytes().hex(),
+            mindp
+            )
+
+    def get_fit(self, key):
+        """
+        Returns:
+            the stored (popt, pcov), or (popt, pcov, ci) with the
+            confidence intervals, or None for failed fits, see
+            FittingBase.fit_output(), and whether the fit was found.
+        """
+        arrays = self.get(key)
+
+        if arrays is None:
+            self.misses += 1
+            return None, False
+
+        self.hits += 1
+
+        if not arrays['okay']:
+            return None, True
+
+        if 'ci' in arrays:
+            return (arrays['popt'], arrays['pcov'], arrays['ci']), True
+
+        return (arrays['popt'], arrays['pcov']), True
+
+    def put_fit(self, key, params, evict=True):
+        """
+        Stores the output of FittingBase.fit_params(), optionally
+        followed by the confidence intervals.
+        """
+        if params is None:
+            arrays = {'okay': np.array(False)}
+
+        else:
+            popt, pcov, *ci = params
+            arrays = {
+                'okay': np.array(True),
+                'popt': np.asarray(popt, dtype=np.float64),
+                'pcov': np.asarray(pcov, dtype=np.float64)
+                }
+
+            if ci:
+                arrays['ci'] = np.asarray(ci[0], dtype=np.float64)
+
+        self.put(key, arrays, evict=evict)
+
+        return None
@@ -0,0 +1,494 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# calculation name -> kernel, see register_calculation()
+CALCULATIONS = {}
+
+# convolve_extend() uses FFT for kernels and rows longer than these
+FFT_MIN_WINDOW = 31
+FFT_MIN_LENGTH = 512
+
+# a column to calculate: the name of the new column, the registered
+# calculation, the input column names and the kernel keyword arguments
+CalcStep = namedtuple('CalcStep', ['column', 'calculation', 'inputs', 'params'])
+
+
+def calc_step(column, calculation, inputs, **params):
+    """Builds a CalcStep."""
+    return CalcStep(column, calculation, tuple(inputs), params)
+
+
+def register_calculation(name, cube=True):
+    """
+    Decorator that registers a calculation kernel under <name>.
+
+    Kernels receive a CalcContext followed by the arrays of the step
+    input columns and the step params, and return the array of the
+    calculated column. Arrays have the series axis in
+    CalcContext.axis and the residues in the last axis.
+
+    Parameters:
+        name (str): the calculation name used in the CalcSteps.
+
+        cube (bool): whether the kernel can run over the whole
+            Farseer-NMR Cube, whose residue axis is padded with NaN
+            for the shorter peaklists. Kernels that combine the values
+            of different residues must be registered with False and
+            are performed by each FarseerSeries.
+
+    Example:
+        @register_calculation('difference')
+        def difference(context, col1, col2):
+            return col1 - col2
+    """
+    def decorator(kernel):
+        kernel.cube = cube
+        CALCULATIONS[name] = kernel
+        return kernel
+
+    return decorator
+
+
+def csp_alpha_table(csp_alpha4res=0.14, csp_res_exceptions={'G':0.2}):
+    """
+    The CSP normalization factor of each residue type.
+
+    Parameters:
+        csp_alpha4res (float): the default normalization factor.
+
+        csp_res_exceptions (dict): 1-letter code -> normalization factor
+            for the residues that do not use the default.
+
+    Returns:
+        dict, 1-letter code -> normalization factor.
+    """
+    alpha4res = {key:csp_alpha4res for key in 'ARNDCEQGHILKMFPSTWYV'}
+
+    for k, v in csp_res_exceptions.items():
+        alpha4res[k] = v
+
+    return alpha4res
+
+
+def residue_alpha(codes, letters, alpha4res):
+    """
+    Expands the CSP normalization factors to every residue.
+
+    Parameters:
+        codes (np.ndarray): codes of the '1-letter' column.
+
+        letters (np.ndarray): the '1-letter' categories.
+
+        alpha4res (dict): the output of csp_alpha_table().
+
+    Returns:
+        np.ndarray of the shape of <codes>, NaN for unknown residues.
+    """
+    # one value per residue type, the last one for missing codes
+    alpha = np.array(
+        [alpha4res.get(l, np.nan) for l in letters] + [np.nan]
+        )
+
+    return alpha[codes]
+
+
+def csp_willi(alpha, pos1, pos2):
+    """
+    Formula that calculates Chemical Shift Perturbations (CSPs).
+
+    Parameters:
+        alpha (np.ndarray): the normalization factor of each residue.
+
+        pos1, pos2 (np.ndarray): chemical shift differences for
+            nuclei 1 and 2.
+
+    np.sqrt(0.5*(H1**2 + (alpha*N15)**2))
+
+    where the proportional normalization factor (alpha) for the 15N
+    dimension is set by default to 0.2 for Glycine and 0.14 for all
+    the other residues.
+
+    Williamson, M. P. Using chemical shift perturbation to
+    characterise ligand binding. Prog. Nuc. Magn. Res. Spect.
+    73, 1–16 (2013). SEE CORRIGENDUM
+    """
+    return np.sqrt(0.5*(pos1**2+(alpha*pos2)**2))
+
+
+def cs_diffs(source, missing, cs_missing='prev', axis=0):
+    """
+    Differences of <source> to its first element along <axis>,
+    the reference experiment of the series.
+
+    Parameters:
+        source (np.ndarray): the chemical shifts.
+
+        missing (np.ndarray): boolean, True for the missing peaks.
+
+        cs_missing (str): {'prev', 'full', 'zero'} how the results of
+            missing peaks are set: the value of the previous
+            experiment, 1 or 0. Other values keep the differences.
+
+        axis (int): the series axis.
+
+    Returns:
+        np.ndarray of the shape of <source>.
+    """
+    diffs = source - np.take(source, [0], axis=axis)
+    # the reference experiment is only modified in 'full' mode
+    missing_after_ref = missing.copy()
+    np.moveaxis(missing_after_ref, axis, 0)[0] = False
+
+    if cs_missing == 'full':
+        diffs = np.where(missing, 1., diffs)
+
+    elif cs_missing == 'prev':
+        # forward fill along the series: each missing peak takes
+        # the value of the last previous non missing experiment
+        shape = [1] * source.ndim
+        shape[axis] = source.shape[axis]
+        position = np.arange(source.shape[axis]).reshape(shape)
+        fill_from = np.maximum.accumulate(
+            np.where(missing_after_ref, 0, position),
+            axis=axis
+            )
+        index = list(np.ix_(*[np.arange(n) for n in diffs.shape]))
+        index[axis] = fill_from
+        diffs = diffs[tuple(index)]
+
+    elif cs_missing == 'zero':
+        diffs = np.where(missing_after_ref, 0., diffs)
+
+    return diffs
+
+
+def ratio(source, axis=0):
+    """Ratio of <source> to its first element along <axis>."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return source / np.take(source, [0], axis=axis)
+
+
+def gaussian_kernel(stddev=1, x_size=7):
+    """
+    Normalized 1D Gaussian kernel sampled at the center of each of
+    the <x_size> bins, as astropy.convolution.Gaussian1DKernel.
+
+    Returns:
+        np.ndarray
+    """
+    if x_size % 2 == 0:
+        raise ValueError(
+            '@@@ The Gaussian kernel window size must be odd: {}'.format(
+                x_size
+                )
+            )
+
+    x = np.arange(x_size) - x_size // 2
+    kernel = np.exp(-0.5 * (x / stddev)**2)
+
+    return kernel / kernel.sum()
+
+
+def convolve_extend(source, kernel):
+    """
+    Convolves the rows of <source> with the normalized <kernel>,
+    as astropy.convolution.convolve with boundary='extend'.
+
+    The rows are extended with their edge values. NaN values are
+    interpolated from the neighbouring values with the kernel weights
+    and stay NaN only when the whole window is NaN.
+
+    All rows are convolved at once: directly for short kernels or
+    short rows and with FFT otherwise. Arrays with NaN values are
+    always convolved directly, the FFT rounding errors would be
+    amplified by the interpolation.
+
+    Parameters:
+        source (np.ndarray): the residues are in the last axis.
+
+        kernel (np.ndarray): 1D, odd size.
+
+    Returns:
+        np.ndarray, the shape of <source>.
+    """
+    source = np.asarray(source, dtype=np.float64)
+    half = kernel.size // 2
+    padded = np.pad(
+        source,
+        [(0, 0)] * (source.ndim - 1) + [(half, half)],
+        mode='edge'
+        )
+    valid = ~np.isnan(padded)
+
+    def direct(array):
+        # read only view of the kernel.size windows along the last axis
+        array = np.ascontiguousarray(array)
+        windows = np.lib.stride_tricks.as_strided(
+            array,
+            shape=array.shape[:-1] \
+                + (array.shape[-1] - kernel.size + 1, kernel.size),
+            strides=array.strides + array.strides[-1:],
+            writeable=False
+            )
+        return windows @ kernel[::-1]
+
+    if valid.all():
+        if kernel.size <= FFT_MIN_WINDOW \
+                or source.shape[-1] <= FFT_MIN_LENGTH:
+            return direct(padded)
+
+        size = padded.shape[-1] + kernel.size - 1
+        full = np.fft.irfft(
+            np.fft.rfft(padded, n=size) * np.fft.rfft(kernel, n=size),
+            n=size
+            )
+
+        return full[..., 2 * half:padded.shape[-1]]
+
+    # the kernel weights of the values that are not NaN
+    weights = direct(valid.astype(np.float64))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(
+            weights > 0,
+            direct(np.where(valid, padded, 0.)) / weights,
+            np.nan
+            )
+
+
+@register_calculation('delta')
+def _delta(context, source):
+    """Chemical shift differences, see cs_diffs()."""
+    return cs_diffs(source, context.missing, context.cs_missing, context.axis)
+
+
+@register_calculation('ratio')
+def _ratio(context, source):
+    """Ratio to the reference experiment, see ratio()."""
+    return ratio(source, axis=context.axis)
+
+
+@register_calculation('csp')
+def _csp(context, pos1, pos2):
+    """Chemical Shift Perturbations, see csp_willi()."""
+    return csp_willi(context.alpha, pos1, pos2)
+
+
+@register_calculation('delta_pre')
+def _delta_pre(context, theo_pre, source):
+    """
+    Difference between the theoretical and the experimental PRE,
+    negative values are set to 0.
+    """
+    delta = theo_pre - source
+
+    return np.where(delta < 0, 0., delta)
+
+
+@register_calculation('gaussian_smooth', cube=False)
+def _gaussian_smooth(context, source, x_size=7, stddev=1):
+    """
+    Convolution along the residues with a normalized 1D Gaussian
+    kernel of window <x_size> and standard deviation <stddev>.
+    """
+    return convolve_extend(source, gaussian_kernel(stddev, x_size))
+
+
+class CalcContext:
+    """
+    The information on the data set the calculation kernels run on.
+
+    Attributes:
+        axis (int): the series axis of the arrays.
+
+        cs_missing (str): see cs_diffs().
+
+        missing (np.ndarray): boolean, True for the missing peaks.
+
+        alpha (np.ndarray): the CSP normalization factor of each residue.
+    """
+
+    def __init__(self, axis, cs_missing, missing, alpha):
+        """
+        Parameters:
+            axis (int): the series axis.
+
+            cs_missing (str): see cs_diffs().
+
+            missing, alpha (function): return the .missing and .alpha
+                arrays, called once when first needed.
+        """
+        self.axis = axis
+        self.cs_missing = cs_missing
+        self._get_missing = missing
+        self._get_alpha = alpha
+        self._missing = None
+        self._alpha = None
+
+    @property
+    def missing(self):
+        if self._missing is None:
+            self._missing = self._get_missing()
+
+        return self._missing
+
+    @property
+    def alpha(self):
+        if self._alpha is None:
+            self._alpha = self._get_alpha()
+
+        return self._alpha
+
+
+class CalculationGraph:
+    """
+    Resolves the dependencies of a list of CalcSteps and performs them.
+
+    A step depends on the steps that calculate its input columns.
+    Steps are performed by levels: the steps of a level only depend on
+    the previous levels and can run concurrently.
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        columns = [step.column for step in self.steps]
+        duplicated = {c for c in columns if columns.count(c) > 1}
+
+        if duplicated:
+            raise ValueError(
+                'Columns calculated more than once: {}'.format(
+                    sorted(duplicated)
+                    )
+                )
+
+        unknown = [
+            step.calculation for step in self.steps
+            if step.calculation not in CALCULATIONS
+            ]
+
+        if unknown:
+            raise ValueError('Unknown calculations: {}'.format(unknown))
+
+    def levels(self, existing, done=(), cube=False):
+        """
+        Sorts the steps in dependency levels.
+
+        Parameters:
+            existing (iterable): the columns available as inputs.
+
+            done (iterable): the columns already calculated, their
+                steps are not performed again.
+
+            cube (bool): leaves out the steps whose kernel cannot run
+                over the Farseer-NMR Cube, see register_calculation().
+
+        Returns:
+            the list of levels, each a list of CalcSteps, and the list
+            of the CalcSteps whose inputs are not available.
+        """
+        known = set(existing) | set(done)
+        pending = [step for step in self.steps if step.column not in done]
+        levels = []
+
+        def performable(step):
+            return all(col in known for col in step.inputs) \
+                and (not cube or CALCULATIONS[step.calculation].cube)
+
+        while pending:
+            level = [step for step in pending if performable(step)]
+
+            if not level:
+                break
+
+            levels.append(level)
+            known.update(step.column for step in level)
+            pending = [step for step in pending if step not in level]
+
+        return levels, pending
+
+    def run(
+            self,
+            existing,
+            get_column,
+            set_column,
+            context,
+            done=(),
+            cube=False,
+            max_workers=1):
+        """
+        Performs the steps.
+
+        Parameters:
+            existing, done, cube: see .levels().
+
+            get_column (function): column name -> np.ndarray.
+
+            set_column (function): stores a calculated column, called
+                in the order of the steps once all are performed.
+
+            context (CalcContext): passed to the kernels.
+
+            max_workers (int): number of threads that perform the
+                steps of each level.
+
+        Returns:
+            the list of calculated columns and the list of the
+            CalcSteps whose inputs are not available.
+        """
+        levels, unresolved = self.levels(existing, done=done, cube=cube)
+        results = {}
+
+        def read(col):
+            return results[col] if col in results else get_column(col)
+
+        def compute(step):
+            return CALCULATIONS[step.calculation](
+                context,
+                *[read(col) for col in step.inputs],
+                **step.params
+                )
+
+        for level in levels:
+            if max_workers > 1 and len(level) > 1:
+                with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                    level_results = list(pool.map(compute, level))
+
+            else:
+                level_results = [compute(step) for step in level]
+
+            results.update(
+                (step.column, result)
+                for step, result in zip(level, level_results)
+                )
+
+        calculated = [
+            step.column for step in self.steps if step.column in results
+            ]
+
+        for col in calculated:
+            set_column(col, results[col])
+
+        return calculated, unresolved
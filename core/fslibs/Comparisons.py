@@ -26,6 +26,7 @@ import numpy as np
 import pandas as pd
 import core.fslibs.Logger as Logger
 from core.fslibs.WetHandler import WetHandler as fsw
+from core.fslibs.TypedCube import TypedCube
 
 class Comparisons:
     """
@@ -43,14 +44,16 @@ class Comparisons:
         dimension (str): identifies the main dimension axis of the class
             where X = along_x, Y = along_y, Z = along_z
         
-        hyper_panel (5-dimension pandas.Panel): converted from dictionary     
-            stores all the main axis series.
+        hyper_cube (TypedCube): converted from dictionary, stores all
+            the main axis series. Axes are (cool, labels, items), where
+            cool and labels are the first and second level keys of the
+            dictionary and items the series data points.
         
         other_dim_keys (lst): ordered list containing the previous and next
             dimension names, same nomenclature as 'dimension'.
         
         all_next_dim (dict): stores all the series of parsed data along
-            the next dimension. Series are parsed from hyper_panel.
+            the next dimension. Series are parsed from hyper_cube.
         
         all_prev_dim (dict): same as all_next_dim but for the previous axis.
         
@@ -74,23 +77,27 @@ class Comparisons:
         self.logger = Logger.FarseerLogger(__name__).setup_log()
         self.logger.debug('logger initiated')
         
-        self.p5d = pd.core.panelnd.create_nd_panel_factory(
-            klass_name='Panel5D',
-            orders=['cool', 'labels', 'items', 'major_axis', 'minor_axis'],
-            slices={
-                'labels': 'labels',
-                'items': 'items',
-                'major_axis': 'major_axis',
-                'minor_axis': 'minor_axis'
-                    },
-            slicer=pd.Panel4D,
-            aliases={'major': 'index', 'minor': 'minor_axis'},
-            stat_axis=2
-            )
         # condition/dimension over which the calculations where
         # performed
         self.dimension = selfdim
-        self.hyper_panel = self.p5d(dimension_dict)
+        cool = sorted(dimension_dict)
+        labels = sorted(dimension_dict[cool[0]])
+        items = list(dimension_dict[cool[0]][labels[0]].items)
+        self.hyper_cube = TypedCube.from_peaklists(
+            {
+                dp2: {
+                    dp1: {
+                        item: series.loc[item]
+                        for item in items
+                        }
+                    for dp1, series in dimension_dict[dp2].items()
+                    }
+                for dp2 in cool
+                },
+            cool,
+            labels,
+            items
+            )
         # stores the dimension keys over which the comparisons
         # will be performed
         self.other_dim_keys = other_dim_keys
@@ -160,25 +167,28 @@ class Comparisons:
             'GENERATING COMPARISONS FOR **{}** ALONG {}: {}'.format(
                     self.dimension,
                     self.other_dim_keys[0],
-                    list(self.hyper_panel.labels)
+                    self.hyper_cube.coords[1]
                     ),
             istitle=True
             )
         
-        if len(self.hyper_panel.labels) > 1:
-            for dp2 in self.hyper_panel.items:
+        if len(self.hyper_cube.coords[1]) > 1:
+            # (items, cool, labels) view of the cube
+            next_cube = self.hyper_cube.transpose(2, 0, 1)
+            
+            for dp2 in self.hyper_cube.coords[2]:
                 self.all_next_dim.setdefault(dp2, {})
                 
-                for dp1 in self.hyper_panel.cool:
-                    comparison = series_class(
-                        np.array(self.hyper_panel.loc[dp1,:,dp2,:,:]),
-                        items=self.hyper_panel.labels,
-                        minor_axis=self.hyper_panel.minor_axis,
-                        major_axis=self.hyper_panel.major_axis
+                for dp1 in self.hyper_cube.coords[0]:
+                    labels, columns, _ = next_cube.series_block(
+                        dp2,
+                        dp1,
+                        decode=False
                         )
+                    comparison = series_class(columns, items=labels)
                     comparison.create_attributes(
                         series_axis='C{}'.format(self.dimension[-1]), 
-                        series_dps=self.hyper_panel.labels, 
+                        series_dps=labels, 
                         next_dim=dp1,
                         prev_dim=dp2,
                         dim_comparison=self.other_dim_keys[0],
@@ -189,7 +199,7 @@ class Comparisons:
             self.logs('** Generated comparison dictionary')
             self.has_points_next_dim = True
         
-        elif len(self.hyper_panel.labels) <= 1:
+        elif len(self.hyper_cube.coords[1]) <= 1:
             self.logs('*** There are no points to compare along {}'.\
                 format(self.other_dim_keys[0]))
         
@@ -215,25 +225,28 @@ class Comparisons:
             'GENERATING COMPARISONS FOR **{}** ALONG {}: {}'.format(
                     self.dimension,
                     self.other_dim_keys[1],
-                    list(self.hyper_panel.cool)
+                    self.hyper_cube.coords[0]
                     ),
             istitle=True
             )
         
-        if len(self.hyper_panel.cool) > 1:
-            for dp2 in self.hyper_panel.labels:
+        if len(self.hyper_cube.coords[0]) > 1:
+            # (labels, items, cool) view of the cube
+            prev_cube = self.hyper_cube.transpose(1, 2, 0)
+            
+            for dp2 in self.hyper_cube.coords[1]:
                 self.all_prev_dim.setdefault(dp2, {})
                 
-                for dp1 in self.hyper_panel.items:
-                    comparison = series_class(
-                        np.array(self.hyper_panel.loc[:,dp2,dp1,:,:]),
-                        items=self.hyper_panel.cool,
-                        minor_axis=self.hyper_panel.minor_axis,
-                        major_axis=self.hyper_panel.major_axis
+                for dp1 in self.hyper_cube.coords[2]:
+                    cool, columns, _ = prev_cube.series_block(
+                        dp2,
+                        dp1,
+                        decode=False
                         )
+                    comparison = series_class(columns, items=cool)
                     comparison.create_attributes(
                         series_axis='C{}'.format(self.dimension[-1]), 
-                        series_dps=self.hyper_panel.cool, 
+                        series_dps=cool, 
                         next_dim=dp1,
                         prev_dim=dp2,
                         dim_comparison=self.other_dim_keys[1],
@@ -244,7 +257,7 @@ class Comparisons:
             self.logs('** Generated comparison dictionary')
             self.has_points_prev_dim = True
             
-        elif len(self.hyper_panel.labels) <= 1:
+        elif len(self.hyper_cube.coords[0]) <= 1:
             self.logs('*** There are no points to compare along {}'.\
                 format(self.other_dim_keys[1]))
         
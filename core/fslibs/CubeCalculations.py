@@ -0,0 +1,214 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import numpy as np
+
+import core.fslibs.Logger as Logger
+from core.fslibs.Calculations import CalcContext, CalculationGraph, \
+    calc_step, csp_alpha_table, residue_alpha
+from core.fslibs.TypedCube import TypedCube
+
+# position of each series axis in the (z, y, x, residue) cube arrays
+CUBE_AXES = {'x': 2, 'y': 1, 'z': 0}
+
+
+class CubeCalculations:
+    """
+    Performs the FarseerSeries calculations over the whole Farseer-NMR
+    Cube at once.
+
+    Each calculation is computed with a single array operation over
+    the (z, y, x, residue) cube arrays for the series along every
+    requested axis, the reference experiment of each series being
+    the first point of the axis. The results are handed to the
+    FarseerSeries as precalculated columns by .series_cube().
+
+    Provides the same calculation methods as FarseerSeries, so that
+    FarseerNMR.perform_calcs() runs on both.
+
+    Attributes:
+        cube (TypedCube): the Farseer-NMR Cube.
+
+        along_axes (list): the series axes, {'x', 'y', 'z'}.
+
+        results (dict): axis -> {column name: (z, y, x, residue)
+            np.ndarray} with the calculated columns in calculation order.
+    """
+
+    def __init__(
+            self,
+            cube,
+            along_axes,
+            cs_missing='prev',
+            csp_alpha4res=None):
+        """
+        Parameters:
+            cube (TypedCube): the Farseer-NMR Cube.
+
+            along_axes (list): the series axes, {'x', 'y', 'z'}.
+
+            cs_missing (str): see Calculations.cs_diffs().
+
+            csp_alpha4res (dict): the output of
+                Calculations.csp_alpha_table().
+        """
+        self.logger = Logger.FarseerLogger(__name__).setup_log()
+        self.cube = cube
+        self.along_axes = list(along_axes)
+        self.cs_missing = cs_missing
+        self.csp_alpha4res = csp_alpha4res or csp_alpha_table()
+        self.results = {axis: {} for axis in self.along_axes}
+        # padding rows of the shorter peaklists stay NaN
+        self.padding = cube.is_missing('ResNo')
+        # filled when first needed, see .missing and .alpha
+        self._missing = None
+        self._alpha = None
+
+    @property
+    def missing(self):
+        """True for the missing peaks."""
+        if self._missing is None:
+            self._missing = self.cube.isin('Peak Status', ['missing'])
+
+        return self._missing
+
+    @property
+    def alpha(self):
+        """The CSP normalization factor of each residue."""
+        if self._alpha is None:
+            self._alpha = residue_alpha(
+                self.cube.codes['1-letter'],
+                self.cube.categories['1-letter'],
+                self.csp_alpha4res
+                )
+
+        return self._alpha
+
+    def _store(self, axis, calccol, array):
+        array = np.asarray(array, dtype=np.float64)
+        array[self.padding] = np.nan
+        self.results[axis][calccol] = array
+        self.logger.debug('Calculated {} along {}'.format(calccol, axis))
+
+        return None
+
+    def _column(self, axis, col):
+        """Calculated columns along <axis> or cube columns."""
+        if col in self.results[axis]:
+            return self.results[axis][col]
+
+        return self.cube.column(col)
+
+    def calculate(self, steps, max_workers=1):
+        """
+        Performs the calculation <steps> for the series along each axis,
+        see Calculations.CalculationGraph.
+
+        Steps whose inputs are not Cube columns, or whose kernel cannot
+        run over the Cube, are left to the FarseerSeries.
+
+        Parameters:
+            steps (list): Calculations.CalcStep instances.
+
+            max_workers (int): number of threads that perform the
+                independent steps.
+        """
+        graph = CalculationGraph(steps)
+
+        for axis in self.along_axes:
+            context = CalcContext(
+                CUBE_AXES[axis],
+                self.cs_missing,
+                lambda: self.missing,
+                lambda: self.alpha
+                )
+            _, unresolved = graph.run(
+                self.cube.minor_axis,
+                lambda col: self._column(axis, col),
+                lambda col, array: self._store(axis, col, array),
+                context,
+                done=self.results[axis],
+                cube=True,
+                max_workers=max_workers
+                )
+
+            if unresolved:
+                self.logger.debug(
+                    'Left to the series along {}: {}'.format(
+                        axis,
+                        [step.column for step in unresolved]
+                        )
+                    )
+
+        return None
+
+    def calc_cs_diffs(self, calccol, sourcecol):
+        """
+        Calculates the difference of <sourcecol> to the reference
+        experiment of each series, see Calculations.cs_diffs().
+        """
+        self.calculate([calc_step(calccol, 'delta', [sourcecol])])
+
+        return None
+
+    def calc_ratio(self, calccol, sourcecol):
+        """
+        Calculates the ratio of <sourcecol> to the reference
+        experiment of each series.
+        """
+        self.calculate([calc_step(calccol, 'ratio', [sourcecol])])
+
+        return None
+
+    def calc_csp(self, calccol='CSP', pos1='PosF1_delta', pos2='PosF2_delta'):
+        """
+        Calculates the Chemical Shift Perturbation (CSP) values from
+        the calculated chemical shift differences, see
+        Calculations.csp_willi().
+        """
+        self.calculate([calc_step(calccol, 'csp', [pos1, pos2])])
+
+        return None
+
+    def columns(self, along_axis):
+        """Names of the columns calculated for the series <along_axis>."""
+        return list(self.results.get(along_axis, {}))
+
+    def series_cube(self, along_axis):
+        """
+        The Farseer-NMR Cube with the columns calculated for the
+        series <along_axis>. Arrays are not copied.
+
+        Returns:
+            TypedCube instance.
+        """
+        results = self.results.get(along_axis, {})
+
+        return TypedCube(
+            self.cube.coords,
+            self.cube.minor_axis \
+                + [c for c in results if c not in self.cube.minor_axis],
+            {**self.cube.numeric, **results},
+            self.cube.codes,
+            self.cube.categories,
+            self.cube.nrows
+            )
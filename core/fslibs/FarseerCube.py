@@ -26,11 +26,13 @@ import os
 import numpy as np
 import pandas as pd
 import itertools as it
+from concurrent.futures import ThreadPoolExecutor
 
 import core.fslibs.Logger as Logger
 from core.utils import aal1tol3, aal3tol1
 from core.fslibs.WetHandler import WetHandler as fsw
 from core.fslibs.FastaHandler import FastaHandler
+from core.fslibs.TypedCube import TypedCube
 
 class FarseerCube:
     """
@@ -46,8 +48,8 @@ class FarseerCube:
     
     Formats all the peaklists to the same size.
     
-    Generates the Farseer-NMR Cube: a 5-dimension Panel containing the
-    whole data set.
+    Generates the Farseer-NMR Cube: a typed (z, y, x, residue) array
+    store containing the whole data set (see TypedCube).
     
     Parameters:
         paths (list): absolute paths of all the input peaklists
@@ -77,7 +79,8 @@ class FarseerCube:
         hasxx, hasyy, haszz (bool): True if there are more than one data
             point along that dimension. False otherwise (default).
         
-        p5d (pandas.Panel): a 5-dimension pandas.Panel.
+        peaklists_cube, sidechains_cube (TypedCube): the Farseer-NMR
+            Cube of the backbone and sidechains peaklists.
     
         tmp_vars (dict): stored temporary variables for functions.
     """
@@ -85,7 +88,8 @@ class FarseerCube:
             self, spectra_path,
             has_sidechains=False,
             applyFASTA=False,
-            FASTAstart=1):
+            FASTAstart=1,
+            peaklist_cache=None):
         """
         Initiates the object,
         
@@ -99,6 +103,9 @@ class FarseerCube:
             information. Defaults to False.
         
         FASTAstart (int): The first residue in the FASTA file.
+        
+        peaklist_cache (PeaklistCache): if given, .csv peaklists are
+            read through the cache. Defaults to None.
         """
         self.logger = Logger.FarseerLogger(__name__).setup_log()
         #logging.config.dictConfig(fslogconf.farseer_log_config)
@@ -123,6 +130,7 @@ class FarseerCube:
         self.has_sidechains = has_sidechains
         self.FASTAstart = FASTAstart
         self.applyFASTA = applyFASTA
+        self.peaklist_cache = peaklist_cache
         # lists that contain axes datapoint names
         self.zzcoords = None
         self.yycoords = None
@@ -145,21 +153,6 @@ FASTA starting residue: {}  """.\
                 self.FASTAstart
                 )
         self.logs(input_log)
-        # initiates panel 5D object to initiate Farseer-NMR Cube
-        # in .init_Farseer_cube()
-        self.p5d = pd.core.panelnd.create_nd_panel_factory(
-            klass_name='Panel5D',
-            orders=['cool', 'labels', 'items', 'major_axis', 'minor_axis'],
-            slices={
-                'labels': 'labels',
-                'items': 'items',
-                'major_axis': 'major_axis',
-                'minor_axis': 'minor_axis'
-                },
-            slicer=pd.Panel4D,
-            aliases={'major': 'index', 'minor': 'minor_axis'},
-            stat_axis=2
-            )
         
     
     def _abort(self, wet):
@@ -372,13 +365,13 @@ or fasta files have not yet been read."
             # name of the fasta file being read
             f = list(self.allfasta[z][y].keys())[0]
             peaklist_first_residue = \
-                int(self.allpeaklists[z][y][x].loc[:,'ResNo'].head(n=1))
+                self.allpeaklists[z][y][x].loc[:,'ResNo'].iloc[0]
             peaklist_last_residue = \
-                int(self.allpeaklists[z][y][x].loc[:,'ResNo'].tail(n=1))
+                self.allpeaklists[z][y][x].loc[:,'ResNo'].iloc[-1]
             fasta_first_residue = \
-                int(self.allfasta[z][y][f].loc[:,'ResNo'].head(n=1))
+                self.allfasta[z][y][f].loc[:,'ResNo'].iloc[0]
             fasta_last_residue = \
-                int(self.allfasta[z][y][f].loc[:,'ResNo'].tail(n=1))
+                self.allfasta[z][y][f].loc[:,'ResNo'].iloc[-1]
             
             if fasta_first_residue <= peaklist_first_residue \
                     and fasta_last_residue >= peaklist_last_residue:
@@ -538,7 +531,7 @@ Please correct your .fasta files.'
         
         return None
     
-    def _compare_peaklists_length(self, dp1, dp2, axis, df_dict):
+    def _compare_peaklists_length(self, dp1, dp2, axis, pkl_lengths):
         """
         Verifies if all peaklists in a series have the same number of 
         residues before a FarseerSeries object is created.
@@ -550,16 +543,11 @@ Please correct your .fasta files.'
             
             - axis (str): the axis long which the series will be generated.
             
-            - df_dict (dict:pd.DataFrame): A dictionary containing
-                pd.DataFrames corresponding to peaklists.
+            - pkl_lengths (dict:int): the number of residues of each
+                peaklist in the series.
         """
         
-        pkl_lengths = []
-        
-        for key, peaklist in df_dict.items():
-            pkl_lengths.append(peaklist.shape[0])
-        
-        if not(len(set(pkl_lengths))) == 1:
+        if not(len(set(pkl_lengths.values()))) == 1:
             msg = "Peaklists proposed for series [{}][{}] along {} axis have \
 different lengths.".\
                 format(dp2, dp1, axis[-1].upper())
@@ -655,6 +643,81 @@ different lengths.".\
         
         return
     
+    def _split_peaklists(
+            self,
+            allpkls,
+            sort_by,
+            ids,
+            input_dtypes,
+            new_columns,
+            keep_order_index=False):
+        """
+        Sorts the peaklists concatenated in .split_res_info() and
+        splits them back.
+        
+        Parameters:
+            allpkls (pd.DataFrame): the concatenated peaklists, indexed
+                by ('peaklist', 'row') levels.
+            
+            sort_by (list): columns to sort each peaklist by.
+            
+            ids (list): the peaklists to return, peaklists without rows
+                in <allpkls> are returned empty.
+            
+            input_dtypes (dict): peaklist -> pd.Series of the input column
+                types, for the peaklists whose columns differ from
+                those of the concatenation.
+            
+            new_columns (list): the columns added to the input peaklists.
+            
+            keep_order_index (bool): whether to index each peaklist by
+                the row order before sorting, otherwise the index
+                is reset.
+        
+        Returns:
+            dict, peaklist -> pd.DataFrame with the input file row
+            number in column 'index'.
+        """
+        pkl_id = np.asarray(allpkls.index.get_level_values('peaklist'))
+        # the row in the input file goes to the 'index' column
+        allpkls = allpkls.reset_index(level='peaklist', drop=True).\
+            rename_axis(None).reset_index()
+        # order of the rows in each peaklist before sorting
+        order_index = np.asarray(allpkls.groupby(pkl_id).cumcount())
+        order = np.asarray(allpkls.assign(_peaklist=pkl_id).\
+            sort_values(by=['_peaklist'] + sort_by, kind='mergesort').\
+            index)
+        allpkls = allpkls.iloc[order]
+        pkl_id = pkl_id[order]
+        order_index = order_index[order]
+        
+        starts = np.searchsorted(pkl_id, ids, side='left')
+        ends = np.searchsorted(pkl_id, ids, side='right')
+        peaklists = {}
+        
+        for i, start, end in zip(ids, starts, ends):
+            df = allpkls.iloc[start:end]
+            
+            if keep_order_index:
+                df.index = order_index[start:end]
+            
+            else:
+                df = df.reset_index(drop=True)
+            
+            if i in input_dtypes:
+                df = df.loc[
+                    :,
+                    ['index'] + list(input_dtypes[i].index) + new_columns
+                    ]
+                
+                for col, dtype in input_dtypes[i].items():
+                    if df[col].dtype != dtype:
+                        df[col] = df[col].astype(dtype)
+            
+            peaklists[i] = df
+        
+        return peaklists
+    
     def split_res_info(self):
         """
         Splits assignment information.
@@ -665,7 +728,7 @@ different lengths.".\
         ['ResNo', '1-letter', '3-letter', 'Peak Status']
 
         where:
-        'ResNo' is the residue number
+        'ResNo' is the residue number, as int
         '1-letter', is the 1-letter code residue name
         '3-letter', is the 3-letter code residue name if the assignment
             belongs to a side-chain resonance, a character 'a' or 'b'
@@ -673,27 +736,30 @@ different lengths.".\
         'Peak Status', assigns string 'measured' to identify the peaks
             present in this peaklist as experimentally measured.
         
+        All the peaklists are concatenated in a single pd.DataFrame,
+        steps 1 to 4 are performed once over the whole data set and the
+        result is split back to the peaklists.
+        
         Procedure:
         
         1. Extracts residue information from 'Assigned F1' column,
         separating the residue name from the residue number. This
-        creates a new pd.DataFrame with column names 'ResNo' and
-        '3-letter'.
+        creates the columns 'ResNo' and '3-letter'.
         
-            '1MetH' -> '1' and 'Met'
+            '1MetH' -> 1 and 'Met'
         
         2. Generates the 1-letter column code from the 3-letter code
-        column. In the same pd.DataFrame. 
+        column.
         
-        3. Concatenates the new generated pd.DataFrame with the input
-        peaklist pd.Dataframe. And adds column 'Peak Status' with value
-        'measured'.
+        3. Adds column 'Peak Status' with value 'measured'.
         
-            3.1 if peaklist is empty adds all dummy rows of type <missing>.
+            3.1 empty peaklists are replaced by dummy rows of type
+            <missing> with the residues of the reference peaklist.
         
-        4. Sorts the peaklist according to 'ResNo' just in case the
-        original .CSV file was not sorted. For correct sorting 'ResNo'
-        as to be set astype int and returned back to str.
+        4. Sorts the peaklists according to 'ResNo' just in case the
+        original .CSV file was not sorted. 'ResNo' is the integer
+        residue index used to align the peaklists along the whole
+        analysis, it is only formatted to str on output.
 
         (conditional). If sidechains are present in the peaklist:
         identifies the sidechains entries (rows) and counts the number
@@ -704,116 +770,157 @@ different lengths.".\
         title = 'IDENTIFIES RESIDUE INFORMATION FROM ASSIGNMENT COLUMN'
         self.logs(title, istitle=True)
         
-        for z, y, x in it.product(self.zzcoords, self.yycoords, self.xxcoords):
-            
-            # checks misleading chars
-            self._checks_misleading_chars(z, y, x)
-            
-            # Step 1
-            resInfo = \
-                self.allpeaklists[z][y][x].\
-                    loc[:,'Assign F1'].str.extract('(\d+)(.{3})', expand=True)
-            resInfo.columns = ['ResNo', '3-letter']
-            
-            # Step 2
-            resInfo.loc[:,'1-letter'] = \
-                resInfo.loc[:,"3-letter"].map(aal3tol1.get)
+        keys = list(it.product(self.zzcoords, self.yycoords, self.xxcoords))
+        frames = [self.allpeaklists[z][y][x] for z, y, x in keys]
+        # empty peaklists are filled from the reference after the split
+        full = [i for i, df in enumerate(frames) if not df.empty]
+        
+        # concatenates the data set, the first index level identifies
+        # the peaklist and the second the row in the peaklist file
+        allpkls = pd.concat(
+            [frames[i] for i in full],
+            keys=full,
+            names=['peaklist', 'row']
+            )
+        pkl_id = np.asarray(allpkls.index.get_level_values('peaklist'))
+        # columns added to the peaklists
+        new_columns = ['ResNo', '3-letter', '1-letter', 'Peak Status']
+        # the column types of each input peaklist, if they differ
+        # from those of the concatenation
+        input_dtypes = {
+            i: frames[i].dtypes for i in full
+            if not frames[i].dtypes.equals(allpkls.dtypes)
+            }
+        
+        # checks misleading chars
+        misleading = np.zeros(len(allpkls), dtype=bool)
+        
+        for col in ['Assign F1', 'Assign F2']:
+            misleading |= np.asarray(allpkls.loc[:,col].isnull())
+            misleading |= np.asarray(
+                allpkls.loc[:,col].str.strip().\
+                    str.contains('\W', regex=True, na=False),
+                dtype=bool
+                )
+        
+        for i in np.unique(pkl_id[misleading]):
+            # reports the first peaklist with errors
+            self._checks_misleading_chars(*keys[i])
+        
+        # Step 1
+        resInfo = \
+            allpkls.loc[:,'Assign F1'].str.extract('(\d+)(.{3})', expand=True)
+        allpkls['ResNo'] = resInfo.loc[:,0].astype(int)
+        allpkls.loc[:,'3-letter'] = resInfo.loc[:,1]
+        
+        # Step 2
+        allpkls.loc[:,'1-letter'] = \
+            allpkls.loc[:,'3-letter'].map(aal3tol1.get)
+        
+        # Step 3
+        # Adds the 'Peak Status' Column. All the peaks in the peaklist
+        # at this stage are peaks that have been measured and are
+        # identified in the NMR spectrum. Therefore all the peaks here
+        # are labeled as 'measured'. On later stages of the script
+        # peaks not identified will be added to the peaklist, and those
+        # peaks will be label as 'missing' or 'unassigned'.
+        allpkls.loc[:,'Peak Status'] = 'measured'
+        
+        # sidechains entries always end with an 'a' or 'b' in the AssignF1
+        # use of regex: http://www.regular-expressions.info/tutorial.html
+        # identify the sidechain rows
+        sidechains_bool = np.asarray(
+            allpkls.loc[:,'Assign F1'].str.contains('[^HN]$', na=False),
+            dtype=bool
+            )
+        sd_count = np.bincount(pkl_id[sidechains_bool], minlength=len(keys))
+        
+        self.logger.debug("sidechain entries: {}".format(sd_count))
+        
+        if sidechains_bool.any():
+            self.logger.debug("Is self.allsidechains? {}".format(bool(self.allsidechains)))
+            # DataFrame with side chains
+            sidechains = allpkls.loc[sidechains_bool,:].copy()
+            # adds sidechain nomenclature
+            sidechains.loc[:,'ATOM'] = \
+                sidechains.loc[:,'Assign F1'].\
+                    str.split('[HN]', expand=True).loc[:,1]
+            # sorted dataframe based on ResNo and ATOM 'a' 'b' type
+            split_sidechains = self._split_peaklists(
+                sidechains,
+                ['ResNo', 'ATOM'],
+                np.flatnonzero(sd_count),
+                input_dtypes,
+                new_columns + ['ATOM'],
+                keep_order_index=True
+                )
             
-            # Step 3
+            for i, df in split_sidechains.items():
+                z, y, x = keys[i]
+                self.allsidechains[z][y][x] = df
+        
+        # creates backbone peaklists without sidechains
+        backbone = allpkls.loc[~sidechains_bool,:]
+        
+        # Step 4
+        duplicates = np.asarray(
+            backbone.loc[:,'ResNo'].to_frame().\
+                assign(peaklist=pkl_id[~sidechains_bool]).\
+                duplicated(keep=False)
+            )
+        
+        for i in np.unique(pkl_id[~sidechains_bool][duplicates]):
+            z, y, x = keys[i]
             self.allpeaklists[z][y][x] = \
-                pd.concat([self.allpeaklists[z][y][x], resInfo], axis=1)
-            
-            # Adds the 'Peak Status' Column. All the peaks in the peaklist
-            # at this stage are peaks that have been measured and are
-            # identified in the NMR spectrum. Therefore all the peaks here
-            # are labeled as 'measured'. On later stages of the script
-            # peaks not identified will be added to the peaklist, and those
-            # peaks will be label as 'missing' or 'unassigned'.
-            try:
-                self.allpeaklists[z][y][x].loc[:,'Peak Status'] = 'measured'
-            
-            except ValueError:
-                # if the peaklist is an empty file containing only the header.
-                self.allpeaklists[z][y][x] = \
-                    self.allpeaklists[z][y][self.xxref].copy()
-                self.allpeaklists[z][y][x].\
-                    loc[:,[
-                        'Peak Status',
-                        'Merit',
-                        'Position F1',
-                        'Position F2',
-                        'Height',
-                        'Volume',
-                        'Line Width F1 (Hz)',
-                        'Line Width F2 (Hz)'
-                        ]
-                    ] = [
-                            'missing',
-                            np.nan,
-                            np.nan,
-                            np.nan,
-                            np.nan,
-                            np.nan,
-                            np.nan,
-                            np.nan
-                            ]
-            
-            # sidechains entries always end with an 'a' or 'b' in the AssignF1
-            # use of regex: http://www.regular-expressions.info/tutorial.html
-            # identify the sidechain rows
-            sidechains_bool = \
-                self.allpeaklists[z][y][x].\
-                    loc[:,'Assign F1'].str.contains('[^HN]$')
-            self.has_sidechains = any(sidechains_bool)
-            
-            self.logger.debug("sidechains_bool.value_counts(): {}".format(
-                sidechains_bool.value_counts()
-                ))
-            self.logger.debug("Any? {}".format(self.has_sidechains))
-            # initiates SD counter
-            sd_count = {True:0}
-            
-            # if the user says it has sidechains and there are actually sidechains.
-            
-            if self.has_sidechains:
-                
-                self.logger.debug("<has_sidechains> set to: {}".format(self.has_sidechains))
-                self.logger.debug("Is self.allsidechains? {}".format(bool(self.allsidechains)))
-                
-                # two condition are evaluated in case the user has set 
-                #sidechains to True but there are actually no sidechains.
-                sd_count = sidechains_bool.value_counts()
-                # DataFrame with side chains
-                self.allsidechains[z][y][x] = \
-                    self.allpeaklists[z][y][x].loc[sidechains_bool,:]
-                # adds sidechain nomenclature
-                self.allsidechains[z][y][x].loc[:,'ATOM'] = \
-                    self.allsidechains[z][y][x].loc[:,'Assign F1'].\
-                        str.split('[HN]', expand=True).loc[:,1]
-                # resets index
-                self.allsidechains[z][y][x].reset_index(inplace=True)
-                # ResNo column to int preparing for reindex
-                self.allsidechains[z][y][x].loc[:,'ResNo'] = \
-                    self.allsidechains[z][y][x]['ResNo'].astype(int)
-                # sorted dataframe based on ResNo and ATOM 'a' 'b' type
-                self.allsidechains[z][y][x].\
-                    sort_values(by=['ResNo','ATOM'] , inplace=True)
-                # revers ResNo to string
-                self.allsidechains[z][y][x].loc[:,'ResNo'] = \
-                    self.allsidechains[z][y][x]['ResNo'].astype(str)
-                # creates backbone peaklist without sidechains
-                self.allpeaklists[z][y][x] = \
-                    self.allpeaklists[z][y][x].loc[-sidechains_bool,:]
-            
-            # Step 4
+                backbone.xs(i, level='peaklist').rename_axis(None)
+            # reports the first peaklist with repeated residues
             self._check_res_duplicates(self.allpeaklists, z, y, x)
-            self.allpeaklists[z][y][x].loc[:,'ResNo'] = \
-                self.allpeaklists[z][y][x]['ResNo'].astype(int)
-            self.allpeaklists[z][y][x].sort_values(by='ResNo', inplace=True)
-            self.allpeaklists[z][y][x].loc[:,'ResNo'] = \
-                self.allpeaklists[z][y][x].loc[:,'ResNo'].astype(str)
-            self.allpeaklists[z][y][x].reset_index(inplace=True)
-            
+        
+        split_backbone = self._split_peaklists(
+            backbone,
+            ['ResNo'],
+            full,
+            input_dtypes,
+            new_columns
+            )
+        
+        for i, df in split_backbone.items():
+            z, y, x = keys[i]
+            self.allpeaklists[z][y][x] = df
+        
+        # Step 3.1
+        for i in sorted(set(range(len(keys))) - set(full)):
+            # if the peaklist is an empty file containing only the header.
+            z, y, x = keys[i]
+            self.allpeaklists[z][y][x] = \
+                self.allpeaklists[z][y][self.xxref].copy()
+            self.allpeaklists[z][y][x].\
+                loc[:,[
+                    'Peak Status',
+                    'Merit',
+                    'Position F1',
+                    'Position F2',
+                    'Height',
+                    'Volume',
+                    'Line Width F1 (Hz)',
+                    'Line Width F2 (Hz)'
+                    ]
+                ] = [
+                        'missing',
+                        np.nan,
+                        np.nan,
+                        np.nan,
+                        np.nan,
+                        np.nan,
+                        np.nan,
+                        np.nan
+                        ]
+        
+        # the last peaklist defines the flag, as when the peaklists
+        # were processed one by one.
+        self.has_sidechains = bool(sd_count[-1])
+        
+        for i, (z, y, x) in enumerate(keys):
             # Writes sanity check
             if {'1-letter', 'ResNo', '3-letter', 'Peak Status'}.\
                     issubset(self.allpeaklists[z][y][x].columns):
@@ -832,8 +939,8 @@ different lengths.".\
                     x,
                     columns_OK,
                     self.has_sidechains,
-                    (True in sidechains_bool.value_counts()),
-                    sd_count[True]
+                    bool(sd_count[i]),
+                    sd_count[i]
                     )
             
             self.logs(logs)
@@ -856,10 +963,7 @@ different lengths.".\
         """
         
         # confirms correct input
-        if isinstance(ref_res, int):
-            ref_res = str(ref_res)
-        
-        else:
+        if not isinstance(ref_res, int):
             msg = \
 'Argument ref_res for method .correct_shifts_backbone() must be of type <int>.'
             self.logs(msg)
@@ -952,15 +1056,32 @@ different lengths.".\
         
         return None
     
-    def seq_expand(self, ref_pkl, target_pkl, resonance_type, fillna):
+    def _residue_key(self, pkl, resonance_type):
         """
-        Expands a <target> peaklist to the size of the <reference>.
-        Adds rows of missing residues.
+        The residue identifiers of a peaklist: the integer ResNo for
+        backbone and the (ResNo, ATOM) pair for sidechains.
+        
+        Returns:
+            list of the key column names and list of their values
+            as np.ndarrays.
+        """
+        names = ['ResNo', 'ATOM'] if resonance_type == 'Sidechains' \
+            else ['ResNo']
+        
+        return names, [np.asarray(pkl.loc[:,col]) for col in names]
+    
+    def seq_expand_batch(self, ref_pkl, target_pkls, resonance_type, fillna):
+        """
+        Expands several <target> peaklists to the size of the
+        <reference>. Adds rows of missing residues.
+        
+        The reference residue index is computed once and all the
+        targets are expanded in a single aligned reindex.
         
         Parameters:
             ref_pkl (pd.DataFrame): the reference peaklist
             
-            target_pkl (pd.DataFrame): the target peaklist
+            target_pkls (list): the target peaklists (pd.DataFrame)
             
             resonance_type (str): {'Backbone'. 'Sidechain'}
             
@@ -971,59 +1092,117 @@ different lengths.".\
                      'Details': 'None'}
         
         Returns:
-            The expanded pd.DataFrame
-            A list with information on the peaklist length evolution
-                [target initial length, ref length, target final length]
+            A list with a tuple for each target:
+                the expanded pd.DataFrame
+                a list with information on the peaklist length evolution
+                    [target initial length, ref length, target final length]
         """
-        # merges ResNo and ATOM cols to keep sorted
-        if resonance_type=='Sidechains':
-            ref_pkl.loc[:,'ResNo'] = \
-                ref_pkl.loc[:,['ResNo', 'ATOM']].\
-                    apply(lambda x: ''.join(x), axis=1)
-            target_pkl.loc[:,'ResNo'] = \
-                target_pkl.loc[:,['ResNo', 'ATOM']].\
-                    apply(lambda x: ''.join(x), axis=1)
-        
-        # creates an index based on the residue numbers of the reference
-        # peaklist
-        ind = ref_pkl.loc[:,'ResNo']
+        # the index of residues in the reference peaklist,
+        # ATOM is a sub-key of ResNo for sidechains
+        key_names, ind = self._residue_key(ref_pkl, resonance_type)
         # reads size of reference index
-        length_ind = ind.size 
-        # reads size of target peaklist
-        target_ind_init_len = target_pkl.shape[0]
-        # expands the target peaklist to the new index
+        length_ind = ref_pkl.shape[0]
+        ntargets = len(target_pkls)
+        # reads size of target peaklists
+        target_lengths = [target.shape[0] for target in target_pkls]
+        
+        targets = pd.concat(target_pkls, ignore_index=True)
+        targets.index = pd.MultiIndex.from_arrays(
+            [np.repeat(np.arange(ntargets), target_lengths)]
+                + self._residue_key(targets, resonance_type)[1],
+            names=['peaklist'] + key_names
+            )
+        
+        # expands the target peaklists to the reference index
         try:
-            target_pkl = \
-                target_pkl.set_index('ResNo').\
-                    reindex(ind).reset_index().fillna(fillna)
+            targets = \
+                targets.drop(columns='ResNo').\
+                    reindex(
+                        pd.MultiIndex.from_arrays(
+                            [np.repeat(np.arange(ntargets), length_ind)]
+                                + [np.tile(key, ntargets) for key in ind],
+                            names=['peaklist'] + key_names
+                            )
+                        ).\
+                    reset_index(level='ResNo')
         except ValueError:
             msg = "Farseer-NMR could not reindex this peaklist. There are \
 several input errors that may occur in this case. Read the Documentation for \
 more details." 
             self._abort(fsw(msg_title='ERROR', msg=msg, wet_num=24))
         
-        # reads length of the expanded peaklist
-        target_ind_final_len = target_pkl.shape[0]
+        # the added rows have no 'Peak Status' until filled
+        has_added_rows = np.asarray(targets.loc[:,'Peak Status'].isnull()).\
+            reshape(ntargets, length_ind).any(axis=1)
+        targets = targets.fillna(fillna)
+        
         # transfers information of the different columns
-        # from the reference to the expanded peaklist
-        target_pkl.loc[:,'3-letter'] = ref_pkl.loc[:,'3-letter']
-        target_pkl.loc[:,'1-letter'] = ref_pkl.loc[:,'1-letter']
-        target_pkl.loc[:,'Assign F1'] = ref_pkl.loc[:,'Assign F1']
-        target_pkl.loc[:,'Assign F2'] = ref_pkl.loc[:,'Assign F2']
+        # from the reference to the expanded peaklists
+        ref_cols = ['3-letter', '1-letter', 'Assign F1', 'Assign F2']
         
-        # reverts previous merge
         if resonance_type=='Sidechains':
-            target_pkl.loc[:,'ATOM'] = ref_pkl.loc[:,'ATOM']
-            target_pkl.loc[:,'ResNo'] = ref_pkl.loc[:,'ResNo'].str.extract('(\d+)', expand=False)
-            ref_pkl.loc[:,'ResNo'] = ref_pkl.loc[:,'ResNo'].str.extract('(\d+)', expand=False)
+            ref_cols += ['ATOM']
+        
+        for col in ref_cols:
+            targets[col] = np.tile(np.asarray(ref_pkl.loc[:,col]), ntargets)
+        
+        expanded = []
         
-        tmp_list = [
+        for i, target_ind_init_len in enumerate(target_lengths):
+            target_pkl = \
+                targets.iloc[i*length_ind:(i+1)*length_ind].\
+                    reset_index(drop=True)
+            
+            # numeric columns of peaklists without added rows keep
+            # their type, as when expanded one by one
+            if not has_added_rows[i]:
+                for col, dtype in target_pkls[i].dtypes.items():
+                    if col in fillna or dtype == object \
+                            or target_pkl[col].dtype == dtype:
+                        continue
+                    
+                    target_pkl[col] = target_pkl[col].astype(dtype)
+            
+            # reads length of the expanded peaklist
+            target_ind_final_len = target_pkl.shape[0]
+            tmp_list = [
                 target_ind_init_len, 
                 length_ind, 
                 target_ind_final_len
                 ]
+            expanded.append((target_pkl, tmp_list))
         
-        return target_pkl, tmp_list
+        return expanded
+    
+    def seq_expand(self, ref_pkl, target_pkl, resonance_type, fillna):
+        """
+        Expands a <target> peaklist to the size of the <reference>.
+        Adds rows of missing residues.
+        
+        Parameters:
+            ref_pkl (pd.DataFrame): the reference peaklist
+            
+            target_pkl (pd.DataFrame): the target peaklist
+            
+            resonance_type (str): {'Backbone'. 'Sidechain'}
+            
+            fillna (dict): a dictionary of kwargs that define the column
+                values of the newly generated rows. Example:
+                    {'Peak Status': <missing>,
+                     'Merit': 0.0,
+                     'Details': 'None'}
+        
+        Returns:
+            The expanded pd.DataFrame
+            A list with information on the peaklist length evolution
+                [target initial length, ref length, target final length]
+        """
+        return self.seq_expand_batch(
+            ref_pkl,
+            [target_pkl],
+            resonance_type,
+            fillna
+            )[0]
     
     def compares_references(
             self,
@@ -1086,51 +1265,34 @@ more details."
             return
             
         elif along_axis == 'z':
-            for y, z in it.product(self.yycoords, self.zzcoords):
-                if z == self.zzref:
-                    ref_pkl = target[z][y][self.xxref]
-                    refz = z
-                    refy = y
-                
-                target[z][y][self.xxref], popi = \
-                    self.seq_expand(
-                        ref_pkl.copy(), 
-                        target[z][y][self.xxref].copy(),
-                        resonance_type,
-                        fillna_dict
-                        )
-                logs = \
-"**[{}][{}][{}]** vs. [{}][{}][{}] \
-| Target Initial Length :: {} \
-| Template Length :: {} \
-| Target final length :: {}".\
-                    format(
-                        z,
-                        y,
-                        self.xxref,
-                        refz,
-                        refy,
-                        self.xxref,
-                        popi[0],
-                        popi[1],
-                        popi[2]
-                        )
-                self.logs(logs)
+            # [z][y] of the references, [z][y] of the targets
+            groups = [
+                (
+                    (self.zzref, y),
+                    [(z, y) for z in self.zzcoords]
+                    )
+                for y in self.yycoords
+                ]
         
         elif along_axis == 'y':
-            for z, y in it.product(self.zzcoords, self.yycoords):
-                if y == self.yyref:
-                    ref_pkl = target[z][y][self.xxref]
-                    refz = z
-                    refy = y
-        
-                target[z][y][self.xxref], popi = \
-                    self.seq_expand(
-                        ref_pkl.copy(),
-                        target[z][y][self.xxref].copy(),
-                        resonance_type,
-                        fillna_dict
-                        )
+            groups = [
+                (
+                    (z, self.yyref),
+                    [(z, y) for y in self.yycoords]
+                    )
+                for z in self.zzcoords
+                ]
+        
+        for (refz, refy), zys in groups:
+            expanded = self.seq_expand_batch(
+                target[refz][refy][self.xxref],
+                [target[z][y][self.xxref] for z, y in zys],
+                resonance_type,
+                fillna_dict
+                )
+            
+            for (z, y), (pkl, popi) in zip(zys, expanded):
+                target[z][y][self.xxref] = pkl
                 logs = \
 "**[{}][{}][{}]** vs. [{}][{}][{}] \
 | Target Initial Length :: {} \
@@ -1207,46 +1369,42 @@ more details."
             self.logs(msg)
             return
         
-        for z, y, x in it.product(self.zzcoords, self.yycoords, self.xxcoords):
+        for z, y in it.product(self.zzcoords, self.yycoords):
             # sets the reference peaklist
-            if x == self.xxref and missing == 'missing':
-                ref_pkl = target[z][y][x]
-                refz = z
-                refy = y
-                refx = x
-            
-            elif x == self.xxref and missing == 'unassigned':
-                ref_fasta_key = list(self.allfasta[z][y].keys())[0]
-                ref_pkl = self.allfasta[z][y][ref_fasta_key]
-                refz = z
-                refy = y
-                refx = ref_fasta_key
-            
-            target[z][y][x], popi = \
-                self.seq_expand(
-                    ref_pkl.copy(),
-                    target[z][y][x].copy(),
-                    resonance_type,
-                    fillna_dict
-                    )
+            if missing == 'missing':
+                ref_pkl = target[z][y][self.xxref]
+                refx = self.xxref
+            
+            elif missing == 'unassigned':
+                refx = list(self.allfasta[z][y].keys())[0]
+                ref_pkl = self.allfasta[z][y][refx]
+            
+            expanded = self.seq_expand_batch(
+                ref_pkl,
+                [target[z][y][x] for x in self.xxcoords],
+                resonance_type,
+                fillna_dict
+                )
             
-            logs = \
+            for x, (pkl, popi) in zip(self.xxcoords, expanded):
+                target[z][y][x] = pkl
+                logs = \
 "**[{}][{}][{}]** vs. [{}][{}][{}] \
 | Target Initial Length :: {} \
 | Template Length :: {} \
 | Target final length :: {}".\
-                format(
-                    z,
-                    y,
-                    x,
-                    refz,
-                    refy,
-                    refx,
-                    popi[0],
-                    popi[1],
-                    popi[2]
-                    )
-            self.logs(logs)
+                    format(
+                        z,
+                        y,
+                        x,
+                        z,
+                        y,
+                        refx,
+                        popi[0],
+                        popi[1],
+                        popi[2]
+                        )
+                self.logs(logs)
             
         return None
     
@@ -1395,29 +1553,55 @@ more details."
     
     def init_Farseer_cube(self, use_sidechains=False):
         """
-        Initiates the 5D Farseer-NMR Cube.
+        Initiates the Farseer-NMR Cube.
         
-        Uses self.p5d to create a 5D matrix with the information of all
-        the peaklists in the experimental dataset. The Cube will be
+        Uses TypedCube to store the information of all the peaklists
+        in the experimental dataset in typed (z, y, x, residue) arrays. The Cube will be
         accessed and used later to create the FarseerSeries objects,
         upon each the Farseer Analysis routines will be performed.
         
-        If there are sidechains, creates a Panel5D for the sidechains,
-        which are treated separately from the backbone residues.
+        If there are sidechains, creates a second cube for the
+        sidechains, which are treated separately from the backbone
+        residues.
         
         Generates:
-            - self.peaklists_p5d
-            - self.sidechains_p5d
+            - self.peaklists_cube
+            - self.sidechains_cube
         """
         
         self.logs('INITIATING FARSEER CUBE', istitle=True)
-        ## .copy() is used to solve issue_86
-        self.peaklists_p5d = self.p5d(self.allpeaklists.copy())
-        self.logs('> Created cube for all the backbone peaklists - OK!')
+        self.peaklists_cube = TypedCube.from_peaklists(
+            self.allpeaklists,
+            self.zzcoords,
+            self.yycoords,
+            self.xxcoords
+            )
+        self.logs(
+            '> Created cube for all the backbone peaklists ({:.1f} MB) - OK!'.\
+                format(self.peaklists_cube.nbytes / 1e6)
+            )
+        self.logger.debug(
+            'Backbone cube memory:\n{}'.format(
+                self.peaklists_cube.memory_report().to_string()
+                )
+            )
         
         if use_sidechains:
-            self.sidechains_p5d = self.p5d(self.allsidechains.copy())
-            self.logs('> Created cube for all the sidechains peaklists - OK!')
+            self.sidechains_cube = TypedCube.from_peaklists(
+                self.allsidechains,
+                self.zzcoords,
+                self.yycoords,
+                self.xxcoords
+                )
+            self.logs(
+                '> Created cube for all the sidechains peaklists ({:.1f} MB) - OK!'.\
+                    format(self.sidechains_cube.nbytes / 1e6)
+                )
+            self.logger.debug(
+                'Sidechains cube memory:\n{}'.format(
+                    self.sidechains_cube.memory_report().to_string()
+                    )
+                )
         
         return None
     
@@ -1425,7 +1609,8 @@ more details."
             self, series_class,
             along_axis='x',
             resonance_type='Backbone',
-            series_kwargs={}
+            series_kwargs={},
+            calculations=None
             ):
         """
         Creates a nested dictionary containing all the experimental
@@ -1450,21 +1635,31 @@ more details."
                 series_class.__init__.
         
             resonance_type (str): {'Backbone', 'Sidechains'}
+            
+            calculations (CubeCalculations): the calculations performed
+                over the <resonance_type> cube, the calculated columns
+                are added to the series.
         
         Returns:
             The nested dictionary of Farseer Series objects.
         """
         
         if resonance_type == 'Backbone':
-            fscube = self.peaklists_p5d
+            fscube = self.peaklists_cube
         
         elif resonance_type == 'Sidechains':
-            fscube = self.sidechains_p5d
+            fscube = self.sidechains_cube
         
         else:
             raise ValueError('Not a valid <resonance_type> option.')
         
+        if calculations is not None:
+            fscube = calculations.series_cube(along_axis)
+            series_kwargs['precalculated'] = \
+                calculations.columns(along_axis)
+        
         # transposes the Farseer-NMR cube according to the desired axis
+        # the transposed cube is a view, data is not copied
         if along_axis=='x':
             series_type='along_x'
             owndim_pts=self.xxcoords
@@ -1474,14 +1669,14 @@ more details."
         elif along_axis=='y':
             self._compare_fastas()
             series_type='along_y'
-            fscube = fscube.transpose(2,0,1,3,4, copy=True)
+            fscube = fscube.transpose(2,0,1)
             owndim_pts=self.yycoords
             next_axis = self.zzcoords
             next_axis_2 = self.xxcoords
         
         elif along_axis=='z':
             series_type='along_z'
-            fscube = fscube.transpose(1,2,0,3,4, copy=True)
+            fscube = fscube.transpose(1,2,0)
             owndim_pts=self.zzcoords
             next_axis = self.xxcoords
             next_axis_2 = self.yycoords
@@ -1505,26 +1700,27 @@ more details."
             series_kwargs['prev_dim'] = dp2
             series_kwargs['next_dim'] = dp1
             # initiates series
-            ## intermediate step to remove rows with NaN in ResNo column
+            ## rows with NaN in ResNo column are removed
             ## this is necessary to solve issue_86 where NaN rows
             ## are added if no fasta file is used to complete the residue
             ## list and when different constrcuts are used along y
-            ## which may lead to different number of rows when generating
-            ## the 5D panel - creating NaN rows that later conflict with
+            ## which may lead to different number of rows in the cube
+            ## - creating NaN rows that later conflict with
             ## parameter calculation.
-            dfdict = {}
-            
-            for item in fscube.loc[dp2, dp1, :, :, :].items:
-                df = fscube.loc[dp2, dp1, item, :, :]
-                df.dropna(axis=0, how='any', subset=['ResNo'], inplace=True)
-                dfdict[item] = df
-            
-            self._compare_peaklists_length(dp1, dp2, series_type, dfdict)
+            items, columns, lengths = \
+                fscube.series_block(dp2, dp1, dropna='ResNo', decode=False)
+            
+            self._compare_peaklists_length(
+                dp1,
+                dp2,
+                series_type,
+                dict(zip(items, lengths))
+                )
             
-            series_panel_NaN_filtered = pd.Panel.from_dict(dfdict)
             series_dct[dp2][dp1] = \
                 self.gen_series(
-                    series_panel_NaN_filtered,
+                    items,
+                    columns,
                     series_class,
                     series_kwargs
                     )
@@ -1536,15 +1732,17 @@ more details."
         
         return series_dct
     
-    def gen_series(self, series_panel, series_class, sc_kwargs):
+    def gen_series(self, items, columns, series_class, sc_kwargs):
         """
         Creates a Series object of class <series_class>.
         
         Argument initiation has to be synchronized with the class needs.
         
         Parameters:
-            series_panel (pd.Panel): contains the series to be converted
-                to series_class instance.
+            items (list): the names of the series data points.
+            
+            columns (dict): column name -> (items, residues) np.ndarray
+                with the series data.
             
             series_class (class): Farseer Series class.
             
@@ -1555,17 +1753,11 @@ more details."
             The series_class object.
         """
         
-        series_panel = \
-            series_class(
-                np.array(series_panel),
-                items=series_panel.items,
-                minor_axis=series_panel.minor_axis,
-                major_axis=series_panel.major_axis
-                )
+        series = series_class(columns, items=items)
         # activates the series attibutes
-        series_panel.create_attributes(**sc_kwargs)
+        series.create_attributes(**sc_kwargs)
         
-        return series_panel
+        return series
     
     def exports_parsed_pkls(self):
         """Exports the parsed peaklists of the whole dataset."""
@@ -1613,7 +1805,41 @@ more details."
         
         return None
     
-    def load_experiments(self, filetype='.csv', resonance_type='Backbone'):
+    def _reads_input_file(self, path, filetype, f):
+        """
+        Reads a single input file.
+        
+        Parameters:
+            path (str): the file path.
+            
+            filetype (str): {'.csv', '.fasta'}
+            
+            f (function): the function used to read '.csv' files.
+        
+        Returns:
+            pd.DataFrame, or None if the file is empty.
+        """
+        
+        try:
+            if filetype == '.csv':
+                return f(path)
+            
+            elif filetype == '.fasta':
+                fh = FastaHandler(
+                        fasta_file_path=path,
+                        fasta_start_num=self.FASTAstart
+                        )
+                fh.reads_fasta_to_dataframe(reads_from_file=True)
+                return fh.fasta_df
+        
+        except pd.errors.EmptyDataError:
+            return None
+    
+    def load_experiments(
+            self,
+            filetype='.csv',
+            resonance_type='Backbone',
+            workers=1):
         """
         Loads the <filetype> files in self.paths into nested
         dictionaries as pd.DataFrames.
@@ -1625,6 +1851,11 @@ more details."
             
             resonance_type (str): {'Backbone', 'Sidechains'}.
                 'Sidechains' only available for '.csv' <filetype>.
+            
+            workers (int): number of threads reading files concurrently.
+                Files are read sequentially if 1 (default). The nested
+                dictionaries are always assembled in the order of
+                self.paths.
         
         If filetype='.csv' and resonance_type='Backbone' executes
         self.init_coords_names()
@@ -1684,7 +1915,8 @@ more details."
         
         # defines functions to use and target storage dictionaries
         if filetype == '.csv' and resonance_type == 'Backbone':
-            f = pd.read_csv
+            f = self.peaklist_cache.read_csv if self.peaklist_cache \
+                else pd.read_csv
             target = self.allpeaklists
             main_peaklists=True
             
@@ -1693,6 +1925,7 @@ more details."
                 #msg = 'Do not attempt to load the .fasta files prior to the peaklist .csv files, please :-)'
                 #self.logs(fsw.gen_wet('ERROR', msg, 21))
                 #self._abort()
+            f = None  # FastaHandler is used
             target = self.allfasta
             
         elif filetype == '.csv' and resonance_type == 'Sidechains':
@@ -1706,8 +1939,9 @@ the possible options.'
                 )
             return None
         
-        # loads files in nested dictionaries
-        # piece of code found in stackoverflow, reference missing
+        # selects the files to read and their position in the
+        # nested dictionaries
+        to_read = []
         
         for p in self.paths:
             #https://stackoverflow.com/questions/8384737/extract-file-name-from-path-no-matter-what-the-os-path-format
@@ -1723,40 +1957,47 @@ the possible options.'
             self.logger.debug("y folder: {}".format(y_dir))
             self.logger.debug("z folder: {}".format(z_dir))
             
-            parts = [z_dir, y_dir]
-            self.logger.debug("parts: {}".format(parts))
-            
-            branch = target
-            
             if not x_file.endswith(filetype):
                 continue
             
-            for part in parts:
-                
-                branch = branch.setdefault(part, {})
+            # removes the '.csv' from the key name to increase
+            # asthetics in output
+            to_read.append((p, z_dir, y_dir, x_file.split('.')[0]))
+        
+        read_file = \
+            lambda path: self._reads_input_file(path, filetype, f)
+        paths = [path for path, *_ in to_read]
+        
+        if workers > 1 and len(paths) > 1:
+            self.logs(
+                '* reading {} files with {} threads'.format(len(paths), workers)
+                )
             
-            # reads the .csv file to a pd.DataFrame removes
-            # the '.csv' from the key name to increase asthetics in output
-            if x_file.lower().endswith(filetype):
-                self.logs('* {}'.format(p))
-                lessparts = x_file.split('.')[0]
-                
-                try:
-                    if filetype == '.csv':
-                        branch[lessparts] = branch.get(x_file, f(p))
-                    elif filetype == '.fasta':
-                        fh = FastaHandler(
-                                fasta_file_path=p,
-                                fasta_start_num=self.FASTAstart
-                                )
-                        fh.reads_fasta_to_dataframe(reads_from_file=True)
-                        branch[lessparts] = branch.get(x_file, fh.fasta_df)
-                
-                except pd.errors.EmptyDataError:
-                    msg = \
-"The file {} is empty. To introduce an empty data point, add the header.".\
-                        format(filetype)
-                    self._abort(fsw(msg_title='ERROR', msg=msg, wet_num=14))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                dataframes = list(executor.map(read_file, paths))
+        
+        else:
+            dataframes = [read_file(path) for path in paths]
+        
+        # loads files in nested dictionaries
+        empty_files = []
+        
+        for (p, z_dir, y_dir, x_key), df in zip(to_read, dataframes):
+            self.logs('* {}'.format(p))
+            
+            if df is None:
+                empty_files.append(p)
+                continue
+            
+            branch = target.setdefault(z_dir, {}).setdefault(y_dir, {})
+            branch[x_key] = df
+        
+        if empty_files:
+            msg = \
+"The following files are empty. To introduce an empty data point, \
+add the header: {}".\
+                format(', '.join(empty_files))
+            self._abort(fsw(msg_title='ERROR', msg=msg, wet_num=14))
         
         self._checks_xy_datapoints_coherency(target, filetype)
         
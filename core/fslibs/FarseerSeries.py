@@ -30,18 +30,43 @@ import itertools as it
 from pydoc import locate
 from math import ceil
 from matplotlib import pyplot as plt
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import offset_copy
+from matplotlib.backends.backend_pdf import PdfPages
 import datetime 
+from concurrent.futures import ProcessPoolExecutor
 
 import core.fslibs.Logger as Logger
 from core.fslibs.WetHandler import WetHandler as fsw
+from core.fslibs.FittingBase import FittingBase
+from core.fslibs.TypedPanel import TypedPanel
+from core.fslibs.Calculations import CalcContext, CalculationGraph, \
+    calc_step, csp_alpha_table, residue_alpha
 
-class FarseerSeries(pd.Panel):
+# characters written as mathtext commands in the text marks
+MATHTEXT_ESCAPES = {
+    '\\': r'\backslash',
+    '$': r'\$',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '%': r'\%',
+    '#': r'\#',
+    '^': r'\textasciicircum',
+    '~': r'\sim',
+    '"': "''",
+    ' ': r'\ '
+    }
+
+
+class FarseerSeries(TypedPanel):
     """
     A series of NMR experiments.
     
-    Inherits a pd.Panel. Each DataFrame is an experiment (peaklist)
-    and progression along panel.items is the evolution of the series
-    along an experimental variable.
+    Inherits a TypedPanel. Each item is an experiment (peaklist)
+    and progression along .items is the evolution of the series
+    along an experimental variable. Each column is stored as a typed
+    (items, residues) np.ndarray.
     
     Attributes:
         calc_folder (str): folder name to store calculations.
@@ -75,7 +100,7 @@ class FarseerSeries(pd.Panel):
         
         resonance_type (str): {'Backbone', 'Sidechains'}
         
-        res_info (pd.Panel): a copy of the residue information and 
+        res_info (TypedPanel): a copy of the residue information and 
             measurement status.
         
         restraint_list (list): ORDERED names of the restraints that can
@@ -87,6 +112,11 @@ class FarseerSeries(pd.Panel):
         csp_alpha4res (dict): a dictionary containing the alpha values
             to be used for each residue in the CSP calculation formula.
         
+        calculated (set): the columns already calculated, which the
+            series calculation methods do not compute again. Starts
+            with the columns calculated over the whole Farseer-NMR Cube
+            by CubeCalculations.
+        
         fitdf (dict): stored pd.DataFrames with information on fitting.
         fit_performed (bool): defaults False. True after .perform_fit().
     
@@ -119,7 +149,8 @@ class FarseerSeries(pd.Panel):
                 'CSP',
                 'Height_ratio',
                 'Vol_ratio'
-                ]
+                ],
+            precalculated=()
             ):
         """Creates the instance attributes."""
         
@@ -129,10 +160,10 @@ class FarseerSeries(pd.Panel):
         self.cs_missing = cs_missing
         # normalization value for F2 dimension.
         self.csp_alpha4res = \
-            {key:csp_alpha4res for key in 'ARNDCEQGHILKMFPSTWYV'}
-        
-        for k, v in csp_res_exceptions.items():
-            self.csp_alpha4res[k] = v
+            csp_alpha_table(csp_alpha4res, csp_res_exceptions)
+        # columns calculated over the whole Farseer-NMR Cube
+        # (CubeCalculations) when the series was created
+        self.calculated = set(precalculated)
         
         # variables that store characteristics of the titration.
         self.series_axis = series_axis
@@ -157,6 +188,9 @@ class FarseerSeries(pd.Panel):
         # affects plot_res_evo()
         self.fit_performed = False 
         self.PRE_loaded = False  # True after .load_theoretical_PRE
+        # set by FarseerNMR in incremental runs
+        self.analysis_fingerprint = None
+        self.calcs_pending = False
         
         # defines the path to store the calculations
         # if stores the result of a calculation
@@ -205,11 +239,6 @@ class FarseerSeries(pd.Panel):
         if not(os.path.exists(self.export_series_folder)):
             os.makedirs(self.export_series_folder)
         
-    @property
-    def _constructor(self):
-        # because Titration inherits a pd.Panel.
-        return FarseerSeries
-        
     def _abort(self, wet):
         """
         Aborts run with message. Writes message to log.
@@ -451,10 +480,53 @@ and stacked (compared) along "{}" axis'.format(
         
         return self._color_dict(RGB_list)
     
+    def _item_colors(self, series, d, colors=None, default=None):
+        """
+        Translates the values of <series> to a list of colours.
+        
+        Parameters:
+            series (pd.Series): containing the information source, for
+                example, the 'Peak Status'.
+            
+            d (dict): keys are series values, and values are colours.
+            
+            colors (list): colours of the values not in <d>, for
+                example, the 'Peak Status' colours of the bars whose
+                'Details' have no user colour.
+            
+            default (str): colour of the values not in <d> when
+                <colors> is not given, a warning is logged.
+        
+        Returns:
+            list of colours, one for each value in <series>, that can be
+            passed to ax.bar(color=...).
+        """
+        
+        values = series.astype(str)
+        
+        if colors is None:
+            unknown = sorted(set(values) - set(d))
+            
+            if unknown:
+                self.logger.warning(
+                    'No colour for the {} values {}, drawn with {}'.format(
+                        series.name,
+                        ', '.join(unknown),
+                        default
+                        )
+                    )
+            
+            colors = [default] * len(values)
+        
+        return [d.get(value, color) for value, color in zip(values, colors)]
+    
     def _set_item_colors(self, items, series, d):
         """
         Translates the 'Peak Status' col to a dict of colours.
         
+        Used for items that are already drawn, like tick labels, bar
+        colours are passed to ax.bar(), see ._item_colors().
+        
         Parameters:
             items (matplotlib obj): either plot bars, ticks, etc...
         
@@ -466,12 +538,10 @@ and stacked (compared) along "{}" axis'.format(
             None, series are changed in place.
         """
         
-        for i, it in zip(series.index, items):
-            if str(series[i]) in d.keys():
-                it.set_color(d[str(series[i])])
-            
-            else:
-                continue
+        for it, value in zip(items, series.astype(str)):
+            if value in d:
+                it.set_color(d[value])
+        
         return
     
     def _text_marker(
@@ -483,6 +553,9 @@ and stacked (compared) along "{}" axis'.format(
         """
         Places a text mark over the bars of a Bar Plot.
         
+        The bars marked with the same text are drawn in a single
+        scatter with the text as a mathtext marker.
+        
         Parameters:
             ax (matplotlib subplot axis): where maker is written.
             
@@ -500,43 +573,56 @@ and stacked (compared) along "{}" axis'.format(
                 wheter plotting in a vertical or horizontal barplot.
         """
         
-        def vpos_sign(x, y):
-            """Scales to the vertical position - positive and negative."""
-            if y>=0:
-                return x
-            else:
-                return (x*-1)-(yy_scale/20)
+        marks = np.array(
+            [str(d.get(value) or '') for value in series.astype(str)]
+            )
         
-        def hpos_sign(x, y):
-            """Scales to the horizontal position - positive and negative."""
-            if y >= 0:
-                return x+(yy_scale/20)
-            else:
-                return (x*-1)-(yy_scale/20)
-        
-        for i, bar in zip(series.index, axbar):
-            if str(series[i]) in d.keys():
-                x0, y0 = bar.xy
-                if orientation == 'vertical':
-                    hpos = hpos_sign(bar.get_width(), x0)
-                    vpos = bar.get_y() + bar.get_height()/2
-                    vaa='center'
-                
-                elif orientation == 'horizontal':
-                    vpos = vpos_sign(bar.get_height(), y0)
-                    hpos = bar.get_x() + bar.get_width() / 2.5
-                    vaa='bottom'
-                
-                ax.text(
-                    hpos,
-                    vpos,
-                    d[str(series[i])],
-                    ha='center',
-                    va=vaa,
-                    fontsize=fs
-                    )
-            else:
-                continue
+        if not marks.any():
+            return
+        
+        x0, y0 = np.array([bar.xy for bar in axbar]).T
+        width = np.array([bar.get_width() for bar in axbar])
+        height = np.array([bar.get_height() for bar in axbar])
+        
+        if orientation == 'vertical':
+            hpos = np.where(
+                x0 >= 0,
+                width+(yy_scale/20),
+                (width*-1)-(yy_scale/20)
+                )
+            vpos = y0 + height/2
+            # markers are centred as text placed with va='center'
+            transform = ax.transData
+        
+        elif orientation == 'horizontal':
+            vpos = np.where(y0 >= 0, height, (height*-1)-(yy_scale/20))
+            hpos = x0 + width/2.5
+            # and raised as text placed with va='bottom'
+            transform = offset_copy(
+                ax.transData,
+                fig=ax.figure,
+                y=fs/2,
+                units='points'
+                )
+        
+        for mark in sorted(set(marks[marks != ''])):
+            mask = marks == mark
+            marker = '$\\mathregular{{{}}}$'.format(
+                ''.join(MATHTEXT_ESCAPES.get(char, char) for char in mark)
+                )
+            # mathtext markers are scaled to their largest dimension
+            extents = TextPath((0, 0), marker, size=fs).get_extents()
+            ax.scatter(
+                hpos[mask],
+                vpos[mask],
+                marker=marker,
+                s=max(extents.width, extents.height)**2,
+                c=plt.rcParams['text.color'],
+                linewidths=0,
+                transform=transform,
+                clip_on=False,
+                zorder=3
+                )
         
         return
     
@@ -647,8 +733,8 @@ and stacked (compared) along "{}" axis'.format(
             # plot theoretical PRE
             
             x_axis_values = np.arange(
-                float(self.loc[exp,:,'ResNo'].head(n=1))-1,
-                float(self.loc[exp,:,'ResNo'].tail(n=1)),
+                self.loc[exp,:,'ResNo'].iloc[0]-1,
+                self.loc[exp,:,'ResNo'].iloc[-1],
                 1,
                 )
             
@@ -672,7 +758,7 @@ and stacked (compared) along "{}" axis'.format(
             
             # plot tag position
             xtagm = self.loc[exp,:,'tag']=='*'
-            xtag = float(self.loc[exp,xtagm,'ResNo'])-1
+            xtag = self.loc[exp,xtagm,'ResNo'].iloc[0]-1
             
             if bartype in ['h', 'DPRE_plot']:
                 axs.vlines(
@@ -746,24 +832,32 @@ and stacked (compared) along "{}" axis'.format(
             fig_file_type (str): file extension.
             
             fig_dpi (int): the dpi resolution.
-        """
         
-        plot_folder = os.path.join(self.tables_and_plots_folder, folder)
-        
-        if not(os.path.exists(plot_folder)):
-            os.makedirs(plot_folder)
-        
-        file_path = os.path.join(
-            plot_folder,
-            '{}_{}.{}'.format(calccol, plot_name, fig_file_type)
-            )
+        Returns:
+            the path of the figure file.
+        """
         
+        file_path = self._plot_path(folder, plot_name, calccol, fig_file_type)
         header = self._create_header(file_path=file_path)
         fig.text(0.01, 0.01, header, fontsize=header_fontsize)
         fig.savefig(file_path, dpi=fig_dpi)
         self.logs('**Plot Saved** {}'.format(file_path))
         
-        return
+        return file_path
+    
+    def _plot_path(self, folder, plot_name, calccol, fig_file_type):
+        """
+        The path of a figure file, see ._write_plot(). Creates its
+        folder.
+        """
+        plot_folder = os.path.join(self.tables_and_plots_folder, folder)
+        # figures may be drawn in parallel, see RenderPool
+        os.makedirs(plot_folder, exist_ok=True)
+        
+        return os.path.join(
+            plot_folder,
+            '{}_{}.{}'.format(calccol, plot_name, fig_file_type)
+            )
     
     def logs(self, logstr, istitle=False):
         """
@@ -787,36 +881,96 @@ and stacked (compared) along "{}" axis'.format(
         
         return None
     
+    def _run_calculations(self, steps, max_workers=1):
+        """
+        Performs the calculation <steps> not calculated before,
+        see Calculations.CalculationGraph.
+        
+        Returns:
+            the list of the calculated columns.
+        
+        Raises:
+            ValueError if the input columns of a step are missing.
+        """
+        context = CalcContext(
+            0,
+            self.cs_missing,
+            lambda: self.isin('Peak Status', ['missing']),
+            self.csp_alpha
+            )
+        calculated, unresolved = CalculationGraph(steps).run(
+            self.minor_axis,
+            self.get_array,
+            self.set_array,
+            context,
+            done=self.calculated,
+            max_workers=max_workers
+            )
+        self.calculated.update(calculated)
+        
+        if unresolved:
+            available = set(self.minor_axis) | self.calculated
+            
+            for step in unresolved:
+                self.logs('**Not calculated** {}: missing input columns {}'.\
+                    format(
+                        step.column,
+                        [col for col in step.inputs if col not in available]
+                        ))
+            
+            raise ValueError(
+                '@@@ Missing input columns to calculate {}'.format(
+                    [step.column for step in unresolved]
+                    )
+                )
+        
+        return calculated
+    
+    def calculate(self, steps, max_workers=1):
+        """
+        Calculates new columns along the series.
+        
+        Each column is calculated once, the input columns of a step
+        are calculated before it and independent steps can run
+        concurrently.
+        
+        Parameters:
+            steps (list): Calculations.CalcStep instances, calculations
+                are registered with Calculations.register_calculation().
+            
+            max_workers (int): number of threads that perform the
+                independent steps.
+        """
+        
+        done = set(self.calculated)
+        calculated = self._run_calculations(steps, max_workers=max_workers)
+        
+        for step in steps:
+            if step.column in calculated:
+                self.logs('**Calculated** {}'.format(step.column))
+            
+            elif step.column in done:
+                self.logs(
+                    '**Not calculated** {}: already calculated'.format(
+                        step.column
+                        )
+                    )
+        
+        return
+    
     def calc_cs_diffs(self, calccol, sourcecol):
         """
         Calculates the difference between two columns along a Series 
         using as reference the column from the reference experiment, 
         which is always stored in Item=0.
         
+        Missing peaks results are set according to self.cs_missing,
+        see Calculations.cs_diffs().
+        
         Calculation results are stored in new columns.
         """
         
-        self.loc[:,:,calccol] = \
-            self.loc[:,:,sourcecol].sub(self.ix[0,:,sourcecol], axis='index')
-        
-        # sets missing peaks results according to the self.cs_missing
-        if self.cs_missing == 'full':
-            for item in self.items:
-                mask_missing = self.loc[item,:,'Peak Status'] == 'missing'
-                self.loc[item,mask_missing,calccol] = 1.
-        
-        elif self.cs_missing == 'prev':
-            for iitem in range(1, len(self.items)):
-                mask_missing = self.ix[iitem,:,'Peak Status'] == 'missing'
-                self.ix[iitem,mask_missing,calccol] = \
-                    self.ix[iitem-1,mask_missing,calccol]
-        
-        elif self.cs_missing == 'zero':
-            for iitem in range(1, len(self.items)):
-                mask_missing = self.ix[iitem,:,'Peak Status'] == 'missing'
-                self.ix[iitem,mask_missing,calccol] = 0
-        
-        self.logs('**Calculated** {}'.format(calccol))
+        self.calculate([calc_step(calccol, 'delta', [sourcecol])])
         
         return
     
@@ -829,46 +983,35 @@ and stacked (compared) along "{}" axis'.format(
         Calculation result is stored in a new column of each DataFrame.
         """
         
-        self.loc[:,:,calccol] = \
-            self.loc[:,:,sourcecol].div(self.ix[0,:,sourcecol], axis='index')
-        self.logs('**Calculated** {}'.format(calccol))
+        self.calculate([calc_step(calccol, 'ratio', [sourcecol])])
         
         return
     
-    def csp_willi(self, s):
+    def csp_alpha(self):
         """
-        Formula that calculates Chemical Shift Perturbations (CSPs).
+        The CSP normalization factor of each residue, read from
+        self.csp_alpha4res according to the '1-letter' column.
         
-        Parameters:
-            s (pd.Series): s[0], 1-letter res code; s[1]; chemical shift 
-            for nuclei 1, s[2], chemical shift for nuclei 2.
-        
-        np.sqrt(0.5*(H1**2 + (alpha*N15)**2))
-
-        where the proportional normalization factor (alpha) for the 15N
-        dimension is set by default to 0.2 for Glycine and 0.14 for all
-        the other residues.
-
-        Williamson, M. P. Using chemical shift perturbation to
-        characterise ligand binding. Prog. Nuc. Magn. Res. Spect.
-        73, 1–16 (2013). SEE CORRIGENDUM
+        Returns:
+            (items, residues) np.ndarray, NaN for unknown residues.
         """
-        return np.sqrt(0.5*(s[1]**2+(self.csp_alpha4res[s[0]]*s[2])**2))
+        
+        return residue_alpha(
+            *self.get_codes('1-letter'),
+            self.csp_alpha4res
+            )
     
     def calc_csp(self, calccol='CSP', pos1='PosF1_delta', pos2='PosF2_delta'):
         """
         Calculates the Chemical Shift Perturbation (CSP) values
-        based on a formula.
+        based on a formula, see Calculations.csp_willi().
         
         calccol (str): the name of the new column that stores results.
         pos1 (str): the column name of the source data for nuclei 1.
         pos2 (str): the column name for the source data for nuclei 2.
         """
-
-        self.loc[:,:,calccol] = \
-            self.loc[:,:,['1-letter',pos1,pos2]].\
-                apply(lambda x: self.csp_willi(x), axis=2)
-        self.logs('**Calculated** {}'.format(calccol))
+        
+        self.calculate([calc_step(calccol, 'csp', [pos1, pos2])])
         
         return
     
@@ -937,19 +1080,19 @@ and stacked (compared) along "{}" axis'.format(
             self._abort(fsw(msg_title='ERROR', msg=msg, wet_num=15))
         
         # check tag residue
-        if not(any(self.loc[self.para_name,:,'ResNo'].isin([tag]))):
+        if not(any(self.loc[self.para_name,:,'ResNo'].isin([tag_num]))):
             msg = \
 'The residue number where the tag is placed according to the \*.pre file ({}) \
 is not part of the protein sequence ({}-{}).'.\
                 format(
                     tag_num,
-                    int(self.res_info.iloc[0,0,0]),
-                    int(self.res_info.iloc[0,:,0].tail(n=1))
+                    self.res_info.iloc[0,0,0],
+                    self.res_info.iloc[0,:,0].iloc[-1]
                     )
             self._abort(fsw(msg_title='ERROR', msg=msg, wet_num=17))
         
         self.loc[self.para_name,:,'tag'] = ''
-        tagmask = self.loc[self.para_name,:,'ResNo'] == tag
+        tagmask = self.loc[self.para_name,:,'ResNo'] == tag_num
         self.loc[self.para_name,tagmask,'tag'] = '*'
         tagf.close()
         self.logs('**Tag position found** at residue {}'.format(tag_num))
@@ -976,28 +1119,21 @@ is not part of the protein sequence ({}-{}).'.\
             
             gaussian_stddev (int): standard deviation.
         """
-        # astropy is imported to avoind demanding import when not necessary
-        from astropy.convolution import Gaussian1DKernel, convolve
-        
-        # http://docs.astropy.org/en/stable/api/astropy.convolution.Gaussian1DKernel.html
-        gauss = Gaussian1DKernel(gaussian_stddev, x_size=guass_x_size)
-        self.loc[:,:,targetcol] = \
-            self.loc[:,:,'Theo PRE'].sub(self.loc[:,:,sourcecol])
-        self.logs('**Calculated DELTA PRE** for source {} in target {}'.\
-                format(sourcecol, targetcol))
-        
-        for exp in self.items:
-            # converts to 0 negative values
-            negmask = self.loc[exp,:,targetcol] < 0
-            self.loc[exp,negmask,targetcol] = 0
+        smooth_col = '{}_smooth'.format(targetcol)
+        self._run_calculations([
+            # negative values are converted to 0
+            calc_step(targetcol, 'delta_pre', ['Theo PRE', sourcecol]),
             # aplies convolution with a normalized 1D Gaussian kernel
-            smooth_col = '{}_smooth'.format(targetcol)
-            self.loc[exp,:,smooth_col] = convolve(
-                np.array(self.loc[exp,:,targetcol]),
-                gauss,
-                boundary='extend',
-                normalize_kernel=True
+            calc_step(
+                smooth_col,
+                'gaussian_smooth',
+                [targetcol],
+                x_size=guass_x_size,
+                stddev=gaussian_stddev
                 )
+            ])
+        self.logs('**Calculated DELTA PRE** for source {} in target {}'.\
+                format(sourcecol, targetcol))
         self.logs(\
 '**Calculated DELTA PRE Smoothed** for source {} in target {} \
 with window size {} and stdev {}'.\
@@ -1047,9 +1183,8 @@ with window size {} and stdev {}'.\
             self.tables_and_plots_folder, 
             restraint_folder
             )
-        
-        if not(os.path.exists(tablefolder)):
-            os.makedirs(tablefolder)
+        # figures may be drawn in the same folder, see RenderPool
+        os.makedirs(tablefolder, exist_ok=True)
         
         file_path = os.path.join(tablefolder, tablecol + '.csv')
         fileout = open(file_path, 'w')
@@ -1275,6 +1410,24 @@ recipient: residues
             experiment (srt): the name of the data point.
         """
         
+        # bars colors
+        bar_colors = self._item_colors(
+            self.loc[experiment,:,'Peak Status'],
+            {
+                'measured':measured_color,
+                'missing':missing_color,
+                'unassigned':unassigned_color
+                },
+            default=measured_color
+            )
+        
+        if color_user_details_flag:
+            bar_colors = self._item_colors(
+                self.loc[experiment,:,'Details'],
+                user_bar_colors_dict,
+                colors=bar_colors
+                )
+        
         if plot_style == 'bar_extended' and self.resonance_type == 'Backbone':
             # fillna(0) is added because nan conflicts with text_maker()
             # in bar.get_height() which return nan
@@ -1285,6 +1438,8 @@ recipient: residues
                 align='center',
                 alpha=bar_alpha,
                 linewidth=bar_linewidth,
+                color=bar_colors,
+                edgecolor=bar_colors,
                 zorder=4
                 )
             
@@ -1307,7 +1462,7 @@ recipient: residues
             
             ticklabels = \
                 self.loc[experiment,0::mod_,['ResNo','1-letter']].\
-                    apply(lambda x: ''.join(x), axis=1)
+                    astype(str).apply(lambda x: ''.join(x), axis=1)
             # Configure XX ticks and Label
             axs[i].set_xticks(xticks)
             ## https://github.com/matplotlib/matplotlib/issues/6266
@@ -1340,6 +1495,8 @@ recipient: residues
                 align='center',
                 alpha=bar_alpha,
                 linewidth=bar_linewidth,
+                color=bar_colors,
+                edgecolor=bar_colors,
                 zorder=4
                 )
         
@@ -1348,7 +1505,7 @@ recipient: residues
             ## https://github.com/matplotlib/matplotlib/issues/6266
             axs[i].set_xticklabels(
                 self.loc[experiment,:,['ResNo', '1-letter', 'ATOM']].\
-                    apply(lambda x: ''.join(x), axis=1),
+                    astype(str).apply(lambda x: ''.join(x), axis=1),
                 fontname=x_ticks_fn,
                 fontsize=x_ticks_fs,
                 fontweight=x_ticks_weight,
@@ -1375,6 +1532,8 @@ recipient: residues
                 align='center',
                 alpha=bar_alpha,
                 linewidth=bar_linewidth,
+                color=bar_colors,
+                edgecolor=bar_colors,
                 zorder=4
                 )
             
@@ -1385,7 +1544,7 @@ recipient: residues
             mod_ = 10
             sanity_counter = 0
             
-            tmp_xticks = self.loc[experiment,:,'ResNo'].astype(float)
+            tmp_xticks = self.loc[experiment,:,'ResNo']
             
             while number_of_ticks > 10 and sanity_counter < 100000:
                 
@@ -1422,7 +1581,7 @@ recipient: residues
                     self.loc[experiment, :, 'Peak Status'] == 'unassigned'
                 
                 for residue in self.loc[experiment, unassignedmask, 'ResNo']:
-                    residue = int(residue) - 1.5
+                    residue = residue - 1.5
                     axs[i].axvspan(
                         residue,
                         residue+1,
@@ -1439,16 +1598,6 @@ recipient: residues
             fontname=subtitle_fn,
             weight=subtitle_weight
             )
-        # defines bars colors
-        self._set_item_colors(
-            bars,
-            self.loc[experiment,:,'Peak Status'],
-            {
-                'measured':measured_color,
-                'missing':missing_color,
-                'unassigned':unassigned_color
-                }
-            )
         # configures spines
         axs[i].spines['bottom'].set_zorder(10)
         axs[i].spines['top'].set_zorder(10)
@@ -1535,13 +1684,6 @@ recipient: residues
                 fs=mark_fontsize
                 )
         
-        if color_user_details_flag:
-            self._set_item_colors(
-                bars,
-                self.loc[experiment,:,'Details'],
-                user_bar_colors_dict
-                )
-        
         if self.PRE_loaded and (calccol in self.restraint_list[3:]):
             self._plot_theo_pre(
                 axs[i],
@@ -1634,6 +1776,24 @@ recipient: residues
             experiment (srt): the name of the data point.
         """
         
+        # bars colors
+        bar_colors = self._item_colors(
+            self.loc[experiment,:,'Peak Status'],
+            {
+                'measured':measured_color,
+                'missing':missing_color,
+                'unassigned':unassigned_color
+                },
+            default=measured_color
+            )
+        
+        if color_user_details_flag:
+            bar_colors = self._item_colors(
+                self.loc[experiment,:,'Details'],
+                user_bar_colors_dict,
+                colors=bar_colors
+                )
+        
         # fillna(0) is added because nan conflicts with text_maker()
         # .iloc[::-1]
         # in bat.get_height() which return nan
@@ -1644,6 +1804,8 @@ recipient: residues
             align='center',
             alpha=bar_alpha,
             linewidth=bar_linewidth,
+            color=bar_colors,
+            edgecolor=bar_colors,
             zorder=4
             )
         axs[i].invert_yaxis()
@@ -1677,29 +1839,18 @@ recipient: residues
         
         ticklabels = \
             self.loc[experiment,0::mod_,['ResNo','1-letter']].\
-                apply(lambda x: ''.join(x), axis=1)
+                astype(str).apply(lambda x: ''.join(x), axis=1)
         # Configure XX ticks and Label
         axs[i].set_yticks(xticks)
         # https://github.com/matplotlib/matplotlib/issues/6266
         axs[i].set_yticklabels(
-            self.loc[experiment,0::mod_,['ResNo','1-letter']].\
-                apply(lambda x: ''.join(x), axis=1),
+            ticklabels,
             fontname=x_ticks_fn,
             fontsize=x_ticks_fs-2,
             fontweight=x_ticks_weight,
             rotation=0
             )
-        ## defines colors
-        self._set_item_colors(
-            bars,
-            self.loc[experiment,:,'Peak Status'],
-            {
-                'measured':measured_color,
-                'missing':missing_color,
-                'unassigned':unassigned_color
-                }
-            )
-        
+        ## defines ticks colors
         if x_ticks_color_flag:
             self._set_item_colors(
                 axs[i].get_yticklabels(),
@@ -1796,13 +1947,6 @@ recipient: residues
                 orientation='vertical'
                 )
         
-        if color_user_details_flag:
-            self._set_item_colors(
-                bars,
-                self.loc[experiment,:,'Details'],
-                user_bar_colors_dict
-                )
-        
         if self.PRE_loaded and (calccol in self.restraint_list[3:]):
             self._plot_theo_pre(
                 axs[i],
@@ -1885,7 +2029,7 @@ recipient: residues
         
         # Draws subplot title
         res = self.ix[0,i,'ResNo']
-        subtitle = self.ix[0,i,'ResNo'] + self.ix[0,i,'1-letter']
+        subtitle = str(self.ix[0,i,'ResNo']) + self.ix[0,i,'1-letter']
         axs[i].set_title(
             subtitle,
             y=subtitle_pad,
@@ -2159,7 +2303,7 @@ variable or confirm you have not forgot any peaklist [{}].".\
                 )
         
         # Configure subtitle
-        subtitle = self.ix[0,i,'ResNo'] + self.ix[0,i,'1-letter']
+        subtitle = str(self.ix[0,i,'ResNo']) + self.ix[0,i,'1-letter']
         axs[i].set_title(
             subtitle,
             y=subtitle_pad,
@@ -2421,39 +2565,54 @@ variable or confirm you have not forgot any peaklist [{}].".\
         # otherwise the user has input a list of colors
         else: 
             mk_color = color_list
-                
-        for i, residue in enumerate(self.major_axis):
-            
-            if self.ix[0,residue,'Peak Status'] in ('unassigned','missing'):
-                continue
-            
-            mesmask = self.loc[:,residue,'Peak Status'] == 'measured'
-            
-            if self.loc[mesmask,residue,['H1_delta','N15_delta']].\
-                    isnull().values.any():
-                
-                msg = "Information for residue {} was kept out of this plot.\
+        
+        # all residues are drawn in a single scatter instead of one
+        # scatter per residue.
+        status = self.get_array('Peak Status')
+        mesmask = status == 'measured'
+        shifts = np.stack(
+            (self.get_array('H1_delta'), self.get_array('N15_delta')),
+            axis=-1
+            ).astype(float)
+        not_plotted = (status[0] == 'unassigned') | (status[0] == 'missing')
+        has_nan = (np.isnan(shifts).any(axis=-1) & mesmask).any(axis=0)
+        
+        for residue in np.flatnonzero(has_nan & ~not_plotted):
+            msg = "Information for residue {} was kept out of this plot.\
 This is because a NaN value was identified in the chemical shift information.\
 This can be explained if this residues was missing in the reference peaklist \
 but measured in a subsequent peaklist".\
-                    format(self.loc[mesmask,residue,'ResNo'].\
-                        to_string(index=False))
-                
-                wet36 = fsw(msg_title='NOTE', msg=msg, wet_num=36)
-                self.logs(wet36.wet)
-                continue
-            
-            axs[0].scatter(
-                self.loc[mesmask,residue,'H1_delta'],
-                self.loc[mesmask,residue,'N15_delta'],
-                c=mk_color,
-                s=mksize,
-                zorder=9
-                )
+                format(pd.Series(
+                    self.get_array('ResNo')[mesmask[:,residue],residue]
+                    ).to_string(index=False))
+            
+            wet36 = fsw(msg_title='NOTE', msg=msg, wet_num=36)
+            self.logs(wet36.wet)
+        
+        residues = np.flatnonzero(~(not_plotted | has_nan))
+        # measured points of each residue, (residue, experiment) ordered
+        # as when residues were drawn one at a time
+        points = mesmask[:,residues].T
+        _, experiments = np.nonzero(points)
+        xy = shifts.transpose(1, 0, 2)[residues][points]
+        axs[0].scatter(
+            xy[:,0],
+            xy[:,1],
+            c=[mk_color[j] for j in experiments],
+            s=mksize,
+            zorder=9
+            )
+        # residue labels next to the last measured point, one Text each:
+        # residue numbers are all different, so label markers would not
+        # share paths, and Text stays text in vector formats
+        last = points.shape[1] - 1 - np.argmax(points[:,::-1], axis=1)
+        labels = shifts[last, residues]*1.05
+        
+        for resno, (x, y) in zip(self.get_array('ResNo')[0, residues], labels):
             axs[0].text(
-                float(self.loc[mesmask,residue,'H1_delta'].tail(n=1))*1.05,
-                float(self.loc[mesmask,residue,'N15_delta'].tail(n=1))*1.05,
-                self.ix[0,residue,'ResNo'],
+                x,
+                y,
+                resno,
                 fontsize=4,
                 color=res_label_color,
                 zorder=10
@@ -2623,8 +2782,8 @@ but measured in a subsequent peaklist".\
             cbar.ax.tick_params(labelsize=cbar_font_size)
             axs[i].get_xaxis().set_visible(True)
             axs[i].tick_params(axis='x', bottom='on', length=1.5)
-            initialresidue = int(self.ix[0, 0, 'ResNo'])
-            finalresidue = int(self.loc[experiment,:,'ResNo'].tail(1))
+            initialresidue = self.ix[0, 0, 'ResNo']
+            finalresidue = self.loc[experiment,:,'ResNo'].iloc[-1]
             
             if self.shape[1] > 100:
                 xtick_spacing = self.shape[1]//100*10
@@ -2736,7 +2895,7 @@ but measured in a subsequent peaklist".\
         # plots dpre for first point in comparison
         #pmaskr = self.ix[0,:,calccol] > 0
         axs[i].plot(
-            self.ix[0,:,'ResNo'].astype(float),
+            self.ix[0,:,'ResNo'],
             self.ix[0,:,calccol].astype(float),
             'o',
             markersize=dpre_ms,
@@ -2748,7 +2907,7 @@ but measured in a subsequent peaklist".\
         # plots dpre for titration data point
         #pmaskd = self.loc[experiment,:,calccol] > 0
         axs[i].plot(
-            self.loc[experiment,:,'ResNo'].astype(float),
+            self.loc[experiment,:,'ResNo'],
             self.loc[experiment,:,calccol].astype(float),
             'o',
             c=color,
@@ -2760,7 +2919,7 @@ but measured in a subsequent peaklist".\
         # plots dpre_smooth for first data point in comparison
         #pmaskr = self.ix[0,:,calccol+'_smooth'] > 0
         axs[i].plot(
-            self.ix[0,:,'ResNo'].astype(float),
+            self.ix[0,:,'ResNo'],
             self.ix[0,:,calccol+'_smooth'].astype(float),
             ls='-',
             lw=smooth_lw,
@@ -2770,7 +2929,7 @@ but measured in a subsequent peaklist".\
         # plots dpre_smooth for data point
         #pmaskd = self.loc[experiment,:,calccol+'_smooth'] > 0
         axs[i].plot(
-            self.loc[experiment,:,'ResNo'].astype(float),
+            self.loc[experiment,:,'ResNo'],
             self.loc[experiment,:,calccol+'_smooth'].astype(float),
             ls='-',
             lw=smooth_lw,
@@ -2786,8 +2945,8 @@ but measured in a subsequent peaklist".\
             fontweight=subtitle_weight
             )
         # Set Ticks
-        initialresidue = int(self.ix[0, 0, 'ResNo'])
-        finalresidue = int(self.loc[experiment,:,'ResNo'].tail(1))
+        initialresidue = self.ix[0, 0, 'ResNo']
+        finalresidue = self.loc[experiment,:,'ResNo'].iloc[-1]
         
         if self.shape[1] > 100:
             xtick_spacing = self.shape[1]//100*10
@@ -2873,7 +3032,7 @@ but measured in a subsequent peaklist".\
         if res_highlight:
             for rr in res_hl_list:
                 axs[i].axvline(x=rr, ls=':', lw=0.3, color=grid_color)
-                rrmask = self.ix[0,:,'ResNo'] == str(rr)
+                rrmask = self.ix[0,:,'ResNo'] == int(rr)
                 l1 = list(self.loc[experiment,rrmask,'1-letter'])
                 axs[i].text(
                     rr,
@@ -2929,7 +3088,8 @@ but measured in a subsequent peaklist".\
             fig_width=8.69,
             fig_file_type='pdf',
             fig_dpi=300,
-            header_fontsize=5):
+            header_fontsize=5,
+            paginate=False):
         """
         The main function that calls and builds the different plots.
         
@@ -2947,9 +3107,92 @@ but measured in a subsequent peaklist".\
             
             param_dict (dict): kwargs to be passed to each plotting
                 function.
+            
+            paginate (bool): draws the 'res' plots in pages,
+                see ._plot_pages().
+        
+        Returns:
+            list with the paths of the figure files.
         """
         
         self.logs('**Plotting** {} for {}...'.format(plot_style, calccol))
+        
+        if plot_type == 'res' and paginate:
+            return self._plot_pages(
+                calccol,
+                plot_style,
+                param_dict,
+                par_ylims=par_ylims,
+                ylabel=ylabel,
+                hspace=hspace,
+                rows_per_page=rows_per_page,
+                cols_per_page=cols_per_page,
+                fig_height=fig_height,
+                fig_width=fig_width,
+                fig_file_type=fig_file_type,
+                fig_dpi=fig_dpi,
+                header_fontsize=header_fontsize
+                )
+        
+        fig, folder, header_fontsize = self._draw_plot(
+            calccol,
+            plot_type,
+            plot_style,
+            param_dict,
+            par_ylims=par_ylims,
+            ylabel=ylabel,
+            hspace=hspace,
+            rows_per_page=rows_per_page,
+            cols_per_page=cols_per_page,
+            fig_height=fig_height,
+            fig_width=fig_width,
+            header_fontsize=header_fontsize
+            )
+        file_path = self._write_plot(
+            fig,
+            header_fontsize,
+            plot_style,
+            folder,
+            calccol,
+            fig_file_type,
+            fig_dpi
+            )
+        plt.close('all')
+        
+        return [file_path]
+    
+    def _draw_plot(
+            self, calccol,
+            plot_type, plot_style,
+            param_dict,
+            par_ylims=(0,1),
+            ylabel='ppm or ratio',
+            hspace=0.5,
+            rows_per_page=5,
+            cols_per_page=1,
+            fig_height=11.69,
+            fig_width=8.69,
+            header_fontsize=5,
+            first=0,
+            last=None,
+            numrows=None):
+        """
+        Draws the figure of .plot_base().
+        
+        Parameters:
+            first, last (int): the positions of the residues of the
+                'res' plots, defaults to all the residues.
+            
+            numrows (int): number of rows of subplots, defaults to the
+                rows needed for all the subplots plus one.
+        
+        Returns:
+            the figure, the folder where it is saved and the font size
+            of its header.
+        """
+        
+        rows = self.major_axis[first:last]
+        
         # this to allow folder change in PRE_analysis
         folder = calccol
         
@@ -2957,7 +3200,7 @@ but measured in a subsequent peaklist".\
             num_subplots = len(self.items)
         
         elif plot_type == 'res':
-            num_subplots = len(self.major_axis)
+            num_subplots = first + len(rows)
         
         elif plot_type == 'single':
             num_subplots = 1
@@ -2965,7 +3208,7 @@ but measured in a subsequent peaklist".\
         else:
             raise ValueError('Not a valid Farseer plot type')
         
-        numrows = ceil(num_subplots/cols_per_page) + 1 
+        numrows = numrows or ceil(num_subplots/cols_per_page) + 1
         real_fig_height = (fig_height / rows_per_page) * numrows
         # http://stackoverflow.com/questions/17210646/python-subplot-within-a-loop-first-panel-appears-in-wrong-position
         fig, axs = plt.subplots(
@@ -2978,6 +3221,11 @@ but measured in a subsequent peaklist".\
             rect=[0.01,0.01,0.995,0.995],
             h_pad=fig_height/rows_per_page
             )
+        
+        if first:
+            # the plotting functions find the data of a residue at the
+            # index of its subplot
+            axs = np.concatenate([np.full(first, None, dtype=object), axs])
         # Plots yy axis title
         # http://www.futurile.net/2016/03/01/text-handling-in-matplotlib/
         if plot_style in ['bar_extended', 'bar_compacted']:
@@ -3013,7 +3261,7 @@ but measured in a subsequent peaklist".\
                 self._clean_subplots(axs, num_subplots, len(axs))
         
         elif plot_style == 'res_evo':
-            for i, row_number in enumerate(self.major_axis):
+            for i, row_number in enumerate(rows, start=first):
                 self.plot_res_evo(
                     calccol,
                     axs,
@@ -3028,7 +3276,7 @@ but measured in a subsequent peaklist".\
                 self._clean_subplots(axs, num_subplots, len(axs))
         
         elif plot_style == 'cs_scatter':
-            for i, row_number in enumerate(self.major_axis):
+            for i, row_number in enumerate(rows, start=first):
                 self.plot_cs_scatter(axs, i, row_number, **param_dict)
             
             else:
@@ -3081,36 +3329,173 @@ but measured in a subsequent peaklist".\
             folder='PRE_analysis'
             header_fontsize = 3.5
         
-        self._write_plot(
-            fig,
-            header_fontsize,
+        return fig, folder, header_fontsize
+    
+    def _plot_pages(
+            self, calccol,
             plot_style,
-            folder,
-            calccol,
-            fig_file_type,
-            fig_dpi
+            param_dict,
+            rows_per_page=5,
+            cols_per_page=1,
+            fig_height=11.69,
+            fig_file_type='pdf',
+            fig_dpi=300,
+            header_fontsize=5,
+            **kwargs):
+        """
+        Draws a 'res' plot in pages of <rows_per_page> x <cols_per_page>
+        residues.
+        
+        All pages have the size of a .plot_base() figure of a single
+        page. Each page is drawn, saved and closed before the next one,
+        so that memory and drawing time do not grow with the number
+        of residues. PDF pages are written to a single file, other
+        file types to a numbered file per page.
+        
+        Parameters:
+            kwargs: passed to ._draw_plot().
+        
+        Returns:
+            list with the paths of the figure files.
+        """
+        per_page = rows_per_page * cols_per_page
+        file_path = self._plot_path(calccol, plot_style, calccol, fig_file_type)
+        root, ext = os.path.splitext(file_path)
+        pdf = PdfPages(file_path) if fig_file_type == 'pdf' else None
+        file_paths = [file_path] if pdf else []
+        
+        try:
+            for page, start in enumerate(
+                    range(0, len(self.major_axis), per_page),
+                    start=1):
+                fig, _, header_fontsize = self._draw_plot(
+                    calccol,
+                    'res',
+                    plot_style,
+                    param_dict,
+                    rows_per_page=rows_per_page,
+                    cols_per_page=cols_per_page,
+                    fig_height=fig_height,
+                    header_fontsize=header_fontsize,
+                    first=start,
+                    last=start+per_page,
+                    numrows=rows_per_page+1,
+                    **kwargs
+                    )
+                
+                # the subplots left empty in the last page
+                for ax in fig.axes[len(self.major_axis[start:start+per_page]):]:
+                    ax.set_axis_off()
+                
+                if pdf:
+                    page_path = file_path
+                
+                else:
+                    page_path = '{}_page{:03d}{}'.format(root, page, ext)
+                    file_paths.append(page_path)
+                
+                header = self._create_header(file_path=page_path)
+                fig.text(0.01, 0.01, header, fontsize=header_fontsize)
+                
+                if pdf:
+                    pdf.savefig(fig, dpi=fig_dpi)
+                
+                else:
+                    fig.savefig(page_path, dpi=fig_dpi)
+                
+                plt.close(fig)
+        
+        finally:
+            if pdf:
+                pdf.close()
+        
+        self.logs('**Plot Saved** {} ({} pages)'.format(
+            file_path if pdf else '{}_page*{}'.format(root, ext),
+            page
+            ))
+        
+        return file_paths
+    
+    def perform_fit(
+            self,
+            col,
+            x_values,
+            mindp,
+            fit_function,
+            workers=1,
+            batch=False,
+            cache=None,
+            bootstrap=0,
+            confidence_level=95,
+            executor=None):
+        """
+        General workflow for fitting data along X axis.
+        
+        Fits a single column, see .perform_fits(). The fit_table.csv
+        file of the series is not written.
+        """
+        
+        self.perform_fits(
+            [col],
+            x_values,
+            mindp,
+            fit_function,
+            workers=workers,
+            batch=batch,
+            cache=cache,
+            bootstrap=bootstrap,
+            confidence_level=confidence_level,
+            executor=executor,
+            fit_table=False
             )
-        plt.close('all')
         
         return
     
-    def perform_fit(self, col, x_values, mindp, fit_function):
+    def perform_fits(
+            self,
+            cols,
+            x_values,
+            mindp,
+            fit_function,
+            workers=1,
+            batch=False,
+            cache=None,
+            bootstrap=0,
+            confidence_level=95,
+            executor=None,
+            fit_table=True):
         """
         General workflow for fitting data along X axis.
         
-        Note, only one fit can be performed at a time.
-        If multiple fits have to be performed, run Faseer-NMR with
-        different config files.
+        The residues of all <cols> are fitted in a single sweep. Each
+        column has its own fit report and table and all are gathered
+        in the fit_table.csv file of the series, written once at the
+        end.
         
         Parameters:
-            - col: the column containing the data to fit
+            - cols: the columns containing the data to fit
             - x_values: the x data
             - mindp: minimum number of points to consider residue
                 for fitting.
             - fit_function: fitting library name according to
                 core.fslibs.fitting_functions.__init__.py
+            - workers: number of processes fitting the residues.
+                The results are gathered in the residue order.
+            - batch: fits all residues at once, see fit_residues().
+            - cache: Cache.FitCache, fits of the same data are not
+                performed again.
+            - bootstrap: number of bootstrap replicates used to estimate
+                the confidence intervals of the fitted parameters,
+                0 to not estimate them.
+            - confidence_level: percentage of the confidence intervals.
+            - executor: process pool of <workers> that performs the
+                parallel fits, see fit_residues().
+            - fit_table: writes the fit_table.csv file of the series.
         """
         
+        if not(cols):
+            return
+        
         self.fit_performed = True
         
         try:
@@ -3124,42 +3509,136 @@ but measured in a subsequent peaklist".\
             self._abort(fsw(msg_title='ERROR', msg=msg, wet_num=23))
         
         self.logs("*** Performing fit using function: {}".format(fit_function))
-        # logging ###
-        not_enough_data = to_fit.not_enough_data
+        self.logs('** Performing fitting for {}...'.format(', '.join(cols)))
+        self.xfit = np.linspace(0, x_values[-1], 200, endpoint=True)
+        # the measured data points of each residue, common to all columns
+        measured = self.isin('Peak Status', ['measured'])
+        x_values = np.asarray(x_values)
+        residues = [
+            (
+                row,
+                self.res_info.iloc[0, i, 0],
+                np.flatnonzero(measured[:, i]),
+                measured[:, i].sum() >= mindp
+                )
+            for i, row in enumerate(self.major_axis)
+            ]
+        hits, misses = \
+            (cache.hits, cache.misses) if cache is not None else (0, 0)
+        # residues with enough data are fitted together afterwards
+        col_residues = {}
+        to_fit_data = []
+        
+        for col in cols:
+            # .fillna is used to avoid minpack.error:
+            # Result from function call is not a proper array of floats.
+            values = self.loc[:,:,col].astype(float).fillna(value=0.0)
+            col_residues[col] = []
+            
+            for row, res, points, enough_data in residues:
+                xdata = pd.Series(
+                    x_values[points],
+                    index=self.items[points]
+                    )
+                ydata = values.loc[row].iloc[points]
+                col_residues[col].append((res, xdata, ydata, enough_data))
+                
+                if enough_data:
+                    to_fit_data.append((xdata, ydata, res))
+        
+        fits = iter(fit_residues(
+            fit_function,
+            to_fit_data,
+            self.xfit,
+            workers=workers,
+            batch=batch,
+            cache=cache,
+            mindp=mindp,
+            model=to_fit,
+            bootstrap=bootstrap,
+            confidence_level=confidence_level,
+            executor=executor
+            ))
+        
+        table_rows = []
+        
+        for col in cols:
+            table_rows.extend(
+                '{},{}'.format(col, row)
+                for row in self._writes_fit_results(
+                    col,
+                    to_fit,
+                    col_residues[col],
+                    fits
+                    )
+                )
+        
+        if fit_table:
+            table_name = os.path.join(
+                self.tables_and_plots_folder,
+                'fit_table.csv'
+                )
+            
+            with open(table_name, 'w') as table:
+                table.write(
+                    '#column,{}'.format(to_fit.results_header().lstrip('#'))
+                    )
+                table.writelines(table_rows)
+            
+            self.logs(
+                "*** Fit table of the series written: {}".format(table_name)
+                )
+        
+        if cache is not None:
+            self.logs("*** Fit cache: {} hits, {} misses".format(
+                cache.hits - hits,
+                cache.misses - misses
+                ))
+        
+        return
+    
+    def _writes_fit_results(self, col, to_fit, residues, fits):
+        """
+        Writes the fit report and table of <col> and stores the fit
+        results for the plots.
+        
+        Parameters:
+            col (str): the fitted column.
+            
+            to_fit (FittingBase): the fitting model.
+            
+            residues (list): (res, xdata, ydata, enough_data) of
+                each residue.
+            
+            fits (iterator): the output of FittingBase.fit_data() for
+                each residue with enough data.
+        
+        Returns:
+            list with the fit table rows of the fitted residues.
+        """
         col_path = os.path.join(self.tables_and_plots_folder, col)
         
         if not(os.path.exists(col_path)):
             os.makedirs(col_path)
         
         logfrep_name = os.path.join(
-            self.tables_and_plots_folder,
-            col,
+            col_path,
             "{}_fit_report.log".format(col)
             )
-        logfreport = open(logfrep_name, 'w')
-        logfreport.write(to_fit.fit_log_header(col))
         logftable_name = os.path.join(
-            self.tables_and_plots_folder,
-            col,
+            col_path,
             '{}_fit_table.csv'.format(col)
             )
+        logfreport = open(logfrep_name, 'w')
+        logfreport.write(to_fit.fit_log_header(col))
         logftable = open(logftable_name, 'w')
         logftable.write(to_fit.results_header())
-        self.logs('** Performing fitting for {}...'.format(col))
-        measured_mask = self.loc[:,:, 'Peak Status'] == 'measured'
-        self.xfit = np.linspace(0, x_values[-1], 200, endpoint=True)
+        table_rows = []
         
-        for row in self.major_axis:
-            mmask = measured_mask.loc[row,:]
-            res = int(self.loc[self.items[0],row, 'ResNo'])
+        for res, xdata, ydata, enough_data in residues:
             col_res = "{}_{}".format(col,res)
-            xdata = pd.Series(x_values)[np.array(mmask)]
-            # .fillna is used to avoid minpack.error:
-            # Result from function call is not a proper array of floats.
-            ydata = self.loc[mmask,row,col].fillna(value=0.0)
-            xdata.index = ydata.index
             
-            if mmask.sum() < mindp:
+            if not(enough_data):
                 # residue does not have enough data to perform fit
                 logfreport.write(to_fit.not_enough_data(res, xdata, ydata))
                 self.fit_okay[col_res] = False
@@ -3167,26 +3646,257 @@ but measured in a subsequent peaklist".\
                 self.fit_plot_ydata[col_res] = None
                 continue
             
-            a, b, c, d, e = \
-                to_fit.fit_data(
-                    xdata,
-                    ydata,
-                    res,
-                    self.xfit
-                    )
+            a, b, c, d, e = next(fits)
             logfreport.write(a)
             logftable.write(b)
+            table_rows.append(b)
             self.fit_plot_text[col_res] = c
             self.fit_okay[col_res] = d
             self.fit_plot_ydata[col_res] = e
+            self.logger.debug("*** Fit residue {} {} - {}".format(
+                res,
+                col,
+                'OK!' if d else 'Failed!'
+                ))
         
         logfreport.close()
         self.logs("*** Fit report log file written: {}".format(logfrep_name))
         logftable.close()
         self.logs("*** Fit table log file written: {}".format(logftable_name))
         
-        return
+        return table_rows
+
+
+def _fitting_model(fit_function):
+    """Instance of the fitting library <fit_function>."""
+    
+    return locate('core.fslibs.fitting_functions.{}'.format(fit_function))()
+
+
+def _fit_params(fit_function, xdata, ydata):
+    """Fits the data of a residue, see FittingBase.fit_params()."""
+    
+    return _fitting_model(fit_function).fit_params(xdata, ydata)
+
+
+def _fit_params_batch(fit_function, to_fit_xy):
+    """
+    Fits the data of several residues at once,
+    see FittingBase.fit_params_batch().
+    """
+    
+    return _fitting_model(fit_function).fit_params_batch(to_fit_xy)
+
+
+def _fit_intervals_batch(
+        fit_function,
+        to_fit_xy,
+        popts,
+        replicates,
+        confidence_level):
+    """
+    Bootstrap confidence intervals of the fits of several residues,
+    see FittingBase.fit_intervals_batch().
+    """
+    
+    model = _fitting_model(fit_function)
+    model.confidence_level = confidence_level
+    
+    return model.fit_intervals_batch(to_fit_xy, popts, replicates)
+
+
+def _map(executor, workers, fn, *iterables, chunksize=1):
+    """
+    executor.map() gathered in a list. A process pool of <workers> is
+    created for the call if <executor> is None.
+    """
+    
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(fn, *iterables, chunksize=chunksize))
+    
+    return list(executor.map(fn, *iterables, chunksize=chunksize))
+
+
+def _split(items, nbatches):
+    """Splits <items> in at most <nbatches> consecutive batches."""
     
+    if not(items):
+        return []
+    
+    nbatches = min(max(nbatches, 1), len(items))
+    size = ceil(len(items) / nbatches)
+    
+    return [items[i:i+size] for i in range(0, len(items), size)]
+
+
+def fit_residues(
+        fit_function,
+        to_fit_data,
+        xfit,
+        workers=1,
+        batch=False,
+        cache=None,
+        mindp=None,
+        model=None,
+        bootstrap=0,
+        confidence_level=95,
+        executor=None):
+    """
+    Fits the data of several residues.
+    
+    Parameters:
+        fit_function (str): fitting library name according to
+            core.fslibs.fitting_functions.__init__.py
+        
+        to_fit_data (list): (xdata, ydata, res) of each residue.
+        
+        xfit (np.ndarray): the x values of the fitted curve.
+        
+        workers (int): number of processes fitting the residues.
+        
+        batch (bool): fits all the residues at once with the
+            vectorized Levenberg-Marquardt solver, see
+            FittingBase.fit_params_batch(). With several workers, each
+            one fits a batch.
+        
+        cache (Cache.FitCache): fits found in the cache are not
+            performed again, new fits are stored.
+        
+        mindp (int): minimum number of data points of a fit, part of
+            the cache keys.
+        
+        model (FittingBase): the <fit_function> instance, if already
+            resolved.
+        
+        bootstrap (int): number of bootstrap replicates of each
+            successful fit, see FittingBase.fit_intervals_batch(). The
+            replicates of all the residues are fitted at once, split
+            among the workers. 0 to not estimate confidence intervals.
+        
+        confidence_level (float): percentage of the confidence
+            intervals.
+        
+        executor (concurrent.futures.Executor): process pool of
+            <workers> that performs the parallel fits. A pool is
+            created for each parallel step if not given.
+    
+    Returns:
+        list with the output of FittingBase.fit_data() for each residue,
+        in the order of <to_fit_data>.
+    """
+    
+    model = model or _fitting_model(fit_function)
+    
+    # models that implement their own .fit_data() workflow fit each
+    # residue with it, without parallel, batch, cache or bootstrap.
+    if type(model).fit_data is not FittingBase.fit_data:
+        return [model.fit_data(x, y, res, xfit) for x, y, res in to_fit_data]
+    
+    params = [None] * len(to_fit_data)
+    to_fit = list(range(len(to_fit_data)))
+    method = 'batch' if batch else 'curve_fit'
+    
+    if bootstrap:
+        model.confidence_level = confidence_level
+        method = '{}+bootstrap{}-{}'.format(method, bootstrap, confidence_level)
+    
+    if cache is not None:
+        keys = [
+            cache.fit_key(
+                fit_function,
+                model.version,
+                method,
+                x,
+                y,
+                mindp
+                )
+            for x, y, _ in to_fit_data
+            ]
+        to_fit = []
+        
+        for i, key in enumerate(keys):
+            params[i], found = cache.get_fit(key)
+            
+            if not(found):
+                to_fit.append(i)
+    
+    to_fit_xy = [to_fit_data[i][:2] for i in to_fit]
+    
+    if not(to_fit_xy):
+        fitted = []
+    
+    elif batch:
+        batches = _split(to_fit_xy, workers)
+        
+        if len(batches) == 1:
+            fitted = model.fit_params_batch(to_fit_xy)
+        
+        else:
+            fitted = list(it.chain.from_iterable(_map(
+                executor,
+                workers,
+                _fit_params_batch,
+                it.repeat(fit_function),
+                batches
+                )))
+    
+    elif workers <= 1 or len(to_fit_xy) == 1:
+        fitted = [model.fit_params(x, y) for x, y in to_fit_xy]
+    
+    else:
+        xdatas, ydatas = zip(*to_fit_xy)
+        
+        fitted = _map(
+            executor,
+            workers,
+            _fit_params,
+            it.repeat(fit_function),
+            xdatas,
+            ydatas,
+            chunksize=max(1, ceil(len(to_fit_xy) / (4 * workers)))
+            )
+    
+    if bootstrap:
+        okay = [k for k, p in enumerate(fitted) if p is not None]
+        batches = _split(okay, workers)
+        
+        if len(batches) <= 1:
+            intervals = model.fit_intervals_batch(
+                [to_fit_xy[k] for k in okay],
+                [fitted[k][0] for k in okay],
+                bootstrap
+                )
+        
+        else:
+            intervals = list(it.chain.from_iterable(_map(
+                executor,
+                workers,
+                _fit_intervals_batch,
+                it.repeat(fit_function),
+                [[to_fit_xy[k] for k in b] for b in batches],
+                [[fitted[k][0] for k in b] for b in batches],
+                it.repeat(bootstrap),
+                it.repeat(confidence_level)
+                )))
+        
+        for k, ci in zip(okay, intervals):
+            fitted[k] = (*fitted[k], ci)
+    
+    for i, fit_params in zip(to_fit, fitted):
+        params[i] = fit_params
+        
+        if cache is not None:
+            cache.put_fit(keys[i], fit_params, evict=False)
+    
+    if cache is not None and to_fit:
+        cache.evict()
+    
+    return [
+        model.fit_output(res, x, y, p, xfit)
+        for (x, y, res), p in zip(to_fit_data, params)
+        ]
+
 if __name__ == "__main__":
     
     print('FarseerSeries')
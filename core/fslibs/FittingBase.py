@@ -21,6 +21,173 @@ You should have received a copy of the GNU General Public License
 along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
 """
 from abc import ABCMeta, abstractmethod
+import inspect
+import numpy as np
+import scipy.optimize as sciopt
+
+# default tolerances of scipy.optimize.curve_fit
+FTOL = 1.49012e-08
+XTOL = 1.49012e-08
+
+
+def levenberg_marquardt(
+        equation,
+        jacobian,
+        x,
+        y,
+        mask,
+        p0,
+        lower=-np.inf,
+        upper=np.inf,
+        max_iter=None,
+        ftol=FTOL,
+        xtol=XTOL):
+    """
+    Least squares fit of several data sets at once with the
+    Levenberg-Marquardt algorithm.
+
+    Every data set is a row of the (sets, points) arrays. Each set
+    keeps its own damping factor and stops iterating when it
+    converges, so that sets do not affect each other.
+
+    Parameters:
+        equation (function): equation(x, *params), vectorized, each
+            parameter is given as a (sets, 1) array.
+
+        jacobian (function): jacobian(x, *params), the derivatives of
+            <equation> stacked in the last axis, (sets, points, params).
+
+        x, y (np.ndarray): (sets, points) data.
+
+        mask (np.ndarray): (sets, points) bool, False for the points
+            that are not part of the set.
+
+        p0 (np.ndarray): (sets, params) initial parameters.
+
+        lower, upper (np.ndarray): bounds of the parameters, broadcast
+            to (sets, params). Steps are projected into the bounds.
+
+        max_iter (int): maximum number of iterations, defaults to the
+            curve_fit maximum number of function evaluations.
+
+        ftol, xtol (float): relative tolerances in the sum of squares
+            and in the parameters, as in scipy.optimize.leastsq.
+
+    Returns:
+        popt (np.ndarray): (sets, params) optimal parameters.
+
+        pcov (np.ndarray): (sets, params, params) covariance of popt,
+            computed as curve_fit does with absolute_sigma=False.
+
+        converged (np.ndarray): (sets,) bool.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    weights = np.asarray(mask, dtype=np.float64)
+    popt = np.array(p0, dtype=np.float64)
+    nsets, nparams = popt.shape
+    lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), popt.shape)
+    upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), popt.shape)
+    popt = np.clip(popt, lower, upper)
+    max_iter = max_iter or 200 * (nparams + 1)
+
+    everything = slice(None)
+
+    def residuals(params, sets=everything):
+        with np.errstate(all='ignore'):
+            res = (equation(x[sets], *params.T[:, :, None]) - y[sets]) \
+                * weights[sets]
+
+        return res, (res**2).sum(axis=1)
+
+    def jac(params, sets=everything):
+        with np.errstate(all='ignore'):
+            return jacobian(x[sets], *params.T[:, :, None]) \
+                * weights[sets][:, :, None]
+
+    res, cost = residuals(popt)
+    damping = np.full(nsets, 1e-3)
+    converged = np.zeros(nsets, dtype=bool)
+    failed = ~np.isfinite(cost)
+
+    for _ in range(max_iter):
+        active = np.flatnonzero(~converged & ~failed)
+
+        if not active.size:
+            break
+
+        J = jac(popt[active], active)
+        finite = np.isfinite(J).all(axis=(1, 2))
+        failed[active[~finite]] = True
+        active, J = active[finite], J[finite]
+        JtJ = np.einsum('spi,spj->sij', J, J)
+        grad = np.einsum('spi,sp->si', J, res[active])
+        diag = np.einsum('sii->si', JtJ)
+        A = JtJ + (damping[active, None] * np.maximum(diag, 1e-12))[:, :, None] \
+            * np.eye(nparams)
+
+        # -pinv(A) @ grad from the SVD of each A, np.linalg.pinv()
+        # does not take stacked matrices before numpy 1.14
+        U, sa, VTa = np.linalg.svd(A)
+        inv_sa = np.where(
+            sa > 1e-15 * sa[:, :1],
+            1 / np.where(sa > 0, sa, 1),
+            0
+            )
+
+        with np.errstate(all='ignore'):
+            step = -np.einsum('sji,sj,skj,sk->si', VTa, inv_sa, U, grad)
+
+        new_popt = np.clip(
+            popt[active] + step,
+            lower[active],
+            upper[active]
+            )
+        step = new_popt - popt[active]
+        new_res, new_cost = residuals(new_popt, active)
+        accepted = np.isfinite(new_cost) & (new_cost <= cost[active])
+        acc = active[accepted]
+        # convergence, as in MINPACK lmder: the actual and the predicted
+        # reductions of the sum of squares are small
+        actual = cost[acc] - new_cost[accepted]
+        Jstep = np.einsum('spi,si->sp', J[accepted], step[accepted])
+        predicted = -2 * np.einsum('si,si->s', grad[accepted], step[accepted]) \
+            - (Jstep**2).sum(axis=1)
+        small_cost = (actual <= ftol * cost[acc]) \
+            & (predicted <= ftol * cost[acc]) \
+            & (actual <= 2 * predicted)
+        small_step = np.linalg.norm(step[accepted], axis=1) \
+            <= xtol * (np.linalg.norm(new_popt[accepted], axis=1) + xtol)
+        popt[acc] = new_popt[accepted]
+        res[acc] = new_res[accepted]
+        cost[acc] = new_cost[accepted]
+        converged[acc] = small_cost | small_step | (cost[acc] == 0)
+        damping[acc] = np.maximum(damping[acc] / 10, 1e-15)
+        rejected = active[~accepted]
+        damping[rejected] *= 10
+        failed[rejected] = ~np.all(np.isfinite(step[~accepted]), axis=1) \
+            | (damping[rejected] > 1e16)
+
+    # covariance from the Moore-Penrose inverse of J, as curve_fit
+    okay = np.flatnonzero(converged & ~failed)
+    pcov = np.full((nsets, nparams, nparams), np.inf)
+    J = jac(popt[okay], okay)
+    finite = np.isfinite(J).all(axis=(1, 2))
+    failed[okay[~finite]] = True
+    okay, J = okay[finite], J[finite]
+    _, sv, VT = np.linalg.svd(J, full_matrices=False)
+    threshold = np.finfo(float).eps * x.shape[1] * sv[:, :1]
+    inv_sv2 = np.where(sv > threshold, 1 / np.where(sv > 0, sv, 1)**2, 0)
+    dof = weights[okay].sum(axis=1) - nparams
+
+    with np.errstate(all='ignore'):
+        pcov[okay] = np.einsum('sji,sj,sjk->sik', VT, inv_sv2, VT) \
+            * np.where(dof > 0, cost[okay] / dof, np.inf)[:, None, None]
+
+    pcov[~np.isfinite(pcov).all(axis=(1, 2))] = np.inf
+
+    return popt, pcov, converged & ~failed
+
 
 class FittingBase(metaclass=ABCMeta):
     """
@@ -96,8 +263,304 @@ ydata: {}
         
         return s2w
     
-    @abstractmethod
-    def fit_data(self, *args):
-        """Workflow for fitting data with the specific equation."""
-        pass
-
+    def initial_guess(self, x, y):
+        """
+        Initial parameters of the fit of <x>, <y>.
+        
+        OPTIONAL, defaults to 1 for every parameter of .equation(),
+        as scipy.optimize.curve_fit does without p0.
+        """
+        nparams = len(inspect.signature(self.equation).parameters) - 1
+        
+        return [1.] * nparams
+    
+    def fit_okay(self, res, x, y, popt, pcov, xfit, ci=None):
+        """
+        The output of .fit_data() for a fit that converged to <popt>,
+        <pcov>: fit_report.log text, fit_table.csv row, plot text,
+        True and the fitted curve at <xfit>.
+        
+        <ci> are the confidence intervals of <popt> when
+        .confidence_level is set, see .fit_intervals_batch(). They are
+        passed to .log_okay(), .results() and .txt_plot() as the <ci>
+        kwarg, models that do not report intervals never receive it.
+        
+        Models whose outputs need other values, as the yhalf of
+        HillEquation, override this method.
+        """
+        kwargs = {} if ci is None else {'ci': ci}
+        a = self.log_okay(res, x, y, popt, pcov, **kwargs)
+        b = self.results(res, popt, **kwargs)
+        c = self.txt_plot(popt, **kwargs)
+        d = True
+        e = self.equation(xfit, *popt)
+        
+        return a, b, c, d, e
+    
+    def fit_not_okay(self, res, x, y):
+        """
+        The output of .fit_data() for a fit that failed, the
+        fit_table.csv row is .results(res, None, status='failed').
+        """
+        a = self.fit_failed(res, x, y)
+        b = self.results(res, None, status='failed')
+        c = "fit failed"
+        d = False
+        e = None
+        
+        return a, b, c, d, e
+    
+    # increase when the fitting routines change the fitted parameters,
+    # so that previously cached fits are not used, see Cache.FitCache.
+    version = '1'
+    
+    # percentage of the bootstrap confidence intervals reported by
+    # .fit_okay(), None when intervals are not estimated,
+    # see .fit_intervals_batch().
+    confidence_level = None
+    
+    # the synthetic data sets of the bootstrap are reproducible
+    bootstrap_seed = 0
+    
+    # OPTIONAL, used by .optimize() and enables .fit_params_batch():
+    # jacobian(x, *params), the derivatives of .equation() with respect
+    # to each parameter stacked in the last axis, vectorized as
+    # .equation().
+    jacobian = None
+    
+    def bounds(self, x, y):
+        """
+        Lower and upper bounds of the parameters of the fit of <x>, <y>,
+        as in scipy.optimize.curve_fit.
+        """
+        return (-np.inf, np.inf)
+    
+    def optimize(self, x, y):
+        """
+        Fits <x>, <y> to .equation() with scipy.optimize.curve_fit,
+        starting from .initial_guess() and within .bounds(). Uses the
+        .jacobian, if defined, instead of finite differences.
+        
+        Returns:
+            popt, pcov as curve_fit.
+        
+        Raises:
+            the curve_fit errors when the fit fails.
+        """
+        kwargs = {
+            'p0': self.initial_guess(x, y),
+            'bounds': self.bounds(x, y)
+            }
+        
+        if self.jacobian is not None:
+            kwargs['jac'] = self.jacobian
+        
+        return sciopt.curve_fit(self.equation, x, y, **kwargs)
+    
+    def fit_params(self, x, y):
+        """
+        Returns:
+            (popt, pcov) of the fit of <x>, <y>, or None if it failed.
+        """
+        try:
+            return self.optimize(x, y)
+        
+        except Exception:
+            return None
+    
+    def fit_params_batch(self, to_fit_xy):
+        """
+        Fits several data sets at once, see levenberg_marquardt().
+        
+        Models without .jacobian are fitted one by one with .optimize().
+        
+        Parameters:
+            to_fit_xy (list): (xdata, ydata) of each data set.
+        
+        Returns:
+            list with the output of .fit_params() for each data set.
+        """
+        if self.jacobian is None:
+            return [self.fit_params(x, y) for x, y in to_fit_xy]
+        
+        if not(to_fit_xy):
+            return []
+        
+        npoints = max(len(y) for _, y in to_fit_xy)
+        shape = (len(to_fit_xy), npoints)
+        xx, yy = np.zeros(shape), np.zeros(shape)
+        mask = np.zeros(shape, dtype=bool)
+        
+        for i, (x, y) in enumerate(to_fit_xy):
+            xx[i, :len(x)] = x
+            yy[i, :len(y)] = y
+            mask[i, :len(y)] = True
+        
+        bounds = [self.bounds(x, y) for x, y in to_fit_xy]
+        popt, pcov, converged = levenberg_marquardt(
+            self.equation,
+            self.jacobian,
+            xx,
+            yy,
+            mask,
+            [self.initial_guess(x, y) for x, y in to_fit_xy],
+            lower=[lower for lower, _ in bounds],
+            upper=[upper for _, upper in bounds]
+            )
+        
+        return [
+            (popt[i], pcov[i]) if converged[i] else None
+            for i in range(len(to_fit_xy))
+            ]
+    
+    def resample(self, x, y, popt, replicates):
+        """
+        Synthetic data sets of <x>, <y> for the residual bootstrap.
+        
+        Each data set is the fitted curve plus residuals of the fit
+        drawn with replacement. Residuals are scaled by
+        sqrt(n/(n-params)) to compensate for their shrinkage by the
+        fit.
+        
+        Returns:
+            (replicates, points) np.ndarray
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        yfit = self.equation(x, *popt)
+        residuals = y - yfit
+        npoints, nparams = len(y), len(popt)
+        
+        if npoints > nparams:
+            residuals = residuals * np.sqrt(npoints/(npoints-nparams))
+        
+        rng = np.random.RandomState(self.bootstrap_seed)
+        
+        return yfit + residuals[rng.randint(0, npoints, (replicates, npoints))]
+    
+    def fit_intervals_batch(self, to_fit_xy, popts, replicates):
+        """
+        Bootstrap confidence intervals of the fitted parameters of
+        several data sets.
+        
+        <replicates> synthetic data sets are generated for each data
+        set, see .resample(), and fitted starting from its <popts>.
+        With .jacobian, all the synthetic data sets are fitted at once,
+        see levenberg_marquardt(). The intervals are the percentiles of
+        the fitted parameters at .confidence_level.
+        
+        Parameters:
+            to_fit_xy (list): (xdata, ydata) of each data set.
+            
+            popts (list): the fitted parameters of each data set.
+            
+            replicates (int): number of synthetic data sets.
+        
+        Returns:
+            list with a (2, params) np.ndarray with the lower and upper
+            limits of the parameters of each data set, NaN when less
+            than two synthetic data sets were fitted.
+        """
+        if not(to_fit_xy):
+            return []
+        
+        level = self.confidence_level or 95
+        percentiles = [50 - level/2, 50 + level/2]
+        nparams = len(popts[0])
+        samples = []
+        
+        if self.jacobian is None:
+            for (x, y), popt in zip(to_fit_xy, popts):
+                bounds = self.bounds(x, y)
+                fitted = []
+                
+                for ysyn in self.resample(x, y, popt, replicates):
+                    try:
+                        fitted.append(sciopt.curve_fit(
+                            self.equation,
+                            np.asarray(x, dtype=np.float64),
+                            ysyn,
+                            p0=popt,
+                            bounds=bounds
+                            )[0])
+                    
+                    except Exception:
+                        continue
+                
+                samples.append(np.reshape(fitted, (-1, nparams)))
+        
+        else:
+            npoints = max(len(y) for _, y in to_fit_xy)
+            shape = (len(to_fit_xy), replicates, npoints)
+            xx, yy = np.zeros(shape), np.zeros(shape)
+            mask = np.zeros(shape, dtype=bool)
+            lower = np.empty((len(to_fit_xy), replicates, nparams))
+            upper = np.empty((len(to_fit_xy), replicates, nparams))
+            
+            for i, ((x, y), popt) in enumerate(zip(to_fit_xy, popts)):
+                xx[i, :, :len(x)] = x
+                yy[i, :, :len(y)] = self.resample(x, y, popt, replicates)
+                mask[i, :, :len(y)] = True
+                lower[i], upper[i] = self.bounds(x, y)
+            
+            popt, _, converged = levenberg_marquardt(
+                self.equation,
+                self.jacobian,
+                xx.reshape(-1, npoints),
+                yy.reshape(-1, npoints),
+                mask.reshape(-1, npoints),
+                np.repeat(np.asarray(popts, dtype=np.float64), replicates, 0),
+                lower=lower.reshape(-1, nparams),
+                upper=upper.reshape(-1, nparams)
+                )
+            popt = popt.reshape(len(to_fit_xy), replicates, nparams)
+            converged = converged.reshape(len(to_fit_xy), replicates)
+            samples = [p[c] for p, c in zip(popt, converged)]
+        
+        return [
+            np.percentile(sample, percentiles, axis=0)
+                if len(sample) > 1 else np.full((2, nparams), np.nan)
+            for sample in samples
+            ]
+    
+    def fit_output(self, res, x, y, params, xfit):
+        """
+        The output of .fit_data() for the .fit_params() <params>,
+        optionally followed by the confidence intervals of the
+        parameters.
+        """
+        if params is None:
+            return self.fit_not_okay(res, x, y)
+        
+        popt, pcov, *ci = params
+        
+        return self.fit_okay(res, x, y, popt, pcov, xfit, *ci)
+    
+    def fit_data(self, x, y, res, xfit):
+        """
+        Workflow for fitting data with the specific equation.
+        
+        Returns:
+            see .fit_okay().
+        """
+        return self.fit_output(res, x, y, self.fit_params(x, y), xfit)
+    
+    def fit_data_batch(self, to_fit_data, xfit):
+        """
+        Fits the data of several residues at once,
+        see .fit_params_batch().
+        
+        Parameters:
+            to_fit_data (list): (xdata, ydata, res) of each residue.
+            
+            xfit (np.ndarray): the x values of the fitted curve.
+        
+        Returns:
+            list with the output of .fit_data() for each residue.
+        """
+        params = self.fit_params_batch([(x, y) for x, y, _ in to_fit_data])
+        
+        return [
+            self.fit_output(res, x, y, p, xfit)
+            for (x, y, res), p in zip(to_fit_data, params)
+            ]
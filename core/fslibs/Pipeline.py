@@ -0,0 +1,128 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import queue
+import threading
+
+import core.fslibs.Logger as Logger
+
+# marks the end of the items
+_END = object()
+
+
+class Pipeline:
+    """
+    Processes items in a background thread while the main thread
+    produces the next ones.
+
+    Items wait in a bounded queue: when <depth> items are waiting,
+    .put() blocks until the consumer takes one, so that at most
+    <depth> + 1 items are held in memory.
+
+    Errors of the consumer stop the pipeline and are raised in the main
+    thread by the next .put() or by .close(). Used as a context
+    manager, the pipeline is closed on exit, and the waiting items are
+    discarded if the main thread raised an error.
+
+    Attributes:
+        consume (function): called with each item, in order.
+
+        depth (int): the size of the queue. With 0, items are consumed
+            by .put() in the main thread.
+    """
+
+    def __init__(self, consume, depth=0):
+        self.logger = Logger.FarseerLogger(__name__).setup_log()
+        self.consume = consume
+        self.depth = depth
+        self.error = None
+        self.cancelled = False
+        self.queue = None
+        self.thread = None
+
+        if depth > 0:
+            self.queue = queue.Queue(maxsize=depth)
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+
+            if item is _END:
+                return
+
+            if self.error is not None or self.cancelled:
+                # drains the queue so that .put() does not block
+                continue
+
+            try:
+                self.consume(item)
+
+            except BaseException as error:
+                self.error = error
+
+    def _raise(self):
+        if self.error is not None:
+            raise self.error
+
+    def put(self, item):
+        """Queues <item> to be consumed."""
+        if self.thread is None:
+            self.consume(item)
+            return None
+
+        self._raise()
+        self.queue.put(item)
+        self.logger.debug(
+            'Items in the pipeline: {}'.format(self.queue.qsize())
+            )
+
+        return None
+
+    def close(self):
+        """Waits until all the items are consumed."""
+        if self.thread is not None:
+            self.queue.put(_END)
+            self.thread.join()
+            self.thread = None
+
+        self._raise()
+
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+        else:
+            self.cancelled = True
+
+            if self.thread is not None:
+                self.queue.put(_END)
+                self.thread.join()
+                self.thread = None
+
+        return False
@@ -0,0 +1,224 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import core.fslibs.Logger as Logger
+
+
+_worker_ready = False
+
+
+def _init_worker():
+    """Loads the Agg backend once for all the figures of a worker."""
+    global _worker_ready
+
+    if _worker_ready:
+        return None
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot
+    _worker_ready = True
+
+    return None
+
+
+def render(series, args, kwargs):
+    """
+    Draws a figure with FarseerSeries.plot_base().
+
+    Parameters:
+        series (FarseerSeries or bytes): the series to plot, or its
+            pickle.
+
+        args, kwargs: passed to FarseerSeries.plot_base().
+
+    Returns:
+        list with the absolute paths of the figure files.
+    """
+    # pickled series are drawn in the worker processes, the backend
+    # is set before unpickling imports pyplot
+    if isinstance(series, bytes):
+        _init_worker()
+        series = pickle.loads(series)
+
+    return [os.path.abspath(p) for p in series.plot_base(*args, **kwargs)]
+
+
+class RenderPool:
+    """
+    Draws the figures of the FarseerSeries in a pool of processes.
+
+    Each figure is a job with the pickled series and the arguments of
+    FarseerSeries.plot_base(). The series is pickled at its first
+    figure and the same pickle is sent with all its figures until
+    .release() is called, so that the series data is serialized once
+    and not once per figure. Changes to the series after its first
+    figure do not affect the figures, call .release() before
+    drawing a series that changed. With a single worker, figures are
+    drawn when submitted.
+
+    Figures can be submitted from several threads, see Pipeline.
+    Figures drawn in place are drawn one at a time, since pyplot is
+    not thread safe.
+
+    Attributes:
+        workers (int): number of processes drawing the figures.
+
+        max_pending (int): when more figures are being drawn,
+            .submit() waits for the oldest ones, so that the pickled
+            series do not pile up in memory.
+
+        pending (list): (future, callback) of the submitted jobs not
+            yet collected.
+
+        pickles (dict): id of a series -> (series, pickle) of the series
+            with figures submitted and not released.
+    """
+
+    def __init__(self, workers=1, max_pending=None):
+        self.logger = Logger.FarseerLogger(__name__).setup_log()
+        self.workers = workers
+        self.max_pending = max_pending or 4 * workers
+        self.pending = []
+        self.pickles = {}
+        self.lock = threading.Lock()
+        self.executor = None
+
+        if workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+            # starts the processes now, before other threads run,
+            # see Pipeline
+            self.executor.submit(os.getpid).result()
+
+    def submit(self, series, args, kwargs, callback=None):
+        """
+        Draws a figure, see render().
+
+        Parameters:
+            callback (function): called in the main process with the
+                output of render() when the figure is drawn.
+        """
+        if self.executor is None:
+            with self.lock:
+                outputs = render(series, args, kwargs)
+
+            if callback is not None:
+                callback(outputs)
+
+            return None
+
+        future = self.executor.submit(render, self._pickle(series), args, kwargs)
+
+        with self.lock:
+            self.pending.append((future, callback))
+
+        while len(self.pending) > self.max_pending:
+            self._collect()
+
+        return None
+
+    def _pickle(self, series):
+        """The pickle of <series>, see .release()."""
+        with self.lock:
+            # the series is kept so that its id is not reused
+            _, data = self.pickles.get(id(series), (None, None))
+
+            if data is None:
+                data = pickle.dumps(series, protocol=pickle.HIGHEST_PROTOCOL)
+                self.pickles[id(series)] = (series, data)
+
+        return data
+
+    def release(self, series):
+        """
+        Drops the pickle of <series>, its next figure pickles it again.
+        Call when the series changes or all its figures were submitted.
+        """
+        with self.lock:
+            self.pickles.pop(id(series), None)
+
+        return None
+
+    def _collect(self):
+        """
+        Waits for the oldest figure.
+
+        Returns:
+            False if there were no figures pending.
+        """
+        with self.lock:
+            if not(self.pending):
+                return False
+
+            future, callback = self.pending.pop(0)
+
+        outputs = future.result()
+
+        if callback is not None:
+            callback(outputs)
+
+        return True
+
+    def wait(self):
+        """
+        Waits for the submitted figures, in the submission order.
+
+        Raises:
+            the errors of the figures that failed.
+        """
+        while self._collect():
+            pass
+
+        return None
+
+    def close(self, cancel=False):
+        """
+        Waits for the submitted figures and stops the processes.
+
+        Parameters:
+            cancel (bool): cancels the figures not yet being drawn
+                instead of waiting for them, when the run stops on an
+                error.
+        """
+        try:
+            if not(cancel):
+                self.wait()
+
+        finally:
+            with self.lock:
+                pending, self.pending = self.pending, []
+                self.pickles = {}
+
+            # figures already being drawn cannot be cancelled
+            for future, _ in pending:
+                future.cancel()
+
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+
+        return None
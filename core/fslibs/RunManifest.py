@@ -0,0 +1,331 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import core.fslibs.Logger as Logger
+from core.fslibs.Cache import hash_file
+
+# increase when the structure of the manifest changes
+MANIFEST_VERSION = '1'
+
+# config sections that do not change the results
+IGNORED_SECTIONS = ('cache_settings',)
+IGNORED_GENERAL_SETTINGS = (
+    'load_workers',
+    'calc_workers',
+    'fit_workers',
+    'plot_workers',
+    'pipeline_depth',
+    'incremental_run'
+    )
+
+# config sections that only change the figures. Figures are
+# fingerprinted by the arguments they are drawn with, so these
+# sections do not invalidate the calculations.
+PLOT_SECTIONS = (
+    'series_plot_settings',
+    'bar_plot_settings',
+    'plotting_flags',
+    'extended_bar_settings',
+    'compact_bar_settings',
+    'vert_bar_settings',
+    'DPRE_plot_settings',
+    'res_evo_settings',
+    'cs_scatter_settings',
+    'cs_scatter_flower_settings',
+    'heat_map_settings'
+    )
+
+
+def fingerprint(*objs):
+    """
+    sha256 hex digest of JSON serializable <objs>.
+
+    Objects that are not JSON serializable are represented by their
+    str().
+    """
+    dump = json.dumps(objs, sort_keys=True, default=str)
+
+    return hashlib.sha256(dump.encode('utf-8')).hexdigest()
+
+
+def config_sections(fsuv, analysis_only=False):
+    """
+    Selects the config sections that affect the results of a run.
+
+    Parameters:
+        fsuv (dict): the Farseer-NMR configuration.
+
+        analysis_only (bool): also discards the sections and the
+            general settings that only affect the figures.
+
+    Returns:
+        dict
+    """
+    sections = {}
+
+    for section, value in fsuv.items():
+        if section in IGNORED_SECTIONS \
+                or (analysis_only and section in PLOT_SECTIONS):
+            continue
+
+        if section == 'general_settings':
+            value = {
+                k: v for k, v in value.items()
+                if k not in IGNORED_GENERAL_SETTINGS
+                    and not (analysis_only and k.startswith('fig_'))
+                }
+
+        sections[section] = value
+
+    return sections
+
+
+class RunManifest:
+    """
+    Registers what a Farseer-NMR run computed, so that the next run
+    only recomputes what changed.
+
+    The manifest is a JSON file in the output folder. It stores the
+    fingerprint of the whole run (input files and configuration) and,
+    for each stage of the run, its fingerprint and the output files it
+    wrote. A stage is up to date when its fingerprint did not change
+    and all its output files still exist.
+
+    Attributes:
+        output_path (str): the calculation output folder.
+
+        path (str): path to the manifest file.
+
+        run_fingerprint (str): fingerprint of the current run.
+
+        stages (dict): stage name -> {'fingerprint', 'outputs'} of the
+            stages of the current run.
+
+        lock (threading.RLock): stages are registered from several
+            threads in pipelined runs, see Pipeline.
+    """
+
+    file_name = 'farseer_manifest.json'
+
+    def __init__(self, output_path):
+        self.logger = Logger.FarseerLogger(__name__).setup_log()
+        self.output_path = os.path.abspath(output_path)
+        self.path = os.path.join(self.output_path, self.file_name)
+        self.run_fingerprint = None
+        self.stages = {}
+        self.lock = threading.RLock()
+
+        previous = self._load()
+        self.previous_run = previous.get('run')
+        self.previous_stages = previous.get('stages', {})
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as fin:
+                manifest = json.load(fin)
+
+        except (OSError, ValueError):
+            return {}
+
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+
+        return manifest
+
+    def fingerprint_inputs(self, spectra_path):
+        """
+        Fingerprints every file in the <spectra_path> folder tree.
+
+        Returns:
+            dict, relative file path -> sha256 of its content.
+        """
+        inputs = {}
+
+        for root, dirs, files in os.walk(spectra_path):
+            dirs.sort()
+
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                inputs[os.path.relpath(path, spectra_path)] = hash_file(path)
+
+        return inputs
+
+    def set_run(self, inputs, config, calc_steps=()):
+        """
+        Sets the fingerprint of the current run.
+
+        Parameters:
+            inputs (dict): the output of .fingerprint_inputs().
+
+            config (dict): the output of config_sections().
+
+            calc_steps (list): the calculations added to the
+                configuration, see FarseerNMR.add_calculation().
+        """
+        self.run_fingerprint = fingerprint(inputs, config, list(calc_steps))
+
+        return None
+
+    def run_is_up_to_date(self):
+        """
+        True if neither the input files nor the configuration changed
+        since the last complete run and its outputs still exist.
+        """
+        if self.run_fingerprint is None \
+                or self.run_fingerprint != self.previous_run:
+            return False
+
+        if not all(map(self._outputs_exist, self.previous_stages.values())):
+            return False
+
+        self.stages = dict(self.previous_stages)
+
+        return True
+
+    def _outputs_exist(self, record):
+        return all(
+            os.path.exists(os.path.join(self.output_path, output))
+            for output in record['outputs']
+            )
+
+    def is_up_to_date(self, stage, stage_fingerprint):
+        """
+        True if <stage> ran previously with the same fingerprint and
+        its outputs still exist. Up to date stages are kept in the
+        manifest of the current run.
+        """
+        record = self.previous_stages.get(stage)
+
+        if record is None \
+                or record['fingerprint'] != stage_fingerprint \
+                or not self._outputs_exist(record):
+            return False
+
+        with self.lock:
+            self.stages[stage] = record
+
+        return True
+
+    @staticmethod
+    def snapshot(folder):
+        """
+        Registers the state of the files in <folder>.
+
+        Returns:
+            dict, absolute file path -> (modification time, size).
+        """
+        files = {}
+
+        for root, _, file_names in os.walk(folder):
+            for file_name in file_names:
+                path = os.path.abspath(os.path.join(root, file_name))
+
+                try:
+                    stat = os.stat(path)
+
+                except OSError:
+                    continue
+
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+
+        return files
+
+    def record(self, stage, stage_fingerprint, folder, before):
+        """
+        Registers a stage of the current run.
+
+        Parameters:
+            stage (str): the stage name.
+
+            stage_fingerprint (str): fingerprint of the stage inputs.
+
+            folder (str): folder where the stage writes its outputs.
+
+            before (dict): .snapshot() of <folder> taken before the
+                stage ran, files created or modified since then are
+                the outputs of the stage.
+        """
+        after = self.snapshot(folder)
+        self.record_files(
+            stage,
+            stage_fingerprint,
+            [path for path, state in after.items() if before.get(path) != state]
+            )
+
+        return None
+
+    def record_files(self, stage, stage_fingerprint, paths):
+        """
+        Registers a stage of the current run that wrote the files in
+        <paths>, see .record().
+        """
+        outputs = sorted(
+            os.path.relpath(os.path.abspath(path), self.output_path)
+            for path in paths
+            )
+
+        with self.lock:
+            self.stages[stage] = {
+                'fingerprint': stage_fingerprint,
+                'outputs': outputs
+                }
+
+        return None
+
+    def save(self, complete=False):
+        """
+        Writes the manifest file.
+
+        Parameters:
+            complete (bool): whether the run finished. Partial manifests
+                keep the stages of the previous run not yet visited and
+                do not register the run fingerprint, so that an
+                interrupted run is resumed but never skipped.
+        """
+        with self.lock:
+            if complete:
+                stages = dict(self.stages)
+                run = self.run_fingerprint
+
+            else:
+                stages = {**self.previous_stages, **self.stages}
+                run = None
+
+            manifest = {
+                'version': MANIFEST_VERSION,
+                'run': run,
+                'stages': stages
+                }
+            tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+
+            with open(tmp_path, 'w') as fout:
+                json.dump(manifest, fout, indent=1, sort_keys=True)
+
+            os.replace(tmp_path, self.path)
+        self.logger.debug('Run manifest written: {}'.format(self.path))
+
+        return None
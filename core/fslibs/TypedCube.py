@@ -0,0 +1,413 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import itertools as it
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# a categorical column: integer codes, -1 for missing values,
+# and the values each code represents
+CodedArray = namedtuple('CodedArray', ['codes', 'categories'])
+
+
+def decode_categorical(codes, categories):
+    """
+    Translates integer codes back to the values they represent.
+
+    Parameters:
+        codes (np.ndarray): integer codes, -1 identifies missing values.
+
+        categories (np.ndarray): the values represented by each code.
+
+    Returns:
+        np.ndarray of dtype object with np.nan for missing values.
+    """
+    values = np.empty(codes.shape, dtype=object)
+    values[...] = np.nan
+    valid = codes >= 0
+    values[valid] = np.asarray(categories, dtype=object)[codes[valid]]
+
+    return values
+
+
+def memory_report(columns):
+    """
+    Tabulates the memory used by typed columns.
+
+    Parameters:
+        columns (iterable): (name, array, categories) of each column,
+            categories is None for numeric columns.
+
+    Returns:
+        pd.DataFrame indexed by column name.
+    """
+    rows = []
+
+    for col, array, categories in columns:
+        nbytes = array.nbytes
+
+        if categories is not None:
+            nbytes += sum(len(str(c)) for c in categories)
+
+        rows.append((
+            col,
+            str(array.dtype),
+            0 if categories is None else len(categories),
+            nbytes / 1e6
+            ))
+
+    return pd.DataFrame(
+        rows,
+        columns=['column', 'dtype', 'categories', 'MB']
+        ).set_index('column')
+
+
+def is_numeric_array(array):
+    """True if <array> can be stored as a numeric typed array."""
+    return np.issubdtype(array.dtype, np.number) \
+        or np.issubdtype(array.dtype, np.bool_)
+
+
+class TypedCube:
+    """
+    The typed storage engine of the Farseer-NMR Cube.
+
+    Each column is a (z, y, x, residue) np.ndarray, numeric columns
+    as int64 or float64 and string columns as int32 codes of their
+    categories. The residue axis is padded to the longest peaklist,
+    see .is_missing().
+
+    Attributes:
+        coords (list): three lists with the coordinate names of the
+            first three array dimensions.
+
+        minor_axis (list): ordered column names.
+
+        numeric (dict): column name -> np.ndarray of numbers.
+
+        codes (dict): column name -> np.ndarray of int32 codes.
+
+        categories (dict): column name -> np.ndarray of categories.
+
+        nrows (np.ndarray): (z, y, x) number of rows of each peaklist.
+    """
+
+    def __init__(
+            self,
+            coords,
+            minor_axis,
+            numeric,
+            codes,
+            categories,
+            nrows):
+
+        self.coords = [list(c) for c in coords]
+        self.minor_axis = list(minor_axis)
+        self.numeric = numeric
+        self.codes = codes
+        self.categories = categories
+        self.nrows = nrows
+
+    @classmethod
+    def from_peaklists(cls, peaklists, zzcoords, yycoords, xxcoords):
+        """
+        Builds the cube from a nested dictionary of peaklists.
+
+        Parameters:
+            peaklists (dict): nested dictionary [z][y][x] containing
+                the peaklists as pd.DataFrames.
+
+            zzcoords, yycoords, xxcoords (list): the coordinate names.
+
+        Returns:
+            TypedCube instance.
+        """
+        keys = list(it.product(zzcoords, yycoords, xxcoords))
+        frames = [peaklists[z][y][x] for z, y, x in keys]
+        shape3 = (len(zzcoords), len(yycoords), len(xxcoords))
+        lengths = np.array([df.shape[0] for df in frames], dtype=int)
+        nres = int(lengths.max()) if lengths.size else 0
+
+        # column order is that of the first peaklist, extra columns
+        # found in other peaklists are appended
+        minor_axis = []
+
+        for df in frames:
+            minor_axis.extend(c for c in df.columns if c not in minor_axis)
+
+        # position of every row of every peaklist in the flattened cube
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        flat_pos = \
+            np.repeat(np.arange(len(frames)) * nres, lengths) \
+            + np.arange(lengths.sum()) - starts
+
+        numeric = {}
+        codes = {}
+        categories = {}
+
+        for col in minor_axis:
+            parts = [
+                np.asarray(df[col]) if col in df.columns
+                    else np.full(df.shape[0], np.nan)
+                for df in frames
+                ]
+
+            if all(is_numeric_array(p) for p in parts):
+                is_int = all(
+                    np.issubdtype(p.dtype, np.integer) for p in parts
+                    )
+                dtype, fill = (np.int64, 0) if is_int else (np.float64, np.nan)
+                array = np.full(shape3 + (nres,), fill, dtype=dtype)
+                array.reshape(-1)[flat_pos] = np.concatenate(parts)
+                numeric[col] = array
+
+            else:
+                # one factorization for the whole data set, so that
+                # the same string has the same code in every peaklist
+                col_codes, col_categories = pd.factorize(
+                    np.concatenate([p.astype(object) for p in parts])
+                    )
+                array = np.full(shape3 + (nres,), -1, dtype=np.int32)
+                array.reshape(-1)[flat_pos] = col_codes
+                codes[col] = array
+                categories[col] = np.asarray(col_categories, dtype=object)
+
+        return cls(
+            [zzcoords, yycoords, xxcoords],
+            minor_axis,
+            numeric,
+            codes,
+            categories,
+            lengths.reshape(shape3)
+            )
+
+    @property
+    def shape(self):
+        """(z, y, x, residue) shape of the cube."""
+        return tuple(len(c) for c in self.coords) + (self.nres,)
+
+    @property
+    def nres(self):
+        """Length of the residue axis."""
+        for array in it.chain(self.numeric.values(), self.codes.values()):
+            return array.shape[3]
+
+        return 0
+
+    @property
+    def nbytes(self):
+        """Memory used by the cube arrays, in bytes."""
+        return sum(
+            a.nbytes for a in it.chain(
+                self.numeric.values(),
+                self.codes.values()
+                )
+            )
+
+    def memory_report(self):
+        """
+        Memory used by each column of the cube.
+
+        Returns:
+            pd.DataFrame indexed by column name with the storage
+            'dtype', the number of 'categories' of string columns
+            and the 'MB' used.
+        """
+        return memory_report(
+            (col, self.numeric[col], None) if col in self.numeric
+                else (col, self.codes[col], self.categories[col])
+            for col in self.minor_axis
+            )
+
+    def transpose(self, *axes):
+        """
+        Reorders the three coordinate axes of the cube.
+
+        Follows the np.transpose convention, the residue axis is kept
+        last. Arrays are not copied.
+
+        Parameters:
+            axes (int): permutation of (0, 1, 2).
+
+        Returns:
+            TypedCube instance sharing the data of self.
+        """
+        if sorted(axes) != [0, 1, 2]:
+            raise ValueError('<axes> must be a permutation of (0, 1, 2).')
+
+        full_axes = tuple(axes) + (3,)
+
+        return TypedCube(
+            [self.coords[a] for a in axes],
+            self.minor_axis,
+            {k: v.transpose(full_axes) for k, v in self.numeric.items()},
+            {k: v.transpose(full_axes) for k, v in self.codes.items()},
+            self.categories,
+            self.nrows.transpose(axes)
+            )
+
+    def index(self, dp0, dp1, dp2):
+        """Positional index of the coordinate names in the cube."""
+        return tuple(
+            self.coords[n].index(dp) for n, dp in enumerate((dp0, dp1, dp2))
+            )
+
+    def column(self, col):
+        """
+        Values of a column as a (z, y, x, residue) np.ndarray.
+
+        Numeric columns are returned as views, categorical columns
+        are decoded to an object array.
+        """
+        if col in self.numeric:
+            return self.numeric[col]
+
+        return decode_categorical(self.codes[col], self.categories[col])
+
+    def is_missing(self, col):
+        """(z, y, x, residue) boolean array of missing values in <col>."""
+        if col in self.numeric:
+            if self.numeric[col].dtype.kind == 'f':
+                return np.isnan(self.numeric[col])
+
+            # integers are only missing in the padding rows
+            return np.arange(self.nres) >= self.nrows[..., None]
+
+        return self.codes[col] < 0
+
+    def isin(self, col, values):
+        """
+        (z, y, x, residue) boolean array, True where column <col>
+        holds any of <values>.
+
+        For categorical columns only the codes are compared.
+        """
+        if col in self.numeric:
+            array = self.numeric[col]
+
+            return pd.Index(array.ravel()).isin(values).reshape(array.shape)
+
+        # one flag per category, the last one for missing values
+        lookup = np.append(
+            pd.Index(self.categories[col], dtype=object).isin(values),
+            False
+            )
+
+        return lookup[self.codes[col]]
+
+    def series_block(self, dp0, dp1, dropna=None, decode=True):
+        """
+        Exports the peaklists along the third axis of the cube.
+
+        Parameters:
+            dp0, dp1 (str): coordinate names in the current axes order
+                of the cube.
+
+            dropna (str): column name, rows with missing values in this
+                column are discarded.
+
+            decode (bool): whether to decode categorical columns,
+                otherwise they are returned as CodedArray.
+
+        Returns:
+            items (list): coordinate names of the third axis.
+
+            columns (dict): column name -> (items, residue) np.ndarray,
+                or CodedArray for categorical columns. Integer columns are
+                returned as float with NaN padding when the items
+                differ in length.
+
+            lengths (np.ndarray): number of rows of each item.
+        """
+        i, j = self.coords[0].index(dp0), self.coords[1].index(dp1)
+        valid = np.arange(self.nres) < self.nrows[i, j][:, None]
+
+        if dropna is not None:
+            valid &= ~self.is_missing(dropna)[i, j]
+
+        lengths = valid.sum(axis=1)
+        nrows = int(lengths.max()) if lengths.size else 0
+
+        if valid[:, :nrows].all():
+            take = slice(0, nrows)
+
+        else:
+            # moves the valid rows to the top, keeping their order
+            take = np.argsort(~valid, axis=1, kind='mergesort')[:, :nrows]
+            rows = np.arange(take.shape[0])[:, None]
+
+        columns = {}
+
+        for col in self.minor_axis:
+            if col in self.numeric:
+                array = self.numeric[col][i, j]
+
+            else:
+                array = self.codes[col][i, j]
+
+            if isinstance(take, slice):
+                array = array[:, take]
+
+            else:
+                array = array[rows, take]
+
+            if col in self.codes:
+                array = decode_categorical(array, self.categories[col]) \
+                    if decode else CodedArray(array, self.categories[col])
+
+            elif array.dtype.kind != 'f' and (lengths < nrows).any():
+                array = array.astype(np.float64)
+                array[np.arange(nrows) >= lengths[:, None]] = np.nan
+
+            columns[col] = array
+
+        return list(self.coords[2]), columns, lengths
+
+    def to_frame(self, dp0, dp1, dp2):
+        """
+        Exports a single peaklist of the cube to a pd.DataFrame.
+
+        Padding rows are not exported.
+
+        Parameters:
+            dp0, dp1, dp2 (str): coordinate names in the current
+                axes order of the cube.
+
+        Returns:
+            pd.DataFrame
+        """
+        i, j, k = self.index(dp0, dp1, dp2)
+        n = self.nrows[i, j, k]
+        data = {}
+
+        for col in self.minor_axis:
+            if col in self.numeric:
+                data[col] = self.numeric[col][i, j, k, :n]
+
+            else:
+                data[col] = decode_categorical(
+                    self.codes[col][i, j, k, :n],
+                    self.categories[col]
+                    )
+
+        return pd.DataFrame(data, columns=self.minor_axis)
@@ -0,0 +1,578 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import hashlib
+import numpy as np
+import pandas as pd
+
+from core.fslibs.TypedCube import CodedArray, decode_categorical, \
+    memory_report
+
+
+def is_numeric_dtype(array):
+    """True if <array> holds numbers that can be stored as float64."""
+    return np.issubdtype(array.dtype, np.number) \
+        or np.issubdtype(array.dtype, np.bool_)
+
+
+def encode_categorical(values, categories=None):
+    """
+    Translates <values> to integer codes.
+
+    Parameters:
+        values (array-like): the values to encode, np.nan identifies
+            missing values.
+
+        categories (np.ndarray): the known categories, values not
+            found are appended.
+
+    Returns:
+        CodedArray with int32 codes of the shape of <values>, -1 for
+        missing values.
+    """
+    values = np.asarray(values, dtype=object)
+    codes, uniques = pd.factorize(values.ravel())
+    uniques = np.asarray(uniques, dtype=object)
+
+    if categories is None:
+        categories = uniques
+
+    elif uniques.size:
+        lookup = pd.Index(categories, dtype=object).get_indexer(uniques)
+        new = lookup < 0
+        lookup[new] = len(categories) + np.arange(new.sum())
+        categories = np.concatenate([categories, uniques[new]])
+        codes = np.where(codes >= 0, lookup[codes], -1)
+
+    return CodedArray(
+        codes.astype(np.int32).reshape(values.shape),
+        categories
+        )
+
+
+def typed_array(array):
+    """
+    Casts <array> to the type used to store it in the panel:
+    int64 for integers, float64 for other numbers and CodedArray
+    otherwise.
+    """
+    if isinstance(array, CodedArray):
+        return CodedArray(
+            np.asarray(array.codes, dtype=np.int32),
+            np.asarray(array.categories, dtype=object)
+            )
+
+    array = np.asarray(array)
+
+    if np.issubdtype(array.dtype, np.integer):
+        return array.astype(np.int64)
+
+    if is_numeric_dtype(array):
+        return array.astype(np.float64)
+
+    return encode_categorical(array)
+
+
+class _Indexer:
+    """Dispatches [] access of .loc, .ix and .iloc to the TypedPanel."""
+
+    def __init__(self, panel, kind):
+        self.panel = panel
+        self.kind = kind
+
+    def __getitem__(self, key):
+        return self.panel._getitem(key, self.kind)
+
+    def __setitem__(self, key, value):
+        self.panel._setitem(key, value, self.kind)
+
+
+class TypedPanel:
+    """
+    A 3D table of experiments (items) x residues (major_axis)
+    x columns (minor_axis).
+
+    Each column is stored as a separate 2D np.ndarray of shape
+    (items, residues): int64 for integer columns, such as the residue
+    numbers, float64 for other numeric columns and int32 codes for
+    string columns, such as 'Peak Status' or '1-letter'. The codes
+    point to the column categories, -1 identifies missing values.
+    Numeric kernels read and write the arrays directly with
+    .get_array() and .set_array(), masks over string columns are
+    computed on the codes with .isin().
+
+    .loc, .ix and .iloc follow the pd.Panel indexing semantics and
+    return pd.Series and pd.DataFrames with the same orientation
+    pd.Panel used:
+        [item, :, col] -> pd.Series indexed by major_axis
+        [:, row, col] -> pd.Series indexed by items
+        [:, :, col] -> pd.DataFrame, major_axis x items
+        [item, :, :] -> pd.DataFrame, major_axis x minor_axis
+        [:, row, [cols]] -> pd.DataFrame, minor_axis x items
+
+    String columns are returned with the pandas 'category' dtype,
+    except in the mixed minor_axis x items pd.DataFrames.
+
+    Attributes:
+        items (pd.Index): experiment names.
+
+        major_axis (pd.RangeIndex): residue rows.
+
+        minor_axis (pd.Index): column names.
+    """
+
+    def __init__(self, data, items, major_axis=None, minor_axis=None):
+        """
+        Parameters:
+            data (dict): column name -> 2D array-like (items, residues)
+                or CodedArray.
+
+            items (list): the experiment names.
+
+            major_axis (int or range): the residue rows. Defaults to the
+                number of rows in <data>.
+
+            minor_axis (list): ordered column names, defaults to the
+                order of <data>.
+        """
+        self.items = pd.Index(items)
+        self._data = {}
+        self._categories = {}
+
+        for col in (minor_axis if minor_axis is not None else data):
+            self._set_column(col, typed_array(data[col]))
+
+        if major_axis is None:
+            major_axis = next(iter(self._data.values())).shape[1] \
+                if self._data else 0
+
+        self.major_axis = pd.RangeIndex(
+            major_axis if isinstance(major_axis, int) else len(major_axis)
+            )
+        self.loc = _Indexer(self, 'loc')
+        self.ix = _Indexer(self, 'ix')
+        self.iloc = _Indexer(self, 'iloc')
+
+    def __repr__(self):
+        return '<{}> {} items x {} residues x {} columns\n{}'.format(
+            type(self).__name__,
+            *self.shape,
+            list(self.minor_axis)
+            )
+
+    def __iter__(self):
+        # as pd.Panel, iterates over the items
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def minor_axis(self):
+        return pd.Index(list(self._data))
+
+    @property
+    def shape(self):
+        return (len(self.items), len(self.major_axis), len(self._data))
+
+    def _set_column(self, col, array):
+        if isinstance(array, CodedArray):
+            self._data[col] = array.codes
+            self._categories[col] = array.categories
+
+        else:
+            self._data[col] = array
+            self._categories.pop(col, None)
+
+        return None
+
+    def get_array(self, col):
+        """
+        Returns the (items, residues) np.ndarray of column <col>.
+
+        Numeric arrays are not copied, string columns are decoded
+        to a new object array.
+        """
+        if col in self._categories:
+            return decode_categorical(self._data[col], self._categories[col])
+
+        return self._data[col]
+
+    def get_codes(self, col):
+        """
+        Returns the CodedArray of the string column <col>.
+
+        The codes are not copied.
+        """
+        return CodedArray(self._data[col], self._categories[col])
+
+    def isin(self, col, values):
+        """
+        (items, residues) boolean np.ndarray, True where column <col>
+        holds any of <values>.
+
+        For string columns only the codes are compared.
+        """
+        if col not in self._categories:
+            array = self._data[col]
+
+            return pd.Index(array.ravel()).isin(values).reshape(array.shape)
+
+        # one flag per category, the last one for missing values
+        lookup = np.append(
+            pd.Index(self._categories[col], dtype=object).isin(values),
+            False
+            )
+
+        return lookup[self._data[col]]
+
+    def set_array(self, col, values):
+        """
+        Sets column <col> from an array broadcastable to
+        (items, residues), adds the column if it does not exist.
+        """
+        array = typed_array(values)
+        shape = (len(self.items), len(self.major_axis))
+
+        if isinstance(array, CodedArray):
+            array = array._replace(
+                codes=np.array(np.broadcast_to(array.codes, shape))
+                )
+
+        else:
+            array = np.array(np.broadcast_to(array, shape))
+
+        self._set_column(col, array)
+
+        return None
+
+    @property
+    def nbytes(self):
+        """Memory used by the panel arrays, in bytes."""
+        return sum(a.nbytes for a in self._data.values())
+
+    def memory_report(self):
+        """
+        Memory used by each column of the panel.
+
+        Returns:
+            pd.DataFrame indexed by column name with the storage
+            'dtype', the number of 'categories' of string columns
+            and the 'MB' used.
+        """
+        return memory_report(
+            (col, array, self._categories.get(col))
+            for col, array in self._data.items()
+            )
+
+    def fingerprint(self):
+        """sha256 hex digest of the labels and values of the panel."""
+        sha = hashlib.sha256()
+        sha.update(repr((list(self.items), self.shape)).encode('utf-8'))
+
+        for col, array in self._data.items():
+            sha.update(str(col).encode('utf-8'))
+
+            if col in self._categories:
+                array = decode_categorical(
+                    array,
+                    self._categories[col]
+                    ).astype(str)
+
+            sha.update(np.ascontiguousarray(array).tobytes())
+
+        return sha.hexdigest()
+
+    def _resolve(self, axis, key, kind):
+        """
+        Translates an indexer key to positions along axis.
+
+        Returns:
+            int for scalar keys, slice or np.ndarray of positions for
+            the others.
+        """
+        index = self.items if axis == 0 else self.major_axis
+        # .ix is positional for integers over the items (names)
+        # and label based over the residue RangeIndex, which
+        # is the same.
+        positional = kind == 'iloc' or (kind == 'ix' and axis == 0)
+
+        if isinstance(key, slice):
+            if key == slice(None):
+                return key
+
+            if positional and all(
+                    k is None or pd.api.types.is_integer(k)
+                    for k in (key.start, key.stop)):
+                return key
+
+            return index.slice_indexer(key.start, key.stop, key.step)
+
+        if isinstance(key, pd.Series) and key.dtype == bool:
+            if not key.index.equals(index):
+                key = key.reindex(index, fill_value=False)
+
+            return np.flatnonzero(np.asarray(key))
+
+        if pd.api.types.is_list_like(key):
+            key = np.asarray(key)
+
+            if key.dtype == bool:
+                return np.flatnonzero(key)
+
+            if positional and np.issubdtype(key.dtype, np.integer):
+                return key
+
+            positions = index.get_indexer(key)
+
+            if (positions < 0).any():
+                raise KeyError(list(key[positions < 0]))
+
+            return positions
+
+        if positional and pd.api.types.is_integer(key):
+            return int(key)
+
+        return index.get_loc(key)
+
+    def _resolve_cols(self, key, kind):
+        """Translates a minor axis key to a column name or list of names."""
+        cols = list(self._data)
+
+        if isinstance(key, slice):
+            if kind == 'loc' or not all(
+                    k is None or pd.api.types.is_integer(k)
+                    for k in (key.start, key.stop)):
+                start = 0 if key.start is None else cols.index(key.start)
+                stop = len(cols) if key.stop is None \
+                    else cols.index(key.stop) + 1
+                return cols[start:stop:key.step]
+
+            return cols[key]
+
+        if pd.api.types.is_list_like(key):
+            return [cols[k] if kind == 'iloc' else k for k in key]
+
+        if kind == 'iloc':
+            return cols[key]
+
+        return key
+
+    def _split_key(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+
+        return key + (slice(None),) * (3 - len(key))
+
+    @staticmethod
+    def _take(array, ii, jj):
+        if isinstance(ii, np.ndarray) and isinstance(jj, np.ndarray):
+            return array[np.ix_(ii, jj)]
+
+        return array[ii, jj]
+
+    @staticmethod
+    def _is_scalar(pos):
+        return isinstance(pos, (int, np.integer))
+
+    def _values(self, col, ii, jj):
+        """
+        Values of column <col> at positions <ii>, <jj>: numbers,
+        decoded strings for scalar positions or pd.Categorical.
+        """
+        values = self._take(self._data[col], ii, jj)
+
+        if col not in self._categories:
+            return values
+
+        if np.ndim(values) == 0:
+            return self._categories[col][values] if values >= 0 else np.nan
+
+        return pd.Categorical.from_codes(
+            np.array(values),
+            categories=self._categories[col]
+            )
+
+    def _decoded(self, col, ii, jj):
+        """Values of column <col>, strings are decoded to objects."""
+        values = self._take(self._data[col], ii, jj)
+
+        if col in self._categories:
+            return decode_categorical(values, self._categories[col])
+
+        return values
+
+    def _getitem(self, key, kind):
+        ikey, jkey, kkey = self._split_key(key)
+        ii = self._resolve(0, ikey, kind)
+        jj = self._resolve(1, jkey, kind)
+        cols = self._resolve_cols(kkey, kind)
+        iscalar = self._is_scalar(ii)
+        jscalar = self._is_scalar(jj)
+        items = self.items[ii]
+        rows = self.major_axis[jj]
+
+        if not isinstance(cols, list):
+            if iscalar and jscalar:
+                return self._values(cols, ii, jj)
+
+            if iscalar:
+                return pd.Series(
+                    self._values(cols, ii, jj),
+                    index=rows,
+                    name=cols,
+                    copy=True
+                    )
+
+            if jscalar:
+                return pd.Series(
+                    self._values(cols, ii, jj),
+                    index=items,
+                    name=cols,
+                    copy=True
+                    )
+
+            if cols in self._categories:
+                codes = self._take(self._data[cols], ii, jj)
+                frame = pd.DataFrame(
+                    {
+                        n: pd.Categorical.from_codes(
+                            np.array(c),
+                            categories=self._categories[cols]
+                            )
+                        for n, c in enumerate(codes)
+                        },
+                    index=rows
+                    )
+                frame.columns = items
+
+                return frame
+
+            return pd.DataFrame(
+                self._take(self._data[cols], ii, jj).T,
+                index=rows,
+                columns=items,
+                copy=True
+                )
+
+        if iscalar and jscalar:
+            return pd.Series(
+                [self._values(c, ii, jj) for c in cols],
+                index=cols,
+                name=rows
+                )
+
+        if iscalar:
+            return pd.DataFrame(
+                {c: self._values(c, ii, jj) for c in cols},
+                index=rows,
+                columns=cols,
+                copy=True
+                )
+
+        if jscalar:
+            return pd.DataFrame(
+                [self._decoded(c, ii, jj) for c in cols],
+                index=cols,
+                columns=items
+                )
+
+        return TypedPanel(
+            {
+                c: CodedArray(
+                    self._take(self._data[c], ii, jj),
+                    self._categories[c]
+                    )
+                    if c in self._categories
+                    else self._take(self._data[c], ii, jj)
+                for c in cols
+                },
+            items=items,
+            minor_axis=cols
+            )
+
+    def _setitem(self, key, value, kind):
+        ikey, jkey, kkey = self._split_key(key)
+        ii = self._resolve(0, ikey, kind)
+        jj = self._resolve(1, jkey, kind)
+        cols = self._resolve_cols(kkey, kind)
+        iscalar = self._is_scalar(ii)
+        jscalar = self._is_scalar(jj)
+
+        # aligns pandas objects on the panel labels, as pd.Panel did
+        if isinstance(value, pd.DataFrame):
+            value = np.asarray(value.reindex(
+                index=self.major_axis[jj],
+                columns=self.items[ii]
+                )).T
+
+        elif isinstance(value, pd.Series):
+            if iscalar and not jscalar:
+                value = value.reindex(self.major_axis[jj])
+
+            elif jscalar and not iscalar:
+                value = value.reindex(self.items[ii])
+
+        value = np.asarray(value)
+        shape = (len(self.items), len(self.major_axis))
+
+        for col in (cols if isinstance(cols, list) else [cols]):
+            if col not in self._data:
+                self._set_column(
+                    col,
+                    np.full(shape, np.nan)
+                        if is_numeric_dtype(value)
+                        else CodedArray(
+                            np.full(shape, -1, dtype=np.int32),
+                            np.array([], dtype=object)
+                            )
+                    )
+
+            elif col in self._categories:
+                pass
+
+            elif not is_numeric_dtype(value):
+                self._set_column(
+                    col,
+                    encode_categorical(self._data[col].astype(object))
+                    )
+
+            # integer columns become float to store other numbers
+            elif self._data[col].dtype == np.int64 \
+                    and not np.issubdtype(value.dtype, np.integer):
+                self._data[col] = self._data[col].astype(np.float64)
+
+            if col in self._categories:
+                # the new values are added to the column categories
+                col_value, self._categories[col] = \
+                    encode_categorical(value, self._categories[col])
+
+            else:
+                col_value = value
+
+            if isinstance(ii, np.ndarray) and isinstance(jj, np.ndarray):
+                self._data[col][np.ix_(ii, jj)] = col_value
+
+            else:
+                self._data[col][ii, jj] = col_value
+
+        return None
@@ -17,7 +17,6 @@ along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
 """
 import numpy as np
 from core.fslibs.FittingBase import FittingBase
-import scipy.optimize as sciopt
 
 
 class HillEquation(FittingBase):
@@ -33,7 +32,57 @@ class HillEquation(FittingBase):
         """The Hill Equation."""
         return (Vmax*L0**n)/(kd**n+L0**n)
 
-    def log_okay(self, res, x, y, popt, pcov):
+    def jacobian(self, L0, Vmax, n, kd):
+        """Derivatives of the Hill Equation to Vmax, n and kd."""
+        L0n = L0**n
+        kdn = kd**n
+        denominator = (kdn+L0n)**2
+        # L0**n*log(L0) -> 0 when L0 -> 0
+        log_ratio = np.log(np.where(L0 > 0, L0, 1)/kd)
+        dVmax = L0n/(kdn+L0n)
+        dn = np.where(L0 > 0, Vmax*L0n*kdn*log_ratio/denominator, 0)
+        dkd = -Vmax*L0n*n*kd**(n-1)/denominator
+
+        return np.stack(np.broadcast_arrays(dVmax, dn, dkd), axis=-1)
+
+    def initial_guess(self, x, y):
+        """
+        ymax is the value of largest magnitude, K0.5 the x value where
+        the data crosses half of ymax and n is 1.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        order = np.argsort(x)
+        x, y = x[order], y[order]
+        ymax = y[np.argmax(np.abs(y))]
+        positive_x = x[x > 0]
+        kd = np.median(positive_x) if positive_x.size else 1.
+        
+        if ymax != 0:
+            fraction = y/ymax
+            above = np.flatnonzero(fraction >= 0.5)
+            
+            if above.size and above[0] > 0:
+                i = above[0]
+                kd_half = x[i-1] + (0.5-fraction[i-1]) \
+                    * (x[i]-x[i-1])/(fraction[i]-fraction[i-1])
+                
+                if kd_half > 0:
+                    kd = kd_half
+        
+        return [ymax, 1, kd]
+
+    def bounds(self, x, y):
+        """
+        n and K0.5 are positive. K0.5 is at most 100 times the largest
+        x value, beyond that the data does not define it and the fit
+        would drift away without converging.
+        """
+        kd_max = 100*np.max(np.abs(x)) or np.inf
+
+        return ([-np.inf, 0, 0], [np.inf, np.inf, kd_max])
+
+    def log_okay(self, res, x, y, popt, pcov, ci=None):
         s2w = \
 """
 Res:  {}
@@ -42,7 +91,7 @@ ydata: {}
 ymax: {}
 K0.5: {}
 n: {}
-popt: {}
+{}popt: {}
 pcov: {}
 **************************
 """.\
@@ -53,15 +102,37 @@ pcov: {}
                 popt[0],
                 popt[2],
                 popt[1],
+                self.log_intervals(ci),
                 popt,
                 pcov
                 )
 
         return s2w
 
-    def results(self, res, popt, yhalf, status='okay'):
+    def log_intervals(self, ci):
+        """Confidence intervals of K0.5 and n in the fit_report.log."""
+        if ci is None:
+            return ''
+
+        s2w = \
+"""K0.5 {0}% CI: [{1}, {2}]
+n {0}% CI: [{3}, {4}]
+""".\
+            format(
+                self.confidence_level,
+                ci[0][2],
+                ci[1][2],
+                ci[0][1],
+                ci[1][1]
+                )
+
+        return s2w
+
+    def results(self, res, popt, yhalf, status='okay', ci=None):
+        intervals = self.confidence_level is not None
+
         if status == 'okay':
-            row = "{},{},{},{},{},{}\n".format(
+            row = "{},{},{},{},{},{}".format(
                 res,
                 status,
                 popt[0],
@@ -70,22 +141,48 @@ pcov: {}
                 popt[1]
                 )
 
-            return row
+            if intervals and ci is not None:
+                row += ",{},{},{},{}".format(
+                    ci[0][2],
+                    ci[1][2],
+                    ci[0][1],
+                    ci[1][1]
+                    )
+
+            elif intervals:
+                row += ",,,,"
+
+            return row + "\n"
 
         else:
-            return "{},{},,,,,\n".format(res,status)
+            return "{},{},,,,,{}\n".format(
+                res,
+                status,
+                ',,,,' if intervals else ''
+                )
+
+    def txt_plot(self, popt, yhalf, ci=None):
+        if ci is None:
+            kd = '{:.3f}'.format(popt[2])
+            n = '{:.3f}'.format(popt[1])
+
+        else:
+            kd = '{:.3f} [{:.3f}, {:.3f}]'.format(popt[2], ci[0][2], ci[1][2])
+            n = '{:.3f} [{:.3f}, {:.3f}]'.format(popt[1], ci[0][1], ci[1][1])
 
-    def txt_plot(self, popt, yhalf):
         s2w = \
 """ymax: {:.3f}
 yhalf: {:.3f}
-K0.5: {:.3f}
-n: {:.3f}""".\
-            format(popt[0],yhalf,popt[2],popt[1])
+K0.5: {}
+n: {}""".\
+            format(popt[0],yhalf,kd,n)
 
         return s2w
 
     def results_header(self):
+        if self.confidence_level is not None:
+            return "#res,fit,ymax,yhalf,kd,n,kd_low,kd_high,n_low,n_high\n"
+
         return "#res,fit,ymax,yhalf,kd,n\n"
 
     def fit_log_header(self, col):
@@ -100,29 +197,21 @@ n: {:.3f}""".\
 
         return s2w
 
-    def fit_data(self, x, y, res, xfit):
-        """Workflow for fitting data with the Hill Equation."""
-
-        p_guess = [np.max(y), 1, np.median(x)]
-
-        try:
-            popt, pcov = sciopt.curve_fit(self.equation, x, y, p0=p_guess)
-
-        except:
-            print("*** Fit residue {} - Failed!".format(res))
-            a = self.fit_failed(res, x, y)
-            b = self.results(res, None, None, status='failed')
-            c = "fit failed"
-            d = False
-            e = None
-            return a, b, c, d, e
-
+    def fit_okay(self, res, x, y, popt, pcov, xfit, ci=None):
         yhalf = popt[0]/2
-        print("*** Fit residue {} - OK!".format(res))
-        a = self.log_okay(res, x, y, popt, pcov)
-        b = self.results(res, popt, yhalf)
-        c = self.txt_plot(popt, yhalf)
+        a = self.log_okay(res, x, y, popt, pcov, ci)
+        b = self.results(res, popt, yhalf, ci=ci)
+        c = self.txt_plot(popt, yhalf, ci)
         d = True
         e = self.equation(xfit, popt[0], popt[1], popt[2])
 
-        return a, b, c, d, e
\ No newline at end of file
+        return a, b, c, d, e
+
+    def fit_not_okay(self, res, x, y):
+        a = self.fit_failed(res, x, y)
+        b = self.results(res, None, None, status='failed')
+        c = "fit failed"
+        d = False
+        e = None
+
+        return a, b, c, d, e
@@ -21,6 +21,7 @@ You should have received a copy of the GNU General Public License
 along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
 """
 import csv
+import io
 import os
 from shutil import copy2
 
@@ -28,6 +29,8 @@ from core.parsing import read_peaklist
 from core.utils import aal1tol3, peaklist_format_requires_fasta
 from core.fslibs.WetHandler import WetHandler as fsw
 from core.fslibs.FastaHandler import FastaHandler
+from core.fslibs.Cache import PeaklistCache, PARSER_VERSION, \
+    cache_config, hash_file
 
 def check_input_construction(output_path, variables):
     
@@ -90,6 +93,9 @@ def create_directory_structure(output_path, variables):
 
     spectrum_dir = os.path.join(output_path, 'spectra')
     exp_dataset = variables["experimental_dataset"]
+    # converted peaklists are cached between runs, see core.fslibs.Cache
+    cache_settings = cache_config(variables, output_path)
+    cache = PeaklistCache(*cache_settings) if cache_settings else None
 
     for ii, z_key in enumerate(variables["conditions"]["z"]):
         for jj, y_key in enumerate(variables["conditions"]["y"]):
@@ -110,40 +116,92 @@ def create_directory_structure(output_path, variables):
 
             for kk, x_key in enumerate(variables["conditions"]["x"]):
                 x_name = '_'.join(["{:0>2}".format(kk), x_key])
-                fout = open(
-                    os.path.join(
-                        spectrum_dir,
-                        z_name,
-                        y_name,
-                        "%s.csv" % x_name
-                        ),
-                    'w'
+                out_path = os.path.join(
+                    spectrum_dir,
+                    z_name,
+                    y_name,
+                    "%s.csv" % x_name
                     )
                 peaklist_path = \
                     variables["peaklists"][exp_dataset[z_key][y_key][x_key]]
-                peaklist = read_peaklist(peaklist_path)
-
-                if peaklist[0].format_ in peaklist_format_requires_fasta:
-                    fasta_file = variables["fasta_files"].get(y_key)
-                    fasta_start = variables['fasta_settings']['FASTAstart']
-                    write_peaklist_file(
-                        fout,
-                        add_residue_information(
-                            peaklist_path,
-                            peaklist,
-                            fasta_file,
-                            fasta_start
-                            )
+                fasta_file = variables["fasta_files"].get(y_key)
+                fasta_start = variables['fasta_settings']['FASTAstart']
+                
+                if cache is not None:
+                    # the converted peaklist depends on the FASTA
+                    # for some formats
+                    key = cache.key(
+                        hash_file(peaklist_path),
+                        hash_file(fasta_file) \
+                            if fasta_file and os.path.exists(fasta_file) \
+                            else '',
+                        fasta_start,
+                        PARSER_VERSION,
+                        'spectra'
                         )
+                    text = cache.get_text(key)
                 
-                elif peaklist[0].format_ == 'ccpnmrv2':
-                    pklfh = open(peaklist_path, 'r')
-                    fout.writelines(pklfh.readlines())
+                if cache is None or text is None:
+                    text = convert_peaklist(
+                        peaklist_path,
+                        fasta_file,
+                        fasta_start
+                        )
+                    
+                    if cache is not None:
+                        cache.put_text(key, text)
                 
-                else:
-                    write_peaklist_file(fout, peaklist)
+                write_if_changed(out_path, text)
 
-                fout.close()
+def convert_peaklist(peaklist_path, fasta_file, fasta_start):
+    """
+    Parses a peaklist and converts it to the Farseer-NMR .csv format.
+    
+    Parameters:
+        - peaklist_path (str): path to the original peaklist file.
+        - fasta_file (str): path to the FASTA file of the peaklist,
+            used only for formats that do not have residue types.
+        - fasta_start (int): FASTA starting residue number.
+    
+    Returns:
+        - str: the content of the .csv file.
+    """
+    fout = io.StringIO()
+    peaklist = read_peaklist(peaklist_path)
+
+    if peaklist[0].format_ in peaklist_format_requires_fasta:
+        write_peaklist_file(
+            fout,
+            add_residue_information(
+                peaklist_path,
+                peaklist,
+                fasta_file,
+                fasta_start
+                )
+            )
+    
+    elif peaklist[0].format_ == 'ccpnmrv2':
+        pklfh = open(peaklist_path, 'r')
+        fout.writelines(pklfh.readlines())
+        pklfh.close()
+    
+    else:
+        write_peaklist_file(fout, peaklist)
+    
+    return fout.getvalue()
+
+def write_if_changed(file_path, text):
+    """
+    Writes <text> to <file_path> unless the file already has that
+    content.
+    """
+    if os.path.exists(file_path):
+        with open(file_path, 'r', newline='') as fin:
+            if fin.read() == text:
+                return
+    
+    with open(file_path, 'w') as fout:
+        fout.write(text)
 
 def write_peaklist_file(fin, peak_list):
     writer = csv.writer(fin)
@@ -0,0 +1,130 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+from core.fslibs.Cache import FitCache, PeaklistCache, cache_config
+from core.fslibs.FarseerSeries import fit_residues
+
+ccpn_peaklist = os.path.join('test_data', 'ccpn_peaklist.csv')
+
+
+class Test_PeaklistCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = PeaklistCache(self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_read_csv_roundtrip(self):
+        calls = []
+
+        def reader(path):
+            calls.append(path)
+            return pd.read_csv(path)
+
+        first = self.cache.read_csv(ccpn_peaklist, reader=reader)
+        second = self.cache.read_csv(ccpn_peaklist, reader=reader)
+        self.assertEqual(len(calls), 1)
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_eviction_and_invalidation(self):
+        for i in range(5):
+            self.cache.put(str(i), {'data': np.zeros(1000)})
+
+        self.assertEqual(len(self.cache.entries()), 5)
+        small_cache = PeaklistCache(self.cache_dir, max_size=20000)
+        small_cache.put('last', {'data': np.zeros(1000)})
+        self.assertLess(len(small_cache.entries()), 5)
+        self.assertIsNotNone(small_cache.get('last'))
+
+        small_cache.invalidate()
+        self.assertEqual(small_cache.entries(), [])
+
+    def test_evicted_while_read(self):
+        self.cache.put('entry', {'data': np.arange(3)})
+
+        # another process removes the entry after it was read
+        with mock.patch(
+                'core.fslibs.Cache.os.utime',
+                side_effect=FileNotFoundError
+                ):
+            arrays = self.cache.get('entry')
+
+        np.testing.assert_array_equal(arrays['data'], np.arange(3))
+
+    def test_opt_in(self):
+        self.assertIsNone(cache_config({}, self.cache_dir))
+        self.assertEqual(
+            cache_config(
+                {'cache_settings': {'use_cache': True}},
+                self.cache_dir
+                ),
+            (os.path.join(self.cache_dir, '.farseer_cache'), 500e6)
+            )
+
+
+class Test_FitCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = FitCache(self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_cached_fits(self):
+        x = pd.Series([0, 25, 50, 100, 200, 400, 500], dtype=float)
+        to_fit_data = [
+            (x, 0.5 * x / (100 + x), 1),
+            (x, pd.Series(np.zeros(7)), 2),
+            ]
+        xfit = np.linspace(0, 500, 200)
+        first = fit_residues(
+            'hill', to_fit_data, xfit, cache=self.cache, mindp=5
+            )
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+        second = fit_residues(
+            'hill', to_fit_data, xfit, cache=self.cache, mindp=5
+            )
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+        for fit1, fit2 in zip(first, second):
+            self.assertEqual(fit1[:4], fit2[:4])
+
+        np.testing.assert_array_equal(first[0][4], second[0][4])
+        # other minimum of data points or method
+        fit_residues('hill', to_fit_data, xfit, cache=self.cache, mindp=4)
+        fit_residues(
+            'hill', to_fit_data, xfit, cache=self.cache, mindp=5, batch=True
+            )
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import itertools as it
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from core.fslibs.Calculations import CALCULATIONS, CalculationGraph, \
+    calc_step, convolve_extend, cs_diffs, gaussian_kernel, \
+    register_calculation
+from core.fslibs.CubeCalculations import CubeCalculations
+from core.fslibs.FarseerSeries import FarseerSeries
+from core.fslibs.TypedCube import TypedCube
+from core.fslibs.TypedPanel import TypedPanel
+
+
+class Test_CubeCalculations(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.zz = ['z1', 'z2']
+        self.yy = ['y1', 'y2', 'y3']
+        self.xx = ['x1', 'x2', 'x3', 'x4']
+        self.pkls = {}
+
+        for z, y, x in it.product(self.zz, self.yy, self.xx):
+            status = np.where(rng.random_sample(5) < 0.3, 'missing', 'measured')
+            self.pkls.setdefault(z, {}).setdefault(y, {})[x] = pd.DataFrame({
+                'ResNo': np.arange(1, 6),
+                '1-letter': ['A', 'G', 'A', 'K', 'G'],
+                'Peak Status': status,
+                'Position F1': rng.normal(8, 1, 5),
+                'Position F2': rng.normal(120, 5, 5),
+                'Height': rng.randint(1, 100, 5),
+                })
+
+        self.cube = TypedCube.from_peaklists(
+            self.pkls,
+            self.zz,
+            self.yy,
+            self.xx
+            )
+
+    def test_cs_diffs_modes(self):
+        source = np.array([[1., 2.], [3., 5.], [4., 7.], [6., 9.]])
+        missing = np.array(
+            [[False, True], [True, False], [True, True], [False, True]]
+            )
+        np.testing.assert_array_equal(
+            cs_diffs(source, missing, 'prev'),
+            [[0, 0], [0, 3], [0, 3], [5, 3]]
+            )
+        np.testing.assert_array_equal(
+            cs_diffs(source, missing, 'zero'),
+            [[0, 0], [0, 3], [0, 0], [5, 0]]
+            )
+        np.testing.assert_array_equal(
+            cs_diffs(source, missing, 'full'),
+            [[0, 1], [1, 3], [1, 1], [5, 1]]
+            )
+        np.testing.assert_array_equal(
+            cs_diffs(source.T, missing.T, 'prev', axis=1),
+            cs_diffs(source, missing, 'prev').T
+            )
+
+    def test_gaussian_smooth(self):
+        kernel = gaussian_kernel(1, 7)
+        self.assertAlmostEqual(kernel.sum(), 1)
+        # extended boundaries keep constant rows
+        np.testing.assert_allclose(
+            convolve_extend(np.full((2, 10), 3.), kernel),
+            np.full((2, 10), 3.)
+            )
+        # NaN values are interpolated
+        source = np.array([[1., 2., np.nan, 4., 5.]])
+        smooth = convolve_extend(source, gaussian_kernel(1, 3))
+        self.assertAlmostEqual(smooth[0, 2], 3.)
+        # FFT convolution of long rows
+        source = np.random.RandomState(0).random_sample((3, 1000))
+        kernel = gaussian_kernel(5, 41)
+        np.testing.assert_allclose(
+            convolve_extend(source, kernel),
+            [
+                np.convolve(np.pad(row, 20, mode='edge'), kernel, 'valid')
+                for row in source
+                ]
+            )
+
+        with self.assertRaises(ValueError):
+            gaussian_kernel(1, 6)
+
+    def test_series_calculations(self):
+        calculations = CubeCalculations(self.cube, ['x', 'y'])
+        calculations.calc_cs_diffs('H1_delta', 'Position F1')
+        calculations.calc_cs_diffs('N15_delta', 'Position F2')
+        calculations.calc_csp('CSP', 'H1_delta', 'N15_delta')
+        calculations.calc_ratio('Height_ratio', 'Height')
+        self.assertEqual(
+            calculations.columns('y'),
+            ['H1_delta', 'N15_delta', 'CSP', 'Height_ratio']
+            )
+
+        for along_axis in ['x', 'y']:
+            cube = calculations.series_cube(along_axis)
+
+            if along_axis == 'y':
+                cube = cube.transpose(0, 2, 1)
+
+            for i, j in it.product(*(range(len(c)) for c in cube.coords[:2])):
+                items, columns, _ = cube.series_block(
+                    cube.coords[0][i],
+                    cube.coords[1][j]
+                    )
+                series = TypedPanel(columns, items=items)
+                missing = series.isin('Peak Status', ['missing'])
+                h1 = cs_diffs(series.get_array('Position F1'), missing)
+                n15 = cs_diffs(series.get_array('Position F2'), missing)
+                alpha = np.where(
+                    series.get_array('1-letter') == 'G',
+                    0.2,
+                    0.14
+                    )
+                height = series.get_array('Height')
+                np.testing.assert_allclose(series.get_array('H1_delta'), h1)
+                np.testing.assert_allclose(
+                    series.get_array('CSP'),
+                    np.sqrt(0.5 * (h1**2 + (alpha * n15)**2))
+                    )
+                np.testing.assert_allclose(
+                    series.get_array('Height_ratio'),
+                    height / height[0]
+                    )
+
+    def test_calculation_graph(self):
+        calls = []
+
+        @register_calculation('test_difference')
+        def difference(context, col1, col2):
+            calls.append((col1, col2))
+            return col1 - col2
+
+        self.addCleanup(CALCULATIONS.pop, 'test_difference')
+        steps = [
+            calc_step('CSP', 'csp', ['H1_delta', 'N15_delta']),
+            calc_step('Diff', 'test_difference', ['CSP', 'H1_delta']),
+            calc_step('H1_delta', 'delta', ['Position F1']),
+            calc_step('N15_delta', 'delta', ['Position F2']),
+            calc_step('Smooth', 'gaussian_smooth', ['H1_delta']),
+            ]
+        levels, unresolved = CalculationGraph(steps).levels(['Position F1'])
+        self.assertEqual(
+            [[step.column for step in level] for level in levels],
+            [['H1_delta'], ['Smooth']]
+            )
+        self.assertEqual(len(unresolved), 3)
+
+        calculations = CubeCalculations(self.cube, ['x'])
+        calculations.calculate(steps, max_workers=2)
+        # columns are stored in the order of the steps, smoothing
+        # is left to the series
+        self.assertEqual(
+            calculations.columns('x'),
+            ['CSP', 'Diff', 'H1_delta', 'N15_delta']
+            )
+        # calculated columns are not calculated again
+        calculations.calculate(steps)
+        self.assertEqual(len(calls), 1)
+        np.testing.assert_allclose(
+            calculations.results['x']['Diff'],
+            calculations.results['x']['CSP'] \
+                - calculations.results['x']['H1_delta']
+            )
+
+        with self.assertRaises(ValueError):
+            CalculationGraph(steps + [calc_step('Diff', 'ratio', ['Height'])])
+
+    def test_series_calculate_logs(self):
+        # the series folders are created in the working directory
+        cwd = os.getcwd()
+        tmp = tempfile.mkdtemp()
+        os.chdir(tmp)
+        self.addCleanup(shutil.rmtree, tmp)
+        self.addCleanup(os.chdir, cwd)
+        series = FarseerSeries(
+            {
+                'ResNo': np.tile([1, 2], (3, 1)),
+                '1-letter': np.full((3, 2), 'A', dtype=object),
+                '3-letter': np.full((3, 2), 'ALA', dtype=object),
+                'Peak Status': np.full((3, 2), 'measured', dtype=object),
+                'Height': np.ones((3, 2)),
+                'H1_delta': np.zeros((3, 2)),
+                },
+            items=['ref', 'p1', 'p2']
+            )
+        series.create_attributes(precalculated=['H1_delta'])
+        logs = []
+        series.logs = lambda msg, *args, **kwargs: logs.append(msg)
+        series.calculate([
+            calc_step('H1_delta', 'delta', ['Position F1']),
+            calc_step('Height_ratio', 'ratio', ['Height']),
+            ])
+        self.assertEqual(
+            logs,
+            [
+                '**Not calculated** H1_delta: already calculated',
+                '**Calculated** Height_ratio'
+                ]
+            )
+        
+        with self.assertRaises(ValueError):
+            series.calculate([calc_step('Vol_ratio', 'ratio', ['Volume'])])
+        
+        self.assertEqual(
+            logs[-1],
+            "**Not calculated** Vol_ratio: missing input columns ['Volume']"
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
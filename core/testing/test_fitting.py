@@ -0,0 +1,284 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from scipy.optimize import curve_fit
+
+from core.fslibs.FarseerSeries import FarseerSeries, fit_residues
+from core.fslibs.FittingBase import FittingBase, levenberg_marquardt
+from core.fslibs.fitting_functions import hill
+
+
+class Test_FitResidues(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        x = np.array([0, 25, 50, 100, 200, 400, 500], dtype=float)
+        self.xfit = np.linspace(0, x[-1], 200)
+        self.to_fit_data = []
+
+        for res in range(1, 9):
+            ymax, kd = rng.uniform(0.1, 1), rng.uniform(50, 200)
+            y = ymax * x / (kd + x) + rng.normal(0, 0.005, x.size)
+            self.to_fit_data.append((pd.Series(x), pd.Series(y), res))
+
+    def test_parallel_fit(self):
+        serial = fit_residues('hill', self.to_fit_data, self.xfit)
+        parallel = fit_residues('hill', self.to_fit_data, self.xfit, workers=2)
+        self.assertEqual(len(parallel), len(self.to_fit_data))
+
+        for fit1, fit2 in zip(serial, parallel):
+            self.assertEqual(fit1[:4], fit2[:4])
+            np.testing.assert_allclose(fit1[4], fit2[4])
+
+        self.assertTrue(all(fit[3] for fit in serial))
+        self.assertEqual(fit_residues('hill', [], self.xfit, workers=2), [])
+
+    def test_shared_executor(self):
+        serial = fit_residues('hill', self.to_fit_data, self.xfit)
+
+        # the same process pool performs all the parallel steps
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            for batch in (False, True):
+                shared = fit_residues(
+                    'hill',
+                    self.to_fit_data,
+                    self.xfit,
+                    workers=2,
+                    batch=batch,
+                    bootstrap=20,
+                    executor=executor
+                    )
+
+                for fit1, fit2 in zip(serial, shared):
+                    self.assertTrue(fit2[3])
+                    np.testing.assert_allclose(
+                        fit1[4],
+                        fit2[4],
+                        rtol=1e-5,
+                        atol=1e-6
+                        )
+
+            self.assertEqual(executor.submit(sum, [1, 2]).result(), 3)
+
+    def test_batch_fit(self):
+        # residues with different number of points
+        x, y, res = self.to_fit_data[0]
+        self.to_fit_data[0] = (x[1:], y[1:], res)
+        to_fit = hill()
+        serial = fit_residues('hill', self.to_fit_data, self.xfit)
+        batch = fit_residues('hill', self.to_fit_data, self.xfit, batch=True)
+
+        for fit1, fit2 in zip(serial, batch):
+            self.assertTrue(fit2[3])
+            np.testing.assert_allclose(
+                fit1[4],
+                fit2[4],
+                rtol=1e-5,
+                atol=1e-6
+                )
+
+        # covariance as curve_fit
+        x, y, _ = self.to_fit_data[1]
+        popt, pcov = curve_fit(to_fit.equation, x, y, p0=[y.max(), 1, 100])
+        bpopt, bpcov, converged = levenberg_marquardt(
+            to_fit.equation,
+            to_fit.jacobian,
+            [x],
+            [y],
+            [np.ones(x.size, dtype=bool)],
+            [[y.max(), 1, 100]]
+            )
+        self.assertTrue(converged[0])
+        np.testing.assert_allclose(bpopt[0], popt, rtol=1e-5)
+        np.testing.assert_allclose(bpcov[0], pcov, rtol=1e-3)
+
+    def test_hill_hooks(self):
+        to_fit = hill()
+        x = np.array([0, 25, 50, 100, 200, 400, 500], dtype=float)
+        y = to_fit.equation(x, -0.5, 1, 100)
+        ymax, n, kd = to_fit.initial_guess(x, y)
+        self.assertEqual(ymax, y[-1])
+        self.assertTrue(50 < kd < 100)
+        # analytic and numerical derivatives
+        params = (-0.5, 1.5, 100)
+        numerical = np.stack(
+            [
+                (to_fit.equation(x, *(params + dp)) \
+                    - to_fit.equation(x, *(params - dp))) / 2e-6
+                for dp in np.eye(3) * 1e-6
+                ],
+            axis=-1
+            )
+        np.testing.assert_allclose(
+            to_fit.jacobian(x, *params),
+            numerical,
+            rtol=1e-5,
+            atol=1e-9
+            )
+        popt, _ = to_fit.optimize(x, y)
+        np.testing.assert_allclose(popt, [-0.5, 1, 100], rtol=1e-6)
+        # models without the hook start from 1 for every parameter
+        self.assertEqual(FittingBase.initial_guess(to_fit, x, y), [1, 1, 1])
+
+    def test_bootstrap_intervals(self):
+        fits = fit_residues(
+            'hill', self.to_fit_data, self.xfit, bootstrap=200
+            )
+        parallel = fit_residues(
+            'hill', self.to_fit_data, self.xfit, bootstrap=200, workers=2
+            )
+
+        for (_, row, text, okay, _), fit2 in zip(fits, parallel):
+            self.assertTrue(okay)
+            self.assertEqual(row, fit2[1])
+            values = np.array(row.split(',')[2:], dtype=float)
+            kd, n, kd_low, kd_high, n_low, n_high = values[2:]
+            self.assertTrue(kd_low <= kd <= kd_high)
+            self.assertTrue(n_low <= n <= n_high)
+            self.assertIn('K0.5: {:.3f} ['.format(kd), text)
+
+        # the synthetic data sets scatter around the fitted curve
+        to_fit = hill()
+        x = np.array([0, 25, 50, 100, 200, 400, 500], dtype=float)
+        y = to_fit.equation(x, -0.5, 1, 100)
+        np.testing.assert_allclose(
+            to_fit.resample(x, y, [-0.5, 1, 100], 10),
+            np.tile(y, (10, 1))
+            )
+
+    def test_minimal_model(self):
+        # a model with only the equation specific pieces
+        class Line(FittingBase):
+            def equation(self, x, a, b):
+                return a*x + b
+            
+            def log_okay(self, res, x, y, popt, pcov):
+                return 'res {} okay\n'.format(res)
+            
+            def results(self, res, popt, status='okay'):
+                if status == 'okay':
+                    return '{},{},{},{}\n'.format(res, status, *popt)
+                
+                return '{},{},,\n'.format(res, status)
+            
+            def txt_plot(self, popt):
+                return 'a: {:.3f}'.format(popt[0])
+            
+            def results_header(self):
+                return '#res,fit,a,b\n'
+            
+            def fit_log_header(self, col):
+                return '# {}\n'.format(col)
+        
+        class LegacyLine(Line):
+            def fit_data(self, x, y, res, xfit):
+                popt = np.polyfit(x, y, 1)
+                
+                return self.fit_okay(res, x, y, popt, None, xfit)
+        
+        x = pd.Series([0, 1, 2, 3, 4], dtype=float)
+        to_fit_data = [(x, 2*x + 1, 1), (x, pd.Series([0, 1, 0, 1, 0]), 2)]
+        
+        for model in (Line(), LegacyLine()):
+            fits = fit_residues(None, to_fit_data, x, model=model)
+            self.assertEqual(fits[0][1].split(',')[:2], ['1', 'okay'])
+            np.testing.assert_allclose(
+                np.array(fits[0][1].split(',')[2:], dtype=float),
+                [2, 1]
+                )
+            self.assertTrue(fits[0][3])
+            np.testing.assert_allclose(fits[0][4], 2*x + 1, atol=1e-6)
+        
+        self.assertEqual(
+            Line().fit_not_okay(3, x, x),
+            (
+                Line().fit_failed(3, x, x),
+                '3,failed,,\n',
+                'fit failed',
+                False,
+                None
+                )
+            )
+
+
+class Test_FitSession(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def test_perform_fits(self):
+        x = np.array([0, 25, 50, 100, 200, 400, 500])
+        status = np.full((7, 3), 'measured', dtype=object)
+        status[1:4, 2] = 'missing'
+        series = FarseerSeries(
+            {
+                'ResNo': np.tile([1, 2, 3], (7, 1)),
+                '1-letter': np.full((7, 3), 'A', dtype=object),
+                '3-letter': np.full((7, 3), 'ALA', dtype=object),
+                'Peak Status': status,
+                'CSP': (x / (100 + x))[:, None] * [[0.1, 0.2, 0.3]],
+                'Height_ratio': 1 - (x / (50 + x))[:, None] * [[1, 1, 1]],
+                },
+            items=['ref', 'p1', 'p2', 'p3', 'p4', 'p5', 'p6']
+            )
+        series.create_attributes(series_axis='along_x')
+        series.logs = lambda *args, **kwargs: None
+        series.perform_fits(['CSP', 'Height_ratio'], x, 5, 'hill')
+
+        tables = series.tables_and_plots_folder
+
+        with open(os.path.join(tables, 'fit_table.csv')) as fin:
+            rows = fin.read().splitlines()
+
+        self.assertEqual(rows[0], '#column,res,fit,ymax,yhalf,kd,n')
+        self.assertEqual(
+            [row.split(',')[:3] for row in rows[1:3]],
+            [['CSP', '1', 'okay'], ['CSP', '2', 'okay']]
+            )
+        self.assertEqual(len(rows), 5)
+        self.assertFalse(series.fit_okay['CSP_3'])
+        self.assertEqual(series.fit_plot_text['CSP_3'], 'not enough data')
+        self.assertTrue(os.path.exists(os.path.join(
+            tables, 'Height_ratio', 'Height_ratio_fit_report.log'
+            )))
+
+        # the single column entry point keeps the table of the series
+        series.perform_fit('CSP', x, 5, 'hill')
+
+        with open(os.path.join(tables, 'fit_table.csv')) as fin:
+            self.assertEqual(fin.read().splitlines(), rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
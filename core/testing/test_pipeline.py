@@ -0,0 +1,84 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import threading
+import unittest
+
+from core.fslibs.Pipeline import Pipeline
+
+
+class Test_Pipeline(unittest.TestCase):
+    def test_ordered_and_bounded(self):
+        for depth in (0, 2):
+            consumed = []
+            started = threading.Event()
+            release = threading.Event()
+
+            def consume(item):
+                started.set()
+                release.wait()
+                consumed.append(item)
+
+            pipeline = Pipeline(consume, depth=depth)
+
+            if depth:
+                pipeline.put(0)
+                started.wait()
+                pipeline.put(1)
+                pipeline.put(2)
+                # the consumer holds item 0, items 1 and 2 fill the queue
+                self.assertTrue(pipeline.queue.full())
+                release.set()
+                pipeline.put(3)
+
+            else:
+                release.set()
+
+                for item in range(4):
+                    pipeline.put(item)
+
+            pipeline.close()
+            self.assertEqual(consumed, [0, 1, 2, 3])
+
+    def test_errors(self):
+        def consume(item):
+            if item == 1:
+                raise ValueError(item)
+
+        with self.assertRaises(ValueError):
+            with Pipeline(consume, depth=1) as pipeline:
+                for item in range(3):
+                    pipeline.put(item)
+
+        # errors of the main thread discard the waiting items
+        consumed = []
+
+        with self.assertRaises(KeyError):
+            with Pipeline(consumed.append, depth=1) as pipeline:
+                pipeline.put(0)
+                raise KeyError(0)
+
+        self.assertIsNone(pipeline.thread)
+
+
+if __name__ == '__main__':
+    unittest.main()
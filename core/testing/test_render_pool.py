@@ -0,0 +1,109 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from core.fslibs.RenderPool import RenderPool
+
+
+class Figure:
+    """Picklable series that writes its title in a text file."""
+    def __init__(self, folder, title, delay=0):
+        self.folder = folder
+        self.title = title
+        self.delay = delay
+
+    def plot_base(self, calccol, plot_type, plot_style):
+        time.sleep(self.delay)
+        file_path = os.path.join(
+            self.folder,
+            '{}_{}.txt'.format(calccol, plot_style)
+            )
+
+        with open(file_path, 'w') as fout:
+            fout.write(self.title)
+
+        return [file_path]
+
+
+class Test_RenderPool(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def read(self, style):
+        with open(os.path.join(self.folder, 'CSP_{}.txt'.format(style))) as fin:
+            return fin.read()
+
+    def test_render(self):
+        for workers in (1, 2):
+            outputs = []
+            pool = RenderPool(workers)
+            series = Figure(self.folder, 'first')
+
+            for style in ('bar', 'res_evo', 'scatter'):
+                pool.submit(
+                    series,
+                    ('CSP', 'exp', style),
+                    {},
+                    callback=outputs.append
+                    )
+                series.title = style
+
+                # the series is pickled once until it is released
+                if style == 'bar':
+                    pool.release(series)
+
+            pool.close()
+            self.assertEqual(
+                outputs,
+                [
+                    [os.path.join(self.folder, 'CSP_{}.txt'.format(style))]
+                    for style in ('bar', 'res_evo', 'scatter')
+                    ]
+                )
+            self.assertEqual(self.read('res_evo'), 'bar')
+
+            if workers > 1:
+                self.assertEqual(self.read('scatter'), 'bar')
+                self.assertEqual(pool.pickles, {})
+
+    def test_cancel(self):
+        pool = RenderPool(2, max_pending=100)
+        series = Figure(self.folder, 'first', delay=0.05)
+
+        for i in range(50):
+            pool.submit(series, ('CSP', 'exp', str(i)), {})
+
+        pool.close(cancel=True)
+        self.assertIsNone(pool.executor)
+        self.assertEqual(pool.pending, [])
+        self.assertLess(len(os.listdir(self.folder)), 50)
+
+if __name__ == '__main__':
+    unittest.main()
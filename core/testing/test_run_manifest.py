@@ -0,0 +1,100 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.fslibs.RunManifest import RunManifest, config_sections, fingerprint
+
+
+class Test_RunManifest(unittest.TestCase):
+    def setUp(self):
+        self.output_path = tempfile.mkdtemp()
+        self.folder = os.path.join(self.output_path, 'series')
+        os.makedirs(self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_path)
+
+    def run_stage(self, manifest, text):
+        before = manifest.snapshot(self.folder)
+
+        with open(os.path.join(self.folder, 'table.csv'), 'w') as fout:
+            fout.write(text)
+
+        manifest.record('stage', fingerprint(text), self.folder, before)
+
+    def test_stages(self):
+        manifest = RunManifest(self.output_path)
+        manifest.set_run({'P1.csv': 'abc'}, {'csp_settings': {}})
+        self.assertFalse(manifest.is_up_to_date('stage', fingerprint('a')))
+        self.run_stage(manifest, 'a')
+        self.assertEqual(
+            manifest.stages['stage']['outputs'],
+            [os.path.join('series', 'table.csv')]
+            )
+        manifest.save(complete=True)
+
+        manifest = RunManifest(self.output_path)
+        manifest.set_run({'P1.csv': 'abc'}, {'csp_settings': {}})
+        self.assertTrue(manifest.run_is_up_to_date())
+        self.assertTrue(manifest.is_up_to_date('stage', fingerprint('a')))
+        self.assertFalse(manifest.is_up_to_date('stage', fingerprint('b')))
+
+        # deleted outputs are computed again
+        os.remove(os.path.join(self.folder, 'table.csv'))
+        self.assertFalse(manifest.run_is_up_to_date())
+        self.assertFalse(manifest.is_up_to_date('stage', fingerprint('a')))
+
+    def test_partial_run_is_not_skipped(self):
+        manifest = RunManifest(self.output_path)
+        manifest.set_run({}, {})
+        self.run_stage(manifest, 'a')
+        manifest.save()
+
+        manifest = RunManifest(self.output_path)
+        manifest.set_run({}, {})
+        self.assertFalse(manifest.run_is_up_to_date())
+        self.assertTrue(manifest.is_up_to_date('stage', fingerprint('a')))
+
+    def test_config_sections(self):
+        fsuv = {
+            'general_settings': {'fig_dpi': 300, 'load_workers': 4},
+            'bar_plot_settings': {'measured_color': 'black'},
+            'cache_settings': {'use_cache': True},
+            'csp_settings': {'calcs_CSP': True}
+            }
+        self.assertNotIn('cache_settings', config_sections(fsuv))
+        self.assertEqual(
+            config_sections(fsuv)['general_settings'],
+            {'fig_dpi': 300}
+            )
+        self.assertEqual(
+            config_sections(fsuv, analysis_only=True),
+            {'general_settings': {}, 'csp_settings': {'calcs_CSP': True}}
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from matplotlib import pyplot as plt
+from matplotlib.collections import PathCollection
+
+from core.fslibs.FarseerSeries import FarseerSeries
+
+default_config = os.path.join('..', 'default_config.json')
+
+
+class Test_PaginatedPlots(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+
+        with open(default_config) as fin:
+            config = json.load(fin)
+
+        self.params = {**config['revo_settings'], **config['res_evo_settings']}
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        x = np.array([0, 25, 50, 100, 200, 400, 500])
+        self.series = FarseerSeries(
+            {
+                'ResNo': np.tile(np.arange(1, 11), (7, 1)),
+                '1-letter': np.full((7, 10), 'A', dtype=object),
+                '3-letter': np.full((7, 10), 'ALA', dtype=object),
+                'Peak Status': np.full((7, 10), 'measured', dtype=object),
+                'CSP': (x / (100 + x))[:, None] * np.linspace(0.05, 0.3, 10),
+                },
+            items=['ref', 'p1', 'p2', 'p3', 'p4', 'p5', 'p6']
+            )
+        self.series.create_attributes(series_axis='along_x')
+        self.series.logs = lambda *args, **kwargs: None
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def plot(self, fig_file_type):
+        return self.series.plot_base(
+            'CSP',
+            'res',
+            'res_evo',
+            self.params,
+            par_ylims=(0, 0.3),
+            cols_per_page=2,
+            rows_per_page=2,
+            fig_file_type=fig_file_type,
+            fig_dpi=20,
+            paginate=True
+            )
+
+    def test_pages(self):
+        # 10 residues in pages of 2x2 residues
+        outputs = self.plot('png')
+        self.assertEqual(
+            [os.path.basename(path) for path in outputs],
+            ['CSP_res_evo_page{:03}.png'.format(i) for i in (1, 2, 3)]
+            )
+        self.assertTrue(all(map(os.path.exists, outputs)))
+
+        outputs = self.plot('pdf')
+        self.assertEqual(
+            [os.path.basename(path) for path in outputs],
+            ['CSP_res_evo.pdf']
+            )
+
+        with open(outputs[0], 'rb') as fin:
+            self.assertIn(b'/Count 3', fin.read())
+
+    def test_bar_colors_and_marks(self):
+        experiment = self.series.items[-1]
+        self.series.loc[:, 4, '1-letter'] = 'P'
+        self.series.loc[:, 2, 'Peak Status'] = 'missing'
+        fig, axs = plt.subplots(2)
+        self.series.plot_bar_horizontal(
+            'bar_extended',
+            'CSP',
+            axs,
+            0,
+            experiment,
+            y_lims=(0, 0.3)
+            )
+        self.series.plot_bar_vertical('CSP', axs, 1, experiment)
+
+        for ax in axs:
+            colors = [bar.get_facecolor() for bar in ax.patches[:10]]
+            self.assertEqual(colors[2], (1., 0., 0., 1.))
+            self.assertEqual(colors[3], (0., 0., 0., 1.))
+            # the proline mark is a mathtext scatter marker, not a Text
+            markers, = [
+                c for c in ax.collections if isinstance(c, PathCollection)
+                ]
+            self.assertEqual(len(markers.get_offsets()), 1)
+            self.assertEqual(len(markers.get_paths()), 1)
+            self.assertFalse(
+                any(text.get_text() == 'P' for text in ax.texts)
+                )
+
+        plt.close(fig)
+
+    def test_unknown_status_color(self):
+        self.series.loc[:, 2, 'Peak Status'] = 'lost'
+        fig, axs = plt.subplots(1)
+
+        # drawn as measured, with a warning
+        with self.assertLogs(self.series.logger, 'WARNING') as logs:
+            self.series.plot_bar_vertical(
+                'CSP',
+                [axs],
+                0,
+                'p1',
+                measured_color='blue'
+                )
+
+        self.assertIn('lost', logs.output[0])
+        colors = [bar.get_facecolor() for bar in axs.patches[:10]]
+        self.assertEqual(colors[2], (0., 0., 1., 1.))
+        plt.close(fig)
+
+    def test_cs_scatter_flower(self):
+        shifts = self.series.get_array('CSP')
+        self.series.set_array('H1_delta', shifts)
+        self.series.set_array('N15_delta', -shifts)
+        self.series.loc[:, 0, 'Peak Status'] = 'unassigned'
+        self.series.loc['p2', 1, 'Peak Status'] = 'missing'
+        self.series.loc['p3', 2, 'H1_delta'] = np.nan
+        logs = []
+        self.series.logs = lambda msg, *args, **kwargs: logs.append(msg)
+        fig, axs = plt.subplots(1)
+        self.series.plot_cs_scatter_flower([axs], xlim=0.3, ylim=0.3)
+        # 7 residues with all points and one without a missing point
+        scatter = axs.collections[0]
+        self.assertEqual(len(scatter.get_offsets()), 7 * 7 + 6)
+        # labels of residues 2, 4-10 next to their last measured point
+        self.assertEqual(
+            [text.get_text() for text in axs.texts],
+            ['2', '4', '5', '6', '7', '8', '9', '10']
+            )
+        self.assertEqual(
+            axs.texts[0].get_position(),
+            (shifts[-1, 1] * 1.05, -shifts[-1, 1] * 1.05)
+            )
+        self.assertEqual(len(logs), 1)
+        plt.close(fig)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+import itertools as it
+import numpy as np
+import pandas as pd
+
+from core.fslibs.TypedCube import TypedCube
+
+
+def make_peaklist(nres, offset):
+    return pd.DataFrame({
+        'ResNo': np.arange(1, nres + 1),
+        '1-letter': ['A'] * nres,
+        'Position F1': np.arange(nres, dtype=float) + offset,
+        'Height': np.arange(nres, dtype=int) * 10,
+        })
+
+
+class Test_TypedCube(unittest.TestCase):
+    def setUp(self):
+        self.zz = ['z1']
+        self.yy = ['y1', 'y2']
+        self.xx = ['x1', 'x2', 'x3']
+        self.pkls = {}
+
+        for n, (z, y, x) in enumerate(it.product(self.zz, self.yy, self.xx)):
+            nres = 3 if y == 'y2' else 4
+            self.pkls.setdefault(z, {}).setdefault(y, {})[x] = \
+                make_peaklist(nres, n)
+
+        self.cube = TypedCube.from_peaklists(
+            self.pkls,
+            self.zz,
+            self.yy,
+            self.xx
+            )
+
+    def test_typed_storage(self):
+        self.assertEqual(self.cube.shape, (1, 2, 3, 4))
+        self.assertEqual(
+            self.cube.numeric['Position F1'].dtype,
+            np.float64
+            )
+        self.assertEqual(self.cube.numeric['ResNo'].dtype, np.int64)
+        self.assertEqual(self.cube.codes['1-letter'].dtype, np.int32)
+        # padding of the shorter peaklists
+        self.assertEqual(self.cube.codes['1-letter'][0, 1, 0, 3], -1)
+        self.assertTrue(np.isnan(self.cube.numeric['Position F1'][0, 1, 0, 3]))
+        self.assertTrue(self.cube.is_missing('ResNo')[0, 1, 0, 3])
+        self.assertFalse(self.cube.is_missing('ResNo')[0, 0, 0, 3])
+        np.testing.assert_array_equal(
+            self.cube.isin('ResNo', [2, 4])[0, 0, 0],
+            [False, True, False, True]
+            )
+
+    def test_series_block_integer_padding(self):
+        _, columns, lengths = self.cube.transpose(1, 0, 2).series_block(
+            'y2', 'z1'
+            )
+        self.assertEqual(list(lengths), [3, 3, 3])
+        self.assertEqual(columns['ResNo'].dtype, np.int64)
+
+    def test_to_frame_roundtrip(self):
+        for z, y, x in it.product(self.zz, self.yy, self.xx):
+            df = self.cube.to_frame(z, y, x)
+            expected = self.pkls[z][y][x]
+            self.assertEqual(list(df.columns), list(expected.columns))
+            self.assertEqual(list(df['ResNo']), list(expected['ResNo']))
+            np.testing.assert_array_equal(
+                np.asarray(df['Position F1']),
+                np.asarray(expected['Position F1'])
+                )
+
+    def test_transpose_is_view(self):
+        cube_t = self.cube.transpose(1, 2, 0)
+        self.assertEqual(cube_t.coords, [self.yy, self.xx, self.zz])
+        self.assertTrue(
+            np.shares_memory(
+                cube_t.numeric['Position F1'],
+                self.cube.numeric['Position F1']
+                )
+            )
+        pd.testing.assert_frame_equal(
+            cube_t.to_frame('y2', 'x3', 'z1'),
+            self.cube.to_frame('z1', 'y2', 'x3')
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Copyright © 2017-2018 Farseer-NMR
+João M.C. Teixeira and Simon P. Skinner
+
+@ResearchGate https://goo.gl/z8dPJU
+@Twitter https://twitter.com/farseer_nmr
+
+This file is part of Farseer-NMR.
+
+Farseer-NMR is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Farseer-NMR is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Farseer-NMR. If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+
+from core.fslibs.TypedPanel import TypedPanel
+
+
+class Test_TypedPanel(unittest.TestCase):
+    def setUp(self):
+        self.panel = TypedPanel(
+            {
+                'ResNo': np.array([[1, 2, 3]] * 2),
+                'Height': np.array([[10, 20, 30], [5, 10, 15]]),
+                'Peak Status': np.array(
+                    [
+                        ['measured', 'measured', 'measured'],
+                        ['measured', 'missing', 'measured']
+                        ],
+                    dtype=object
+                    ),
+                },
+            items=['ref', 'dp1']
+            )
+
+    def test_typed_columns(self):
+        self.assertEqual(self.panel.shape, (2, 3, 3))
+        self.assertEqual(self.panel.get_array('ResNo').dtype, np.int64)
+        self.assertEqual(self.panel.get_array('Height').dtype, np.int64)
+        self.assertEqual(
+            self.panel.get_array('Peak Status').dtype,
+            object
+            )
+        self.assertEqual(list(self.panel), ['ref', 'dp1'])
+
+    def test_panel_orientation(self):
+        col = self.panel.loc[:, :, 'Height']
+        self.assertIsInstance(col, pd.DataFrame)
+        self.assertEqual(list(col.columns), ['ref', 'dp1'])
+        self.assertEqual(list(col.index), [0, 1, 2])
+
+        residue = self.panel.loc[:, 1, 'Height']
+        self.assertEqual(list(residue.index), ['ref', 'dp1'])
+        self.assertEqual(list(residue), [20., 10.])
+
+        exp = self.panel.loc['dp1']
+        self.assertEqual(list(exp.columns), ['ResNo', 'Height', 'Peak Status'])
+        self.assertEqual(self.panel.ix[1, 2, 'Height'], 15.)
+
+    def test_masked_assignment(self):
+        missing = self.panel.loc['dp1', :, 'Peak Status'] == 'missing'
+        self.panel.loc['dp1', missing, 'Height'] = 0
+        self.assertEqual(list(self.panel.get_array('Height')[1]), [5, 0, 15])
+        self.assertEqual(self.panel.get_array('Height').dtype, np.int64)
+
+        # integer columns are upcast to store other numbers
+        self.panel.loc['dp1', missing, 'Height'] = np.nan
+        self.assertEqual(self.panel.get_array('Height').dtype, np.float64)
+        self.assertTrue(np.isnan(self.panel.ix[1, 1, 'Height']))
+
+        measured = self.panel.loc[:, 1, 'Peak Status'] == 'measured'
+        self.assertEqual(list(self.panel.loc[measured, 1, 'Height']), [20.])
+
+    def test_categorical_columns(self):
+        codes, categories = self.panel.get_codes('Peak Status')
+        self.assertEqual(codes.dtype, np.int32)
+        self.assertEqual(list(categories), ['measured', 'missing'])
+        self.assertEqual(
+            self.panel.loc['dp1', :, 'Peak Status'].dtype,
+            'category'
+            )
+        np.testing.assert_array_equal(
+            self.panel.isin('Peak Status', ['missing']),
+            [[False, False, False], [False, True, False]]
+            )
+        np.testing.assert_array_equal(
+            self.panel.isin('ResNo', [1, 3]),
+            [[True, False, True], [True, False, True]]
+            )
+
+        # new values extend the categories
+        self.panel.loc['ref', 2, 'Peak Status'] = 'unassigned'
+        self.assertEqual(self.panel.ix[0, 2, 'Peak Status'], 'unassigned')
+        self.assertEqual(len(self.panel.get_codes('Peak Status')[1]), 3)
+        self.assertEqual(
+            self.panel.memory_report().loc['Peak Status', 'categories'],
+            3
+            )
+
+    def test_new_columns(self):
+        self.panel.loc[:, :, 'ratio'] = \
+            self.panel.loc[:, :, 'Height'].div(
+                self.panel.ix[0, :, 'Height'],
+                axis='index'
+                )
+        np.testing.assert_allclose(
+            self.panel.get_array('ratio'),
+            [[1, 1, 1], [0.5, 0.5, 0.5]]
+            )
+        self.panel.loc['dp1', :, 'tag'] = ''
+        self.assertEqual(self.panel.get_array('tag').dtype, object)
+        self.assertTrue(pd.isnull(self.panel.ix[0, 0, 'tag']))
+
+
+if __name__ == '__main__':
+    unittest.main()